@@ -0,0 +1,171 @@
+"""Offline benchmarks: ``python -m benchmarks.run --out bench.json [--compare old.json]``.
+
+Synthetic editais (:mod:`benchmarks.synth_edital`) go through ``pdf_to_lines``,
+``classify_line``/``classify_lines``, ``extract_nome``/``extract_nomes`` and
+``process_pdf_to_csv`` with the tiny random-init models from
+``ml/make_tiny_models.py``, so no network or trained model is needed.
+Timings are the median over ``--repeat`` runs; the JSON report can be
+compared against a previous one to spot regressions.
+"""
+from __future__ import annotations
+import argparse, json, os, platform, statistics, sys, tempfile, time
+from typing import Callable, Dict, List, Optional
+
+from .synth_edital import write_edital
+
+SIZES = {
+    "small": dict(pages=2, lists=3, candidates=9, suplentes=3),
+    "medium": dict(pages=8, lists=9, candidates=13, suplentes=4),
+    "large": dict(pages=30, lists=25, candidates=19, suplentes=6),
+}
+# metrics where a higher value is better; every other number is a duration
+HIGHER_IS_BETTER = ("per_s",)
+
+
+def timed(fn: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def latency(fn: Callable, items: List[str]) -> Dict[str, float]:
+    """Per-call latency of ``fn`` over ``items``, in milliseconds."""
+    samples: List[float] = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - t0) * 1000)
+    if not samples:
+        return {}
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 4),
+            "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+            "per_s": round(1000 * len(samples) / max(sum(samples), 1e-9), 2)}
+
+
+def bench_size(name: str, spec: dict, ml, line_dir: str, ner_dir: str, work: str, repeat: int,
+               scanned: int, ocr: bool) -> dict:
+    from cne_ml_extractor.pipeline_ml import LINE_NUM, process_pdf_to_csv
+    from cne_ml_extractor.utils import pdf_to_lines
+
+    pdf = write_edital(os.path.join(work, f"{name}.pdf"), **spec)
+    pages = pdf_to_lines(pdf.path)
+    lines = [ln for page in pages for ln in page]
+    cand = [ln for ln in lines if LINE_NUM.match(ln)]
+    out: dict = {"pages": pdf.pages, "lines": len(lines), "candidates": pdf.candidates}
+
+    secs = statistics.median(timed(lambda: pdf_to_lines(pdf.path), repeat))
+    out["pdf_to_lines"] = {"median_s": round(secs, 6), "pages_per_s": round(pdf.pages / secs, 2)}
+
+    out["classify_line"] = latency(ml.classify_line, lines)
+    secs = statistics.median(timed(lambda: ml.classify_lines(lines), repeat))
+    out["classify_lines"] = {"median_s": round(secs, 6), "lines_per_s": round(len(lines) / secs, 2)}
+    out["extract_nome"] = latency(ml.extract_nome, cand)
+    secs = statistics.median(timed(lambda: ml.extract_nomes(cand), repeat))
+    out["extract_nomes"] = {"median_s": round(secs, 6), "lines_per_s": round(len(cand) / secs, 2)}
+
+    csv_path = os.path.join(work, f"{name}.csv")
+    stats: dict = {}
+    secs = statistics.median(timed(lambda: process_pdf_to_csv(pdf.path, "000000", csv_path, line_dir, ner_dir,
+                                                              ml=ml, stats=stats), repeat))
+    out["process_pdf_to_csv"] = {"median_s": round(secs, 6), "lines_per_s": round(len(lines) / secs, 2),
+                                 "pages_per_s": round(pdf.pages / secs, 2), "rows": stats.get("rows", 0) // repeat}
+
+    if scanned:
+        if not ocr:
+            out["pdf_to_lines_scanned"] = {"skipped": "tesseract unavailable"}
+        else:
+            spdf = write_edital(os.path.join(work, f"{name}-scanned.pdf"), scanned=scanned, **spec)
+            secs = statistics.median(timed(lambda: pdf_to_lines(spdf.path), repeat))
+            out["pdf_to_lines_scanned"] = {"median_s": round(secs, 6), "scanned_pages": spdf.scanned_pages,
+                                           "pages_per_s": round(spdf.pages / secs, 2)}
+    return out
+
+
+def run_benchmarks(sizes: List[str], repeat: int = 3, scanned: int = 1, models_dir: Optional[str] = None,
+                   backend: str = "torch") -> dict:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import torch
+    from ml.make_tiny_models import build_tiny_models
+    from cne_ml_extractor.ml_infer import MLExtractor
+    from cne_ml_extractor.utils import tesseract_version
+
+    with tempfile.TemporaryDirectory(prefix="cne-bench-") as work:
+        line_dir, ner_dir = build_tiny_models(models_dir or os.path.join(work, "models"))
+        t0 = time.perf_counter()
+        ml = MLExtractor(line_dir, ner_dir, backend=backend)
+        load_s = time.perf_counter() - t0
+        ml.warm_up()
+        ocr = tesseract_version() != "unavailable"
+        results = {name: bench_size(name, SIZES[name], ml, line_dir, ner_dir, work, repeat, scanned, ocr)
+                   for name in sizes}
+    return {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "torch": torch.__version__,
+                 "torch_threads": torch.get_num_threads(), "backend": backend, "repeat": repeat,
+                 "tesseract": tesseract_version(), "model_load_s": round(load_s, 4)},
+        "results": results,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = float(value)
+    return flat
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> List[dict]:
+    """List the timing metrics of ``new`` that are more than ``threshold`` worse than in ``old``."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    regressions = []
+    for key, value in after.items():
+        prev = before.get(key)
+        if not prev or not key.endswith(("_s", "_ms", "per_s")):
+            continue
+        higher_better = key.endswith(HIGHER_IS_BETTER)
+        change = (prev - value) / prev if higher_better else (value - prev) / prev
+        if change > threshold:
+            regressions.append({"metric": key, "old": prev, "new": value, "worse_by": round(change, 4)})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", default="small,medium", help=f"tamanhos a medir ({','.join(SIZES)})")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--scanned", type=int, default=1, help="páginas digitalizadas (OCR) por edital; 0 desliga")
+    p.add_argument("--backend", default="torch")
+    p.add_argument("--out", default="bench.json")
+    p.add_argument("--compare", help="relatório anterior para comparar")
+    p.add_argument("--threshold", type=float, default=0.10, help="piora relativa a partir da qual é regressão")
+    args = p.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        p.error(f"tamanhos desconhecidos: {', '.join(sorted(unknown))}")
+    report = run_benchmarks(sizes, repeat=args.repeat, scanned=args.scanned, backend=args.backend)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report["results"], indent=2, ensure_ascii=False))
+    print("[OK] Resultados em", args.out)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for r in regressions:
+            print(f"[REGRESSÃO] {r['metric']}: {r['old']} -> {r['new']} ({100 * r['worse_by']:.1f}% pior)")
+        if regressions:
+            return 1
+        print("[OK] Sem regressões face a", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""Startup benchmark: ``python -m benchmarks.startup [--out startup.json] [--budget-ms 300]``.
+
+Each entry point is imported in a fresh interpreter under ``python -X importtime``;
+the report gives its wall time above a bare interpreter, the cumulative import
+time, its slowest direct imports and any heavy dependency (torch, PyMuPDF,
+Tesseract...) that got loaded although nothing used it.  The command exits
+with 1 when a heavy module is loaded or an import exceeds ``--budget-ms``.
+"""
+from __future__ import annotations
+import argparse, json, os, statistics, subprocess, sys, time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("cne_ml_extractor.utils", "cne_ml_extractor.pipeline_ml", "cne_ml_extractor.batch", "webapp.server")
+CLIS = {"batch --help": ["-m", "cne_ml_extractor.batch", "--help"],
+        "webapp --help": ["-m", "webapp.server", "--help"]}
+HEAVY = ("torch", "transformers", "onnxruntime", "fitz", "pymupdf", "PIL", "pytesseract", "tesserocr", "numpy")
+
+
+def _run(args: List[str]) -> tuple:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - t0) * 1000, proc
+
+
+def parse_importtime(stderr: str, module: str) -> dict:
+    """Cumulative import time of ``module`` and of its direct imports, in ms, from ``-X importtime`` output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1000))
+    total, children = 0.0, []
+    for i, (depth, name, ms) in enumerate(entries):
+        if depth == 0 and name == module:
+            total = ms
+            # the direct imports are listed right before it, one level deeper
+            for d, child, child_ms in reversed(entries[:i]):
+                if d == 0:
+                    break
+                if d == 1:
+                    children.append((child, round(child_ms, 2)))
+            break
+    return {"import_ms": round(total, 2), "top": sorted(children, key=lambda c: -c[1])[:8]}
+
+
+def measure(module: str, repeat: int = 3) -> dict:
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    walls, imports = [], []
+    for _ in range(repeat):
+        wall, proc = _run(["-X", "importtime", "-c", code])
+        walls.append(wall)
+        imports.append(parse_importtime(proc.stderr, module))
+    best = min(imports, key=lambda r: r["import_ms"])
+    return {"wall_ms": round(statistics.median(walls), 2), **best, "heavy": json.loads(proc.stdout)}
+
+
+def run_startup(repeat: int = 3) -> dict:
+    baseline = statistics.median(_run(["-c", "pass"])[0] for _ in range(repeat))
+    results: Dict[str, dict] = {m: measure(m, repeat) for m in TARGETS}
+    for name, args in CLIS.items():
+        results[name] = {"wall_ms": round(statistics.median(_run(args)[0] for _ in range(repeat)), 2)}
+    for res in results.values():
+        res["above_baseline_ms"] = round(res["wall_ms"] - baseline, 2)
+    return {"meta": {"python": sys.version.split()[0], "baseline_ms": round(baseline, 2), "repeat": repeat},
+            "results": results}
+
+
+def problems(report: dict, budget_ms: Optional[float] = None) -> List[str]:
+    out = []
+    for name, res in report["results"].items():
+        if res.get("heavy"):
+            out.append(f"{name} importa {', '.join(res['heavy'])}")
+        if budget_ms is not None and res["above_baseline_ms"] > budget_ms:
+            out.append(f"{name}: {res['above_baseline_ms']} ms > {budget_ms} ms")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.splitlines()[0])
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", default="startup.json")
+    p.add_argument("--budget-ms", type=float, help="tempo máximo acima do interpretador vazio")
+    args = p.parse_args(argv)
+
+    report = run_startup(args.repeat)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    for name, res in report["results"].items():
+        top = ", ".join(f"{m} {ms}" for m, ms in res.get("top", [])[:3])
+        print(f"{name:32} {res['above_baseline_ms']:8.1f} ms" + (f"  ({top})" if top else ""))
+    print("[OK] Resultados em", args.out)
+    found = problems(report, args.budget_ms)
+    for msg in found:
+        print("[REGRESSÃO]", msg)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""Synthetic editais for benchmarks: PyMuPDF documents of controllable size.
+
+The layout follows the real ones closely enough for the pipeline: boilerplate,
+``1. Assembleia Municipal`` / ``2. Câmara Municipal`` sections, one
+``SIGLA - Nome`` header per list, then numbered efetivos and suplentes.
+Scanned pages are rasterised so they carry no text layer and go through OCR.
+"""
+from __future__ import annotations
+import random
+from typing import List, NamedTuple, Optional
+
+import fitz
+
+FIRST = ["João", "Maria", "Ana", "Carlos", "Rui", "Sofia", "Pedro", "Inês", "Luís", "Marta", "José", "Teresa",
+         "Miguel", "Catarina", "Paulo", "Helena", "António", "Beatriz", "Nuno", "Rita"]
+LAST = ["Silva", "Santos", "Ferreira", "Pereira", "Oliveira", "Costa", "Rodrigues", "Martins", "Sousa", "Fernandes",
+        "Gonçalves", "Gomes", "Lopes", "Marques", "Almeida", "Ribeiro", "Pinto", "Carvalho", "Teixeira", "Moreira"]
+PARTIES = [("PS", "Partido Socialista"), ("PPD/PSD", "Partido Social Democrata"), ("PCP-PEV", "CDU - Coligação"),
+           ("CDS-PP", "Partido Popular"), ("BE", "Bloco de Esquerda"), ("IL", "Iniciativa Liberal"),
+           ("L", "Livre"), ("PAN", "Pessoas-Animais-Natureza"), ("CH", "Chega")]
+BOILERPLATE = ["Eleição dos órgãos das autarquias locais", "Tribunal da Comarca", "Edital",
+               "Listas admitidas definitivamente"]
+FOOTER = "O Juiz de Direito"
+
+LINE_HEIGHT = 14
+TOP = 60
+PAGE_LINES = 52  # what fits on an A4 page at LINE_HEIGHT
+
+
+class SynthEdital(NamedTuple):
+    path: str
+    pages: int
+    lines: int
+    candidates: int
+    scanned_pages: int
+
+
+def person(rng: random.Random) -> str:
+    return " ".join([rng.choice(FIRST)] + rng.sample(LAST, rng.randint(1, 3)))
+
+
+def edital_lines(lists: int = 4, candidates: int = 9, suplentes: int = 3, seed: int = 0) -> tuple:
+    """Return ``(lines, n_candidates)`` for an edital with ``lists`` lists in each órgão."""
+    rng = random.Random(seed)
+    lines = list(BOILERPLATE)
+    n_cand = 0
+    for orgao in ("1. Assembleia Municipal", "2. Câmara Municipal"):
+        lines.append(orgao)
+        for i in range(lists):
+            sigla, nome = PARTIES[i] if i < len(PARTIES) else (f"GC{i}", f"Grupo de Cidadãos {i}")
+            lines.append(f"{sigla} - {nome}")
+            for section, count in (("CANDIDATOS EFETIVOS", candidates), ("CANDIDATOS SUPLENTES", suplentes)):
+                lines.append(section)
+                lines.extend(f"{n} {person(rng)}" for n in range(1, count + 1))
+                n_cand += count
+    lines.append(FOOTER)
+    return lines, n_cand
+
+
+def split_pages(lines: List[str], pages: Optional[int] = None) -> List[List[str]]:
+    """Spread ``lines`` over ``pages`` pages (or as many full pages as needed)."""
+    if not pages:
+        pages = max(1, -(-len(lines) // PAGE_LINES))
+    per_page = max(1, -(-len(lines) // pages))
+    if per_page > PAGE_LINES:
+        raise ValueError(f"{len(lines)} lines do not fit on {pages} pages")
+    chunks = [lines[i:i + per_page] for i in range(0, len(lines), per_page)]
+    return chunks + [[FOOTER]] * (pages - len(chunks))
+
+
+def _text_page(doc, page_lines: List[str]):
+    page = doc.new_page(width=595, height=842)
+    for i, line in enumerate(page_lines):
+        page.insert_text((60, TOP + i * LINE_HEIGHT), line, fontsize=10)
+    return page
+
+
+def write_edital(path: str, pages: Optional[int] = None, lists: int = 4, candidates: int = 9, suplentes: int = 3,
+                 scanned: int = 0, dpi: int = 150, seed: int = 0) -> SynthEdital:
+    """Write a synthetic edital to ``path``; the last ``scanned`` pages are image-only."""
+    lines, n_cand = edital_lines(lists, candidates, suplentes, seed)
+    chunks = split_pages(lines, pages)
+    scanned = min(scanned, len(chunks))
+    doc = fitz.open()
+    for i, chunk in enumerate(chunks):
+        if i < len(chunks) - scanned:
+            _text_page(doc, chunk)
+            continue
+        tmp = fitz.open()
+        pix = _text_page(tmp, chunk).get_pixmap(dpi=dpi)
+        tmp.close()
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, pixmap=pix)
+    doc.save(path)
+    doc.close()
+    return SynthEdital(path, len(chunks), sum(len(c) for c in chunks), n_cand, scanned)
@@ -1 +1 @@
-__all__ = ['ml_infer','pipeline_ml','utils']
+__all__ = ['batch','cascade','conll','incremental','joint','layout','lazy','memo','microbatch','ml_infer','page_cache','pipeline_ml','profiling','student','utils','writers']
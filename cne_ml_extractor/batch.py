@@ -0,0 +1,401 @@
+"""Batch runner: ``python -m cne_ml_extractor.batch`` over ``samples/<Municipio>/input``.
+
+Replaces the one-interpreter-per-PDF loop of ``scripts/run_lote.ps1``: PDFs are
+fanned out to a pool of long-lived worker processes that load the models once,
+progress is appended to a JSONL file so an interrupted run can be resumed, and
+a per-file summary is printed at the end.  With ``--fuse N`` each worker
+task takes N small PDFs and runs their lines through shared model batches.
+"""
+from __future__ import annotations
+import argparse, json, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+from .memo import InferenceMemo
+from .ml_infer import BACKENDS
+from .page_cache import PageCache
+from .pipeline_ml import process_pdf_to_csv, process_pdfs_to_csv
+from .profiling import Profiler, profiled, to_prometheus
+from .utils import file_sha256
+from .writers import EXTENSIONS, FORMATS
+
+PROGRESS_FILE = ".batch_progress.jsonl"
+
+
+class Job(NamedTuple):
+    municipio: str
+    pdf_path: str
+    dtmnfr: str
+    out_csv: str
+
+
+def read_dtmnfr(municipio_dir: str) -> Optional[str]:
+    """Read ``dtmnfr`` from ``<municipio_dir>/ALL_context.yaml`` if present."""
+    path = os.path.join(municipio_dir, "ALL_context.yaml")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8-sig") as f:
+        ctx = yaml.safe_load(f) or {}
+    value = ctx.get("dtmnfr")
+    return str(value) if value not in (None, "") else None
+
+
+def discover_jobs(root: str, municipios: Optional[List[str]] = None,
+                  dtmnfr: Optional[str] = None, out_format: str = "csv") -> List[Job]:
+    """List one job per ``<root>/<Municipio>/input/*.pdf``, sorted by path.
+
+    The output goes to ``<root>/<Municipio>/output/<pdf stem>_AM_CM_final.csv``
+    (``.jsonl``/``.parquet`` for the other formats).
+    Municípios without a DTMNFR (neither ``dtmnfr`` nor ALL_context.yaml) are skipped.
+    """
+    jobs: List[Job] = []
+    names = municipios or sorted(os.listdir(root))
+    for name in names:
+        base = os.path.join(root, name)
+        in_dir = os.path.join(base, "input")
+        if not os.path.isdir(in_dir):
+            continue
+        code = dtmnfr or read_dtmnfr(base)
+        if code is None:
+            print(f"[AVISO] {name}: sem dtmnfr (ALL_context.yaml), ignorado")
+            continue
+        for fn in sorted(os.listdir(in_dir)):
+            if not fn.lower().endswith(".pdf"):
+                continue
+            stem = os.path.splitext(fn)[0]
+            out_csv = os.path.join(base, "output", f"{stem}_AM_CM_final{EXTENSIONS[out_format]}")
+            jobs.append(Job(name, os.path.join(in_dir, fn), code, out_csv))
+    return jobs
+
+
+def plan_workers(n_cpus: int, n_jobs: int, workers: Optional[int] = None,
+                 torch_threads: Optional[int] = None) -> Tuple[int, int]:
+    """Split ``n_cpus`` between worker processes and torch intra-op threads.
+
+    Intra-op parallelism stops paying off beyond a few threads for short
+    lines, so by default every worker gets two threads and the rest of the
+    cores become more workers (never more workers than jobs).
+    """
+    n_cpus = max(1, n_cpus)
+    if workers is None:
+        per_worker = torch_threads or 2
+        workers = max(1, n_cpus // per_worker)
+    workers = max(1, min(workers, max(1, n_jobs)))
+    if torch_threads is None:
+        torch_threads = max(1, n_cpus // workers)
+    return workers, torch_threads
+
+
+def load_progress(path: str) -> Dict[str, dict]:
+    """Return the last recorded entry per PDF path from a progress JSONL file."""
+    done: Dict[str, dict] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # partially written last line of an interrupted run
+            done[rec["pdf"]] = rec
+    return done
+
+
+def is_done(job: Job, rec: Optional[dict], sha256: str) -> bool:
+    return (rec is not None and rec.get("status") == "ok" and rec.get("sha256") == sha256
+            and rec.get("out_csv") == job.out_csv and os.path.exists(job.out_csv))
+
+
+_WORKER_OPTS: dict = {}
+_WORKER_MEMO: Optional[InferenceMemo] = None
+
+
+def init_worker(opts: dict, torch_threads: int) -> None:
+    """Pool initializer: pin torch threads, open the inference memo and load the models once per worker."""
+    global _WORKER_MEMO
+    import torch
+    from .ml_infer import get_extractor
+
+    torch.set_num_threads(torch_threads)
+    _WORKER_OPTS.clear()
+    _WORKER_OPTS.update(opts)
+    if _WORKER_MEMO is not None:
+        _WORKER_MEMO.close()
+    _WORKER_MEMO = None
+    if opts.get("memo_size"):
+        _WORKER_MEMO = InferenceMemo(opts["memo_size"], path=opts.get("memo_db"))
+    if opts.get("preload", True):
+        get_extractor(opts["line_model_dir"], opts["ner_model_dir"], device=opts["device"],
+                      dtype=opts["dtype"], backend=opts.get("backend", "torch"), warm_up=True)
+
+
+def _job_record(job: Job, sha256: str) -> dict:
+    return {"pdf": job.pdf_path, "municipio": job.municipio, "dtmnfr": job.dtmnfr,
+            "out_csv": job.out_csv, "sha256": sha256}
+
+
+def _worker_extractor(opts: dict):
+    """The worker's extractor wired to its inference memo, or ``None`` to let the pipeline pick one."""
+    if _WORKER_MEMO is None:
+        return None
+    from .ml_infer import get_extractor
+    return get_extractor(opts["line_model_dir"], opts["ner_model_dir"], device=opts["device"],
+                         dtype=opts["dtype"], backend=opts.get("backend", "torch"), memo=_WORKER_MEMO)
+
+
+def _memo_delta(before: Optional[dict]) -> dict:
+    if before is None:
+        return {}
+    after = _WORKER_MEMO.stats()
+    hits = after["memo_hits"] - before["memo_hits"]
+    misses = after["memo_misses"] - before["memo_misses"]
+    return dict(memo_hits=hits, memo_misses=misses,
+                memo_hit_rate=round(hits / (hits + misses), 4) if hits + misses else 0.0)
+
+
+def run_job(job: Job, sha256: str) -> dict:
+    """Process one PDF in the current worker and return its progress record."""
+    opts = _WORKER_OPTS
+    stats: dict = {}
+    rec = _job_record(job, sha256)
+    memo_before = _WORKER_MEMO.stats() if _WORKER_MEMO is not None else None
+    t0 = time.perf_counter()
+    try:
+        ml = _worker_extractor(opts)
+        prof = Profiler() if opts.get("profile") else None
+        with profiled(prof):
+            process_pdf_to_csv(
+                job.pdf_path, job.dtmnfr, job.out_csv,
+                line_model_dir=opts["line_model_dir"], ner_model_dir=opts["ner_model_dir"],
+                device=opts["device"], dtype=opts["dtype"], backend=opts.get("backend", "torch"),
+                ml=ml, batch_size=opts["batch_size"],
+                rules_first=opts["rules_first"], stats=stats, layout=opts.get("layout", False),
+                page_cache=PageCache(opts["cache_dir"]) if opts.get("cache_dir") else None,
+                out_format=opts.get("out_format"), details=opts.get("details", False),
+                first_stage_dir=opts.get("first_stage_dir"), incremental=opts.get("incremental", False),
+            )
+        if prof is not None:
+            rec["profile"] = prof.report()
+        rec["status"] = "ok"
+    except Exception as exc:  # keep going; the failure is recorded and retried on resume
+        rec["status"] = "error"
+        rec["error"] = f"{type(exc).__name__}: {exc}"
+    rec["seconds"] = round(time.perf_counter() - t0, 3)
+    rec.update(stats)
+    rec.update(_memo_delta(memo_before))
+    return rec
+
+
+def run_jobs(group: List[Tuple[Job, str]]) -> List[dict]:
+    """Process several PDFs with pooled inference (:func:`process_pdfs_to_csv`), one record each.
+
+    A group is one unit of work: ``seconds`` and the model-call counters of
+    each record are the group's, split in proportion to the document's lines.
+    If the group fails, its PDFs are retried one by one with :func:`run_job`
+    so a single bad file only fails its own record.
+    """
+    opts = _WORKER_OPTS
+    stats: dict = {}
+    doc_stats: List[dict] = []
+    memo_before = _WORKER_MEMO.stats() if _WORKER_MEMO is not None else None
+    t0 = time.perf_counter()
+    try:
+        prof = Profiler() if opts.get("profile") else None
+        with profiled(prof):
+            process_pdfs_to_csv(
+                [(job.pdf_path, job.dtmnfr, job.out_csv) for job, _ in group],
+                line_model_dir=opts["line_model_dir"], ner_model_dir=opts["ner_model_dir"],
+                device=opts["device"], dtype=opts["dtype"], backend=opts.get("backend", "torch"),
+                ml=_worker_extractor(opts), batch_size=opts["batch_size"],
+                rules_first=opts["rules_first"], stats=stats, doc_stats=doc_stats,
+                layout=opts.get("layout", False),
+                page_cache=PageCache(opts["cache_dir"]) if opts.get("cache_dir") else None,
+                out_format=opts.get("out_format"), details=opts.get("details", False),
+                first_stage_dir=opts.get("first_stage_dir"),
+            )
+    except Exception:
+        return [run_job(job, sha256) for job, sha256 in group]
+    seconds = time.perf_counter() - t0
+    shared = {k: v for k, v in stats.items() if k not in ("lines", "rows")}
+    shared.update(_memo_delta(memo_before))
+    total = max(1, stats.get("lines", 0))
+    records = []
+    for i, ((job, sha256), own) in enumerate(zip(group, doc_stats)):
+        share = own["lines"] / total
+        rec = _job_record(job, sha256)
+        rec.update(status="ok", fused=len(group), seconds=round(seconds * share, 3), **own)
+        rec.update({k: round(v * share) if isinstance(v, int) else v for k, v in shared.items()})
+        if prof is not None and i == 0:
+            rec["profile"] = prof.report()  # the group's, attached once so merged totals stay right
+        records.append(rec)
+    return records
+
+
+def run_batch(jobs: List[Job], opts: dict, workers: int = 1, torch_threads: int = 1,
+              progress_path: str = PROGRESS_FILE, force: bool = False) -> List[dict]:
+    """Run ``jobs`` on ``workers`` processes, appending one record per finished PDF to ``progress_path``.
+
+    PDFs already recorded as ``ok`` with the same content hash and an existing
+    CSV are skipped unless ``force`` is set.
+    """
+    previous = {} if force else load_progress(progress_path)
+    todo: List[Tuple[Job, str]] = []
+    records: List[dict] = []
+    for job in jobs:
+        sha256 = file_sha256(job.pdf_path)
+        rec = previous.get(job.pdf_path)
+        if is_done(job, rec, sha256):
+            records.append(dict(rec, status="skipped"))
+        else:
+            todo.append((job, sha256))
+
+    os.makedirs(os.path.dirname(os.path.abspath(progress_path)), exist_ok=True)
+    with open(progress_path, "a", encoding="utf-8") as progress:
+        def record(rec: dict) -> None:
+            progress.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            progress.flush()
+            records.append(rec)
+            print(f"[{rec['status'].upper()}] {rec['pdf']} ({rec['seconds']}s)")
+
+        fuse = 1 if opts.get("incremental") else max(1, opts.get("fuse", 1))
+        groups = [todo[i:i + fuse] for i in range(0, len(todo), fuse)]
+
+        def run_group(group: List[Tuple[Job, str]]) -> List[dict]:
+            return run_jobs(group) if len(group) > 1 else [run_job(*group[0])]
+
+        if todo:
+            if workers <= 1 or len(groups) == 1:
+                init_worker(opts, torch_threads)
+                for group in groups:
+                    for rec in run_group(group):
+                        record(rec)
+            else:
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker,
+                                         initargs=(opts, torch_threads)) as pool:
+                    futures = [pool.submit(run_jobs, group) if len(group) > 1 else pool.submit(run_job, *group[0])
+                               for group in groups]
+                    for fut in as_completed(futures):
+                        result = fut.result()
+                        for rec in result if isinstance(result, list) else [result]:
+                            record(rec)
+    order = {job.pdf_path: i for i, job in enumerate(jobs)}
+    records.sort(key=lambda r: order.get(r["pdf"], len(order)))
+    return records
+
+
+def format_summary(records: List[dict]) -> str:
+    lines = [f"{'ESTADO':<8} {'SEG':>8} {'LINHAS':>7} {'CANDID':>7} {'EVITADAS':>8}  PDF"]
+    for rec in records:
+        lines.append(f"{rec['status']:<8} {rec.get('seconds', 0):>8.2f} {rec.get('lines', 0):>7} "
+                     f"{rec.get('rows', 0):>7} {rec.get('model_calls_avoided', 0):>8}  {rec['pdf']}")
+        if rec.get("error"):
+            lines.append(f"{'':<8} {rec['error']}")
+    counts: Dict[str, int] = {}
+    for rec in records:
+        counts[rec["status"]] = counts.get(rec["status"], 0) + 1
+    lines.append(" ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    hits = sum(rec.get("memo_hits", 0) for rec in records if rec["status"] != "skipped")
+    misses = sum(rec.get("memo_misses", 0) for rec in records if rec["status"] != "skipped")
+    if hits + misses:
+        lines.append(f"memo: {hits}/{hits + misses} linhas sem modelo ({100 * hits / (hits + misses):.1f}%)")
+    accepted = sum(rec.get("cascade_accepted", 0) for rec in records if rec["status"] != "skipped")
+    escalated = sum(rec.get("cascade_escalated", 0) for rec in records if rec["status"] != "skipped")
+    if accepted + escalated:
+        lines.append(f"cascata: {accepted}/{accepted + escalated} linhas decididas sem XLM-R "
+                     f"({100 * accepted / (accepted + escalated):.1f}%)")
+    return "\n".join(lines)
+
+
+def merge_profiles(records: List[dict]) -> dict:
+    """Sum the per-PDF profiles of the records processed in this run."""
+    total = Profiler()
+    for rec in records:
+        if rec["status"] != "skipped" and rec.get("profile"):
+            total.merge(rec["profile"])
+    report = total.report()
+    report["peak_rss_bytes"] = max((d.get("peak_rss_bytes") or 0 for d in report["documents"]), default=None)
+    return report
+
+
+def write_profile(report: dict, path: str) -> None:
+    """Write ``report`` as JSON, or as Prometheus text unless ``path`` ends in ``.json``."""
+    with open(path, "w", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        else:
+            f.write(to_prometheus(report))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m cne_ml_extractor.batch", description=__doc__.splitlines()[0])
+    p.add_argument("--root", default="samples", help="pasta com <Municipio>/input/*.pdf")
+    p.add_argument("--municipio", action="append", help="processar só este município (repetível)")
+    p.add_argument("--dtmnfr", help="DTMNFR para todos os PDFs (senão lido de ALL_context.yaml)")
+    p.add_argument("--workers", type=int, help="processos de trabalho (por omissão: núcleos / 2)")
+    p.add_argument("--torch-threads", type=int, help="threads intra-op do torch por worker")
+    p.add_argument("--line-model", default="models/line-cls-xlmr")
+    p.add_argument("--ner-model", default="models/ner-nome-xlmr")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--dtype", default="float32")
+    p.add_argument("--backend", default="torch", choices=BACKENDS,
+                   help="torch-int8/onnx/onnx-int8 reduzem latência e RAM em CPU (ver ml/export_onnx.py)")
+    p.add_argument("--batch-size", type=int, default=64)
+    p.add_argument("--rules-first", action="store_true", help="regras decidem as linhas inequívocas sem modelo")
+    p.add_argument("--first-stage", help="classificador leve (ml/distill_line_cls.py) à frente do XLM-R: "
+                                          "só as linhas em que hesita vão ao modelo completo")
+    p.add_argument("--layout", action="store_true",
+                   help="ler as páginas por linhas visuais (colunas, negrito, numeração) em vez de texto corrido")
+    p.add_argument("--fuse", type=int, default=1,
+                   help="PDFs por tarefa com inferência conjunta (lotes cheios com muitos editais pequenos)")
+    p.add_argument("--format", default="csv", choices=FORMATS,
+                   help="formato de saída: csv (;), jsonl ou parquet tipado (requer pyarrow)")
+    p.add_argument("--details", action="store_true",
+                   help="acrescentar página, linha e confiança do modelo a cada candidato")
+    p.add_argument("--incremental", action="store_true",
+                   help="num edital republicado, reaproveitar páginas, linhas e listas da execução anterior "
+                        "(estado em <saída>.state.json; desliga --fuse)")
+    p.add_argument("--cache-dir", default=None, help="cache de páginas/OCR (por omissão a cache partilhada)")
+    p.add_argument("--no-cache", action="store_true", help="não usar a cache de páginas/OCR")
+    p.add_argument("--memo-size", type=int, default=100_000,
+                   help="linhas memorizadas em RAM por worker (0 desliga a memória de inferência)")
+    p.add_argument("--memo-db", help="ficheiro SQLite partilhado com a memória de inferência entre execuções")
+    p.add_argument("--profile", help="grava tempos por etapa (.json, ou texto Prometheus noutra extensão)")
+    p.add_argument("--progress", help=f"ficheiro de progresso (por omissão <root>/{PROGRESS_FILE})")
+    p.add_argument("--force", action="store_true", help="reprocessar mesmo os PDFs já concluídos")
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    jobs = discover_jobs(args.root, args.municipio, args.dtmnfr, args.format)
+    if not jobs:
+        print(f"[AVISO] Nenhum PDF encontrado em {args.root}/<Municipio>/input")
+        return 1
+    workers, torch_threads = plan_workers(os.cpu_count() or 1, -(-len(jobs) // max(1, args.fuse)), args.workers, args.torch_threads)
+    opts = {
+        "line_model_dir": args.line_model, "ner_model_dir": args.ner_model, "device": args.device,
+        "dtype": args.dtype, "backend": args.backend, "batch_size": args.batch_size, "rules_first": args.rules_first,
+        "layout": args.layout, "fuse": args.fuse, "out_format": args.format, "details": args.details,
+        "first_stage_dir": args.first_stage, "incremental": args.incremental,
+        "cache_dir": None if args.no_cache else (args.cache_dir or PageCache().root),
+        "memo_size": args.memo_size, "memo_db": args.memo_db, "profile": bool(args.profile),
+    }
+    print(f"[INFO] {len(jobs)} PDF(s), {workers} worker(s) x {torch_threads} thread(s) torch")
+    records = run_batch(jobs, opts, workers=workers, torch_threads=torch_threads,
+                        progress_path=args.progress or os.path.join(args.root, PROGRESS_FILE),
+                        force=args.force)
+    print(format_summary(records))
+    if args.profile:
+        write_profile(merge_profiles(records), args.profile)
+        print("[OK] Perfil gravado em", args.profile)
+    return 0 if all(r["status"] != "error" for r in records) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""Per-label confidence thresholds and the classifier cascade.
+
+Two sets of thresholds live in ``thresholds.json`` next to the line model
+(written by ``ml/calibrate_thresholds.py`` from the dev split):
+
+* ``accept``: the probability a label needs before the list state machine
+  acts on it (what used to be the single ``CONF_THR = 0.55``);
+* ``cascade``: the probability a cheap first-stage classifier (the distilled
+  student of ``ml/distill_line_cls.py``) needs for its label to be taken
+  as is.  Lines below it escalate to the full XLM-R classifier; labels the
+  calibration found no safe threshold for always escalate.
+
+The pipeline counts ``cascade_accepted`` / ``cascade_escalated`` (and the
+accepted lines per label) so the accuracy/throughput trade-off can be tuned.
+"""
+from __future__ import annotations
+import json, os
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+THRESHOLDS_FILE = "thresholds.json"
+DEFAULT_ACCEPT = 0.55
+GRID = tuple(round(0.30 + 0.01 * i, 2) for i in range(70))  # 0.30 .. 0.99
+
+
+class Thresholds:
+    """Probability threshold per label; labels not listed use ``default``."""
+
+    def __init__(self, values: Union[float, Mapping[str, float], None] = None, default: float = DEFAULT_ACCEPT):
+        if isinstance(values, (int, float)):
+            values, default = {}, float(values)
+        self.values: Dict[str, float] = {k: float(v) for k, v in (values or {}).items()}
+        self.default = float(default)
+
+    def __getitem__(self, label: Optional[str]) -> float:
+        return self.values.get(label, self.default)
+
+    def passes(self, label: Optional[str], prob: float) -> bool:
+        return prob >= self[label]
+
+    def __repr__(self) -> str:
+        return f"Thresholds({self.values!r}, default={self.default})"
+
+
+def as_thresholds(value: Union[Thresholds, float, Mapping[str, float], None],
+                  default: float = DEFAULT_ACCEPT) -> Thresholds:
+    return value if isinstance(value, Thresholds) else Thresholds(value, default=default)
+
+
+def load_thresholds(model_dir: str) -> Dict[str, Thresholds]:
+    """Read ``<model_dir>/thresholds.json`` as ``{"accept": ..., "cascade": ...}`` (empty when absent).
+
+    Cascade labels missing from the file never skip the full model.
+    """
+    path = os.path.join(model_dir, THRESHOLDS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        cfg = json.load(f)
+    out = {}
+    if "accept" in cfg:
+        out["accept"] = Thresholds(cfg["accept"], default=cfg.get("accept_default", DEFAULT_ACCEPT))
+    if "cascade" in cfg:
+        out["cascade"] = Thresholds(cfg["cascade"], default=float("inf"))
+    return out
+
+
+@lru_cache(maxsize=4)
+def load_first_stage(model_dir: str):
+    """The cascade's first-stage classifier, loaded once per process."""
+    from .student import HashedNgramClassifier
+
+    return HashedNgramClassifier.load(model_dir)
+
+
+def calibrate_accept(preds: Sequence[Tuple[str, float]], gold: Sequence[str],
+                     grid: Sequence[float] = GRID) -> Dict[str, dict]:
+    """Per label, the acceptance threshold that maximises F1 of "predicted and above it" against ``gold``.
+
+    Ties go to the lower threshold, so fewer lines fall through to the
+    regex fallbacks.
+    """
+    out: Dict[str, dict] = {}
+    for label in sorted(set(gold) | {p[0] for p in preds}):
+        n_gold = sum(g == label for g in gold)
+        best = None
+        for thr in grid:
+            hits = [g == label for (p, prob), g in zip(preds, gold) if p == label and prob >= thr]
+            tp = sum(hits)
+            f1 = 2 * tp / (len(hits) + n_gold) if hits or n_gold else 0.0
+            if best is None or f1 > best["f1"] + 1e-12:
+                best = {"threshold": thr, "f1": round(f1, 4), "support": n_gold}
+        out[label] = best
+    return out
+
+
+def calibrate_cascade(first: Sequence[Tuple[str, float]], gold: Sequence[str], target: float = 0.995,
+                      min_support: int = 20, grid: Sequence[float] = GRID) -> Dict[str, dict]:
+    """Per label, the lowest first-stage threshold whose accepted lines are at least ``target`` correct.
+
+    A label is left out (always escalates) when no threshold keeps
+    ``min_support`` dev lines at that precision.
+    """
+    out: Dict[str, dict] = {}
+    for label in sorted({p[0] for p in first}):
+        for thr in grid:
+            hits = [g == label for (p, prob), g in zip(first, gold) if p == label and prob >= thr]
+            if len(hits) >= min_support and sum(hits) / len(hits) >= target:
+                out[label] = {"threshold": thr, "precision": round(sum(hits) / len(hits), 4),
+                              "accepted": len(hits)}
+                break
+    return out
+
+
+def cascade_report(first: Sequence[Tuple[str, float]], full: Sequence[Tuple[str, float]], gold: Sequence[str],
+                   cascade: Thresholds) -> dict:
+    """Accuracy of the full model alone and of the cascade on the dev split, and the share of escalated lines."""
+    taken: List[str] = [f[0] if cascade.passes(*f) else m[0] for f, m in zip(first, full)]
+    n = max(1, len(gold))
+    escalated = sum(1 for f in first if not cascade.passes(*f))
+    return {"lines": len(gold), "escalated": escalated, "escalated_share": round(escalated / n, 4),
+            "full_accuracy": round(sum(m[0] == g for m, g in zip(full, gold)) / n, 4),
+            "cascade_accuracy": round(sum(t == g for t, g in zip(taken, gold)) / n, 4)}
@@ -0,0 +1,39 @@
+"""CoNLL reading and train/dev splitting shared by the NER training scripts.
+
+Kept free of ``datasets``/``transformers`` so ``ml/train_ner.py`` and
+``ml/train_joint.py`` read the same format and the helpers can be tested
+without the training stack.
+"""
+from __future__ import annotations
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def iter_conll(path: str, digest: Optional[str] = None) -> Iterator[Dict[str, List[str]]]:
+    """Yield ``{"tokens", "ner_tags"}`` one sentence at a time.
+
+    ``digest`` is unused here; ``ml/train_ner.py`` passes it in ``gen_kwargs``
+    so that the ``datasets`` cache is keyed by the file contents and not just
+    its path.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tokens, tags = [], []
+        for line in f:
+            line = line.rstrip()
+            if not line:
+                if tokens:
+                    yield {'tokens': tokens, 'ner_tags': tags}
+                    tokens, tags = [], []
+                continue
+            tok, tag = line.split()
+            tokens.append(tok); tags.append(tag)
+    if tokens:
+        yield {'tokens': tokens, 'ner_tags': tags}
+
+
+def split_indices(n: int, dev_frac: float = 0.2, seed: int = 42) -> Tuple[List[int], List[int]]:
+    """Return sorted ``(train, dev)`` index lists of a seeded shuffle of ``range(n)``."""
+    idx = list(range(n))
+    random.Random(seed).shuffle(idx)
+    m = int((1 - dev_frac) * n)
+    return sorted(idx[:m]), sorted(idx[m:])
@@ -0,0 +1,169 @@
+"""Incremental re-extraction of editais republished with small corrections.
+
+Next to each output a state file (``<out>.state.json``) keeps what the last
+run saw and decided:
+
+* every page's :func:`~cne_ml_extractor.page_cache.page_digest` with its
+  extracted lines, so unchanged pages are neither extracted nor OCRed again;
+* every line's :class:`~cne_ml_extractor.pipeline_ml.LineResult`, keyed by
+  a hash of the line (text and layout features).  Labelling a line does not
+  depend on its neighbours, so only lines never seen before go through
+  :func:`~cne_ml_extractor.pipeline_ml.infer_lines`;
+* the rows, plus a :class:`~cne_ml_extractor.pipeline_ml.ListState`
+  snapshot taken before each list header.  The state machine is replayed
+  from the last header at or before the first line whose result changed,
+  and the rows before that header are kept as they were.
+
+The state is only reused when the settings that shape the results (model
+fingerprint, thresholds, rules, layout, DTMNFR, details...) are unchanged;
+otherwise the run starts from scratch, like a full rerun.
+"""
+from __future__ import annotations
+import hashlib, json, os, tempfile
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .cascade import load_first_stage
+from .layout import LayoutLine
+from .page_cache import CACHE_VERSION, PageCache, page_digest
+from .pipeline_ml import (DETAIL_HEADER, HEADER, ListState, LineResult, bump, conf_thresholds, infer_lines,
+                          iter_numbered_lines)
+from .profiling import active, stage
+from .utils import OCR_LANG, cached_page_to_lines, fitz
+from .writers import open_writer, output_path
+
+STATE_VERSION = 1
+STATE_SUFFIX = ".state.json"
+
+
+def state_path(out_path: str) -> str:
+    return out_path + STATE_SUFFIX
+
+
+def line_key(line) -> str:
+    """Hash of one normalised line, layout features included."""
+    return hashlib.sha1(json.dumps(line, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def settings_key(ml, settings: dict) -> str:
+    payload = dict(settings, version=STATE_VERSION, model=getattr(ml, "fingerprint", type(ml).__name__))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def load_state(path: str, key: str) -> Optional[dict]:
+    """The state saved at ``path`` if it was written with the same settings ``key``."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("settings") == key else None
+
+
+def save_state(path: str, state: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def extract_changed_pages(pdf_path: str, previous: Dict[str, list], lang: str = OCR_LANG, dpi: Optional[int] = None,
+                          cache: Optional[PageCache] = None, layout: bool = False,
+                          stats: Optional[dict] = None) -> Tuple[List[str], List[list]]:
+    """Return ``(digests, pages)``, taking the lines of pages whose digest is in ``previous`` from there."""
+    digests, pages = [], []
+    with stage("open"):
+        doc = fitz.open(pdf_path)
+    with doc:
+        for page in doc:
+            digest = page_digest(doc, page)
+            lines = previous.get(digest)
+            if lines is None:
+                lines = cached_page_to_lines(doc, page, lang=lang, dpi=dpi, cache=cache, layout=layout)
+                bump(stats, "pages_extracted")
+            else:
+                lines = [LayoutLine(*ln) if isinstance(ln, list) else ln for ln in lines]
+                bump(stats, "pages_reused")
+            digests.append(digest)
+            pages.append(lines)
+    return digests, pages
+
+
+def first_change(old: Sequence[list], new: Sequence[list]) -> int:
+    """Index of the first entry that differs between ``old`` and ``new`` (their common length if none)."""
+    for i, (a, b) in enumerate(zip(old, new)):
+        if a != b:
+            return i
+    return min(len(old), len(new))
+
+
+def process_pdf_incremental(pdf_path: str, dtmnfr: str, out_path: str, ml, batch_size: int = 64,
+                            rules_first: bool = False, stats: Optional[dict] = None,
+                            page_cache: Optional[PageCache] = None, layout: bool = False,
+                            out_format: Optional[str] = None, details: bool = False,
+                            partition_by: Sequence[str] = (), conf_thr=None,
+                            first_stage_dir: Optional[str] = None, state_file: Optional[str] = None) -> str:
+    """Extract ``pdf_path`` into ``out_path`` reusing what the previous run of the same output left behind.
+
+    Writes the same output as a full run; ``stats`` gets ``pages_reused``,
+    ``lines_reused``, ``rows_reused`` and ``replayed_lines`` on top of the
+    usual counters.  Called by
+    :func:`~cne_ml_extractor.pipeline_ml.process_pdf_to_csv` with ``incremental=True``.
+    """
+    conf = conf_thresholds(ml, conf_thr)
+    state_file = state_file or state_path(out_path)
+    first_stage = load_first_stage(first_stage_dir) if first_stage_dir else None
+    settings = {"dtmnfr": dtmnfr, "rules_first": rules_first, "layout": layout, "details": details,
+                "extract": CACHE_VERSION, "conf": [conf.values, repr(conf.default)],
+                "first_stage": os.path.abspath(first_stage_dir) if first_stage_dir else None,
+                "cascade": repr(getattr(ml, "cascade_thr", None)) if first_stage_dir else None}
+    key = settings_key(ml, settings)
+    prev = load_state(state_file, key) or {"pages": [], "lines": [], "rows": [], "checkpoints": []}
+
+    prof = active()
+    with (prof.document(pdf_path) if prof is not None else nullcontext({})) as doc:
+        digests, pages = extract_changed_pages(pdf_path, dict(prev["pages"]), cache=page_cache, layout=layout,
+                                               stats=stats)
+        numbered = list(iter_numbered_lines(pages))
+        keys = [line_key(line) for _, _, line in numbered]
+        known = {entry[2]: LineResult(*entry[3:]) for entry in prev["lines"]}
+        todo = [i for i, k in enumerate(keys) if k not in known]
+        fresh = infer_lines(ml, [numbered[i][2] for i in todo], batch_size=batch_size, rules_first=rules_first,
+                            stats=stats, conf_thr=conf, first_stage=first_stage)
+        new_results = dict(zip(todo, fresh))
+        results = [new_results[i] if i in new_results else known[k] for i, k in enumerate(keys)]
+        bump(stats, "lines", len(keys) - len(todo))
+        bump(stats, "lines_reused", len(keys) - len(todo))
+
+        lines = [[p, n, k, *res] for (p, n, _), k, res in zip(numbered, keys, results)]
+        start = first_change(prev["lines"], lines)
+        checkpoints = [cp for cp in prev["checkpoints"] if cp[0] <= start]
+        state = ListState(dtmnfr, conf)
+        rows: List[list] = []
+        if start == len(prev["lines"]) == len(lines):
+            rows, replay_from = prev["rows"], len(lines)  # nothing changed
+        elif checkpoints:
+            replay_from, n_rows, snapshot = checkpoints.pop()
+            state.restore(snapshot)
+            rows = prev["rows"][:n_rows]
+        else:
+            replay_from = 0
+        bump(stats, "rows_reused", len(rows))
+        bump(stats, "replayed_lines", len(lines) - replay_from)
+        for i in range(replay_from, len(lines)):
+            before, opened = state.snapshot(), state.lists
+            row = state.feed(results[i])
+            if state.lists != opened:
+                checkpoints.append([i, len(rows), before])
+            if row is not None:
+                rows.append(row + [lines[i][0], lines[i][1], round(results[i].prob, 4)] if details else row)
+        bump(stats, "rows", len(rows))
+
+        with open_writer(out_path, HEADER + DETAIL_HEADER if details else HEADER, fmt=out_format,
+                         partition_by=partition_by) as w, stage("write"):
+            w.write(rows)
+        save_state(state_file, {"settings": key, "pages": [[d, p] for d, p in zip(digests, pages)],
+                                "lines": lines, "rows": rows, "checkpoints": checkpoints})
+        doc["rows"] = len(rows)
+    return output_path(out_path, partition_by)
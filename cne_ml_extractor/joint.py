@@ -0,0 +1,81 @@
+"""Shared-encoder model with a line-label head and a NOME token-tagging head."""
+from __future__ import annotations
+import json, os
+from typing import Sequence
+
+import torch
+from transformers import AutoModel
+
+JOINT_CONFIG = "joint.json"
+JOINT_HEADS = "joint_heads.pt"
+
+
+def is_joint_dir(model_dir: str) -> bool:
+    return os.path.exists(os.path.join(model_dir, JOINT_CONFIG))
+
+
+class JointLineNerModel(torch.nn.Module):
+    """XLM-R encoder feeding a sequence-classification and a token-classification head.
+
+    One forward pass gives both the line label (from the ``<s>`` token) and
+    the per-token B-/I-NOME tags, so CANDIDATO lines are encoded only once.
+    ``line_weight`` balances the two losses during training.
+    """
+
+    def __init__(self, encoder, line_labels: Sequence[str], ner_labels: Sequence[str], dropout: float = 0.1,
+                 line_weight: float = 1.0):
+        super().__init__()
+        self.encoder = encoder
+        self.line_labels = list(line_labels)
+        self.ner_labels = list(ner_labels)
+        self.line_weight = line_weight
+        hidden = encoder.config.hidden_size
+        self.dropout = torch.nn.Dropout(dropout)
+        self.line_dense = torch.nn.Linear(hidden, hidden)
+        self.line_out = torch.nn.Linear(hidden, len(self.line_labels))
+        self.ner_out = torch.nn.Linear(hidden, len(self.ner_labels))
+
+    @property
+    def config(self):
+        return self.encoder.config
+
+    def forward(self, input_ids, attention_mask=None, line_labels=None, ner_labels=None, **kwargs):
+        hidden = self.dropout(self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state)
+        line_logits = self.line_out(self.dropout(torch.tanh(self.line_dense(hidden[:, 0]))))
+        ner_logits = self.ner_out(hidden)
+        out = {"line_logits": line_logits, "ner_logits": ner_logits}
+        if line_labels is not None or ner_labels is not None:
+            loss = line_logits.new_zeros(())
+            if line_labels is not None:
+                loss = loss + self.line_weight * torch.nn.functional.cross_entropy(line_logits, line_labels)
+            if ner_labels is not None and bool((ner_labels != -100).any()):
+                loss = loss + torch.nn.functional.cross_entropy(
+                    ner_logits.reshape(-1, ner_logits.shape[-1]), ner_labels.reshape(-1), ignore_index=-100)
+            out["loss"] = loss
+        return out
+
+    @classmethod
+    def from_encoder(cls, encoder_name: str, line_labels: Sequence[str], ner_labels: Sequence[str], **kwargs):
+        return cls(AutoModel.from_pretrained(encoder_name), line_labels, ner_labels, **kwargs)
+
+    def save_pretrained(self, model_dir: str) -> None:
+        os.makedirs(model_dir, exist_ok=True)
+        self.encoder.save_pretrained(model_dir)
+        heads = {k: v for k, v in self.state_dict().items() if not k.startswith("encoder.")}
+        torch.save(heads, os.path.join(model_dir, JOINT_HEADS))
+        with open(os.path.join(model_dir, JOINT_CONFIG), "w", encoding="utf-8") as f:
+            json.dump({"line_labels": self.line_labels, "ner_labels": self.ner_labels}, f, indent=2)
+
+    @classmethod
+    def from_pretrained(cls, model_dir: str) -> "JointLineNerModel":
+        with open(os.path.join(model_dir, JOINT_CONFIG), encoding="utf-8") as f:
+            cfg = json.load(f)
+        model = cls(AutoModel.from_pretrained(model_dir), cfg["line_labels"], cfg["ner_labels"])
+        heads = torch.load(os.path.join(model_dir, JOINT_HEADS), map_location="cpu")
+        # the encoder weights were loaded above; only the heads come from JOINT_HEADS
+        result = model.load_state_dict(heads, strict=False)
+        missing = [k for k in result.missing_keys if not k.startswith("encoder.")]
+        if missing or result.unexpected_keys:
+            raise ValueError(f"{JOINT_HEADS} in {model_dir} does not match the model: "
+                             f"missing {missing}, unexpected {result.unexpected_keys}")
+        return model
@@ -0,0 +1,150 @@
+"""Layout-aware line extraction from the PyMuPDF text layer.
+
+``page.get_text("text")`` returns text in content-stream order: multi-column
+editais interleave their columns, the number of a candidate often comes out
+on a line of its own, and a name that wraps becomes two lines.
+:func:`page_layout_lines` rebuilds the visual rows from the span positions of
+``page.get_text("dict")`` instead, reads the columns one after the other and
+glues wrapped names back onto their numbered row. Each row keeps a few cheap
+structural features (bold, indentation, numbering gutter) that the pipeline
+can use to settle lines without a model call.
+"""
+from __future__ import annotations
+import re
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple
+
+BOLD_FLAG = 16  # fitz.TEXT_FONT_BOLD
+MIN_COLUMN_WIDTH = 0.15  # fraction of the page width a text column spans at least
+
+_NUMBER = re.compile(r"^\d+[\.\-ºo]{0,3}(?:\s|$)")
+
+
+class LayoutLine(NamedTuple):
+    """One visual row of a page and its structural features (lengths in points)."""
+    text: str
+    x0: float = 0.0
+    indent: float = 0.0  # x0 minus the left edge of the row's column
+    bold: bool = False
+    numbered: bool = False  # starts with a number sitting in the column's numbering gutter
+    column: int = 0  # -1 for rows spanning several columns
+    size: float = 0.0
+
+
+class _Frag(NamedTuple):
+    x0: float
+    x1: float
+    y: float  # baseline
+    size: float
+    text: str
+    bold: bool
+
+
+def _fragments(page) -> List[_Frag]:
+    frags = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", ()):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join("".join(s["text"] for s in line["spans"]).split())
+            bold = all(s["flags"] & BOLD_FLAG or "bold" in s["font"].lower() for s in spans)
+            x0, _, x1, _ = line["bbox"]
+            frags.append(_Frag(x0, x1, spans[0]["origin"][1], max(s["size"] for s in spans), text, bold))
+    return frags
+
+
+def _columns(frags: List[_Frag], page_width: float, tol: float) -> List[tuple]:
+    """Return the ``(x0, x1)`` ranges of the text columns, left to right."""
+    ranges: List[list] = []
+    for f in sorted(frags, key=lambda f: f.x0):
+        if f.x1 - f.x0 > page_width / 2:
+            continue  # full-width rows say nothing about columns
+        if ranges and f.x0 <= ranges[-1][1] + tol:
+            ranges[-1][1] = max(ranges[-1][1], f.x1)
+        else:
+            ranges.append([f.x0, f.x1])
+    cols = [tuple(r) for r in ranges if r[1] - r[0] >= MIN_COLUMN_WIDTH * page_width]
+    return cols or [(min(f.x0 for f in frags), max(f.x1 for f in frags))]
+
+
+def _column_of(f: _Frag, cols: List[tuple]) -> int:
+    if sum(1 for x0, x1 in cols if f.x0 < x1 and f.x1 > x0) > 1:
+        return -1
+    # narrow table cells to the right of a column belong to that column's rows
+    return max((i for i, (x0, _) in enumerate(cols) if x0 <= f.x0 + 1), default=0)
+
+
+def _isolated(f: _Frag, col: int, ys: Dict[int, List[float]]) -> bool:
+    """True when the other columns have text above and below ``f`` but none beside it.
+
+    Such a row (an órgão heading between two column blocks, say) ends one
+    band of columns and starts the next.
+    """
+    others = [v for c, v in ys.items() if c not in (col, -1)]
+    if not others:
+        return False
+    near = above = below = False
+    for v in others:
+        i = bisect_left(v, f.y - 2 * f.size)
+        near = near or (i < len(v) and v[i] <= f.y + 2 * f.size)
+        above = above or v[0] < f.y
+        below = below or v[-1] > f.y
+    return above and below and not near
+
+
+def _rows(frags: List[_Frag]) -> List[List[_Frag]]:
+    rows: List[List[_Frag]] = []
+    for f in sorted(frags, key=lambda f: (f.y, f.x0)):
+        if rows and abs(f.y - rows[-1][0].y) <= 0.4 * f.size:
+            rows[-1].append(f)
+        else:
+            rows.append([f])
+    return [sorted(r, key=lambda f: f.x0) for r in rows]
+
+
+def page_layout_lines(page) -> List[LayoutLine]:
+    """Return the visual rows of ``page`` in reading order (empty when it has no text layer).
+
+    Rows that span several columns, or stand alone between two column blocks,
+    split the page into bands; inside a band each column is read top to bottom
+    before the next one.  An unnumbered, indented, non-bold row right below a
+    numbered one is taken as the rest of a wrapped name and appended to it.
+    """
+    frags = _fragments(page)
+    if not frags:
+        return []
+    size = sorted(f.size for f in frags)[len(frags) // 2]
+    cols = _columns(frags, page.rect.width, 2 * size)
+    placed = [(_column_of(f, cols), f) for f in frags]
+    ys: Dict[int, List[float]] = {}
+    for c, f in placed:
+        ys.setdefault(c, []).append(f.y)
+    for v in ys.values():
+        v.sort()
+    by_col: Dict[int, List[_Frag]] = {}
+    for c, f in placed:
+        by_col.setdefault(-1 if c != -1 and _isolated(f, c, ys) else c, []).append(f)
+
+    lefts = {i: min(f.x0 for f in fs) for i, fs in by_col.items()}
+    rows = [(c, r) for c, fs in by_col.items() for r in _rows(fs)]
+    breaks = sorted(r[0].y for c, r in rows if c == -1)
+    rows.sort(key=lambda cr: (bisect_left(breaks, cr[1][0].y), cr[0] == -1, cr[0], cr[1][0].y))
+
+    out: List[LayoutLine] = []
+    prev_y = None
+    for col, row in rows:
+        first = row[0]
+        text = " ".join(f.text for f in row)
+        indent = first.x0 - lefts[col]
+        line = LayoutLine(text, round(first.x0, 1), round(indent, 1), all(f.bold for f in row),
+                          bool(_NUMBER.match(text)) and indent < first.size, col, round(first.size, 1))
+        last = out[-1] if out else None
+        if (last is not None and last.numbered and not last.bold and last.column == col
+                and not line.numbered and not line.bold and line.indent > last.indent + first.size / 2
+                and first.y - prev_y <= 1.6 * first.size):
+            out[-1] = last._replace(text=f"{last.text} {text}")
+        else:
+            out.append(line)
+        prev_y = first.y
+    return out
@@ -0,0 +1,49 @@
+"""Deferred imports for heavy dependencies (torch, transformers, PyMuPDF, Tesseract).
+
+``fitz = lazy_import("fitz")`` binds a stand-in that imports the real module
+on first attribute access, so importing this package (for ``--help``, the web
+server or the regex helpers) does not pay for libraries it never touches.
+Attribute writes go to the real module, so ``monkeypatch.setattr(utils.fitz,
+"open", ...)`` keeps working.  ``python -m benchmarks.startup`` measures it.
+"""
+from __future__ import annotations
+import importlib, importlib.util
+from typing import Optional
+
+
+class LazyModule:
+    """Stand-in for module ``name``, imported the first time one of its attributes is used."""
+
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+
+    def _load(self):
+        return importlib.import_module(self._name)
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr: str) -> None:
+        delattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_import(name: str, optional: bool = False) -> Optional[LazyModule]:
+    """Return a :class:`LazyModule` for ``name``.
+
+    With ``optional`` a module that is not installed gives ``None`` instead;
+    that check only looks the module up, it does not import it.
+    """
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
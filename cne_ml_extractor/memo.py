@@ -0,0 +1,163 @@
+"""Memo of per-line inference results, keyed by normalized text and model fingerprint.
+
+Editais repeat section headers, list headers and page footers many times, so
+:class:`MLExtractor` looks each line up here before running a model.  A
+bounded in-memory LRU sits in front of an optional SQLite file that can be
+shared by the workers of a batch run and across runs.
+"""
+from __future__ import annotations
+import hashlib, json, os, sqlite3, threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MEMO_VERSION = 1
+# model files whose size/mtime go into the fingerprint besides the config
+_WEIGHT_SUFFIXES = (".safetensors", ".bin", ".onnx", ".npz", ".pt")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace; the tokenizers and ``str.split`` ignore it anyway."""
+    return " ".join(text.split())
+
+
+def model_fingerprint(*model_dirs: str, **settings) -> str:
+    """Hash the configs and weight file sizes/mtimes of ``model_dirs`` plus ``settings``.
+
+    Weights are not read (they can be >1 GB); retraining or re-exporting
+    rewrites them, which changes their mtime and so the fingerprint.
+    """
+    h = hashlib.sha256(f"v{MEMO_VERSION}".encode())
+    for model_dir in model_dirs:
+        h.update(b"\0dir")
+        for root, _, files in sorted(os.walk(model_dir)):
+            for fn in sorted(files):
+                path = os.path.join(root, fn)
+                rel = os.path.relpath(path, model_dir).encode()
+                if fn.endswith(".json"):
+                    with open(path, "rb") as f:
+                        h.update(rel + b"\0" + f.read())
+                elif fn.endswith(_WEIGHT_SUFFIXES):
+                    st = os.stat(path)
+                    h.update(rel + f"\0{st.st_size}\0{st.st_mtime_ns}".encode())
+    for k in sorted(settings):
+        h.update(f"\0{k}={settings[k]}".encode())
+    return h.hexdigest()[:32]
+
+
+class InferenceMemo:
+    """Thread-safe LRU of inference results with an optional SQLite tier.
+
+    Keys are ``(fingerprint, kind, normalized text)``; ``kind`` separates the
+    line classifier (``"line"``), the NER (``"nome"``) and joint results.
+    Values must be JSON-serialisable; tuples come back as tuples.
+    """
+
+    def __init__(self, max_size: int = 100_000, path: Optional[str] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.max_size = max_size
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = self.disk_hits = self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(fingerprint: str, kind: str, text: str) -> str:
+        return f"{fingerprint}:{kind}:{normalize_text(text)}"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, object]:
+        """Return the cached values for ``keys``; missing keys are left out."""
+        found: Dict[str, object] = {}
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                else:
+                    missing.append(key)
+            if missing and self._db is not None:
+                for start in range(0, len(missing), 500):
+                    part = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, value FROM memo WHERE key IN ({','.join('?' * len(part))})", part)
+                    for key, value in rows:
+                        found[key] = self._decode(value)
+                        self._remember(key, found[key])
+                        self.disk_hits += 1
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, object]]) -> None:
+        items = list(items)
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value)
+            if self._db is not None and items:
+                self._db.executemany("INSERT OR REPLACE INTO memo (key, value) VALUES (?, ?)",
+                                     [(key, json.dumps(value, ensure_ascii=False)) for key, value in items])
+                self._db.commit()
+
+    def _remember(self, key: str, value: object) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _decode(value: str) -> object:
+        obj = json.loads(value)
+        return tuple(obj) if isinstance(obj, list) else obj
+
+    def lookup(self, fingerprint: str, kind: str, lines: Sequence[str], compute) -> List:
+        """Return one result per line, calling ``compute`` only on unseen texts.
+
+        ``compute`` receives one representative line per missing key (so a
+        text repeated within ``lines`` is also computed once) and must return
+        its results in the same order.
+        """
+        keys = [self.make_key(fingerprint, kind, line) for line in lines]
+        found = self.get_many(keys)
+        todo: Dict[str, str] = {}
+        for key, line in zip(keys, lines):
+            if key not in found and key not in todo:
+                todo[key] = line
+        with self._lock:
+            self.hits += len(keys) - len(todo)
+            self.misses += len(todo)
+        if todo:
+            computed = list(zip(todo, compute(list(todo.values()))))
+            self.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of looked-up lines that needed no model call (``disk_hits`` included)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"memo_hits": self.hits, "memo_disk_hits": self.disk_hits, "memo_misses": self.misses,
+                "memo_hit_rate": round(self.hit_rate, 4), "memo_size": len(self)}
+
+    def clear(self) -> None:
+        """Drop the in-memory entries (the SQLite file is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
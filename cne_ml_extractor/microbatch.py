@@ -0,0 +1,154 @@
+"""Cross-request micro-batching in front of :class:`~cne_ml_extractor.ml_infer.MLExtractor`.
+
+Concurrent callers (web server jobs, threads of one process) each hand over a
+few lines; a dispatcher thread per method gathers them for at most
+``max_latency_ms`` or until ``max_batch_size`` lines are pending, runs one
+padded forward pass and hands each caller back its slice of the results.
+A batch's model stages (``tokenize``, ``forward``, ``ner``...) are recorded
+in the profiler of the first profiled caller in it, so summed profiles count
+every forward pass once.
+"""
+from __future__ import annotations
+import queue, threading, time
+from typing import Dict, List, Optional, Sequence
+
+from .profiling import active, profiled, stage
+
+BATCHED_METHODS = ("classify_lines", "extract_nomes", "classify_and_extract_lines")
+
+
+class _Pending:
+    __slots__ = ("lines", "profiler", "done", "result", "error")
+
+    def __init__(self, lines: Sequence[str]):
+        self.lines = lines
+        self.profiler = active()  # the dispatcher thread does not inherit the caller's context
+        self.done = threading.Event()
+        self.result: Optional[list] = None
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """Drop-in wrapper that merges concurrent batched calls into shared forward passes.
+
+    Only :data:`BATCHED_METHODS` are scheduled; every other attribute is read
+    from the wrapped extractor.  A caller that arrives alone waits at most
+    ``max_latency_ms`` before its lines run, and a request that already fills
+    ``max_batch_size`` runs at once.  Model calls are serialised per method,
+    which also keeps concurrent jobs from oversubscribing torch's threads.
+    """
+
+    def __init__(self, ml, max_batch_size: int = 64, max_latency_ms: float = 2.0):
+        if max_batch_size < 1 or max_latency_ms < 0:
+            raise ValueError("max_batch_size must be >= 1 and max_latency_ms >= 0")
+        self.ml = ml
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._lock = threading.Lock()
+        self._queues: Dict[str, "queue.Queue[Optional[_Pending]]"] = {}
+        self._threads: List[threading.Thread] = []
+        self.requests = self.batches = self.items = 0
+
+    def __getattr__(self, name):
+        # only reached for attributes not set in __init__
+        return getattr(self.ml, name)
+
+    def classify_lines(self, lines: Sequence[str], batch_size: int = 64):
+        return self._submit("classify_lines", lines)
+
+    def extract_nomes(self, lines: Sequence[str], batch_size: int = 64):
+        return self._submit("extract_nomes", lines)
+
+    def classify_and_extract_lines(self, lines: Sequence[str], batch_size: int = 64):
+        return self._submit("classify_and_extract_lines", lines)
+
+    def classify_line(self, text: str):
+        return self.classify_lines([text])[0]
+
+    def extract_nome(self, text: str):
+        return self.extract_nomes([text])[0]
+
+    def _submit(self, method: str, lines: Sequence[str]) -> list:
+        if not lines:
+            return []
+        pending = _Pending(list(lines))
+        with stage("microbatch"):
+            self._queue(method).put(pending)
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _queue(self, method: str) -> "queue.Queue[Optional[_Pending]]":
+        with self._lock:
+            q = self._queues.get(method)
+            if q is None:
+                q = self._queues[method] = queue.Queue()
+                t = threading.Thread(target=self._dispatch, args=(method, q), name=f"microbatch-{method}",
+                                     daemon=True)
+                t.start()
+                self._threads.append(t)
+            return q
+
+    def _collect(self, q: "queue.Queue[Optional[_Pending]]", first: _Pending) -> tuple:
+        """Gather requests after ``first`` until the batch is full or the latency budget is spent."""
+        batch, n = [first], len(first.lines)
+        deadline = time.monotonic() + self.max_latency
+        stop = False
+        while n < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = q.get(timeout=timeout) if timeout > 0 else q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+            n += len(item.lines)
+        return batch, stop
+
+    def _dispatch(self, method: str, q: "queue.Queue[Optional[_Pending]]") -> None:
+        fn = getattr(self.ml, method)
+        while True:
+            first = q.get()
+            if first is None:
+                return
+            batch, stop = self._collect(q, first)
+            lines = [line for p in batch for line in p.lines]
+            prof = next((p.profiler for p in batch if p.profiler is not None), None)
+            try:
+                with profiled(prof):
+                    results = fn(lines, batch_size=self.max_batch_size)
+            except BaseException as exc:  # handed to every caller of this batch
+                for p in batch:
+                    p.error = exc
+                    p.done.set()
+            else:
+                start = 0
+                for p in batch:
+                    p.result = results[start:start + len(p.lines)]
+                    start += len(p.lines)
+                    p.done.set()
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.items += len(lines)
+            if stop:
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "batches": self.batches, "items": self.items,
+                    "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0}
+
+    def close(self) -> None:
+        """Stop the dispatcher threads once the requests already queued have run."""
+        with self._lock:
+            queues, threads = list(self._queues.values()), list(self._threads)
+            self._queues.clear()
+            self._threads.clear()
+        for q in queues:
+            q.put(None)
+        for t in threads:
+            t.join()
@@ -1,59 +1,428 @@
 from __future__ import annotations
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoModelForTokenClassification
+import copy, os, threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Callable, Hashable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .cascade import Thresholds, as_thresholds, load_thresholds
+from .lazy import lazy_import
+from .memo import InferenceMemo, model_fingerprint
+from .profiling import stage
+from .student import HashedNgramClassifier, is_student_dir
+
+# imported on first use, so the pipeline and CLIs start without loading them
+torch = lazy_import("torch")
+transformers = lazy_import("transformers")
 
 LABELS = ["OUTRO","SECAO","HEADER_LISTA","CANDIDATO"]
 
+DTYPES = ("float32", "float16", "bfloat16")
+
+# "torch": full-precision PyTorch; "torch-int8": dynamically quantized Linear
+# layers (CPU); "onnx"/"onnx-int8": graphs written by ml/export_onnx.py.
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ONNX_SUBDIR = "onnx"
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+class OnnxModel:
+    """Stand-in for a transformers model that runs an exported ONNX graph.
+
+    Called like the torch model (``model(**enc).logits``) and exposes its
+    ``config``, so the rest of :class:`MLExtractor` does not care which
+    backend produced the logits.
+    """
+
+    def __init__(self, model_dir: str, backend: str = "onnx", threads: Optional[int] = None):
+        import onnxruntime as ort
+
+        path = os.path.join(model_dir, ONNX_SUBDIR, ONNX_FILES[backend])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; run ml/export_onnx.py first")
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.config = transformers.AutoConfig.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, **enc):
+        feeds = {k: v.cpu().numpy() for k, v in enc.items() if k in self.input_names}
+        logits = self.session.run(["logits"], feeds)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+def load_model(model_cls, model_dir: str, device: str = "cpu", dtype: str = "float32", backend: str = "torch"):
+    """Load a classification model for ``backend`` ready for inference."""
+    if backend in ONNX_FILES:
+        if device != "cpu" or dtype != "float32":
+            raise ValueError(f"backend {backend!r} runs on cpu/float32 only")
+        return OnnxModel(model_dir, backend=backend, threads=torch.get_num_threads())
+    model = model_cls.from_pretrained(model_dir)
+    if backend == "torch-int8":
+        if device != "cpu" or dtype != "float32":
+            raise ValueError("backend 'torch-int8' runs on cpu/float32 only")
+        return torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    return model.to(device=device, dtype=getattr(torch, dtype)).eval()
+
+def line_probs(tok, model, lines: Sequence[str], batch_size: int = 64, device: str = "cpu") -> torch.Tensor:
+    """Softmax over the line classifier's logits for ``lines``, shape ``(len(lines), n_labels)``.
+
+    Lines are tokenized once, sorted by token length and padded per batch
+    only up to the longest member; rows come back in input order.
+    """
+    with stage("tokenize"):
+        enc = tok(list(lines), truncation=True)
+    input_ids = enc["input_ids"]
+    order = sorted(range(len(lines)), key=lambda i: len(input_ids[i]))
+    out = None
+    with torch.no_grad(), stage("forward"):
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            batch = tok.pad({key: [enc[key][i] for i in chunk] for key in enc.keys()},
+                            return_tensors="pt").to(device)
+            probs = torch.softmax(model(**batch).logits.float(), dim=-1).cpu()
+            if out is None:
+                out = torch.empty(len(lines), probs.shape[-1])
+            out[chunk] = probs
+    return out
+
+
+def label_names(config) -> List[str]:
+    """Label of each logit column of a line model with ``config``, from its ``id2label``.
+
+    ``ml/train_line_cls.py`` numbers the labels in sorted order, which is not
+    the order of :data:`LABELS`; configs without named labels (``LABEL_0``...)
+    are taken to follow :data:`LABELS`.
+    """
+    id2label = {int(k): v for k, v in (getattr(config, "id2label", None) or {}).items()}
+    names = [id2label.get(i) for i in range(len(id2label))]
+    return names if sorted(names, key=str) == sorted(LABELS) else list(LABELS)
+
+
+def label_columns(config) -> List[int]:
+    """Logit column of each of :data:`LABELS`, in that order, for a line model with ``config``."""
+    names = label_names(config)
+    return [names.index(label) for label in LABELS]
+
+
+def decode_nome(words: List[str], word_ids, logits, id2label) -> Optional[str]:
+    """Turn per-token NER logits into the first B-/I- span of ``words``."""
+    tags = []
+    seen_word_idx = set()
+    for idx, word_idx in enumerate(word_ids):
+        if word_idx is None or word_idx in seen_word_idx:
+            continue
+        seen_word_idx.add(word_idx)
+        tag_id = int(logits[idx].argmax().item())
+        tags.append(id2label.get(tag_id, "O"))
+
+    tags = tags[: len(words)]
+    nome_tokens = []
+    collecting = False
+    for w, t in zip(words, tags):
+        if t.startswith("B-"):
+            nome_tokens = [w]; collecting = True
+        elif t.startswith("I-") and collecting:
+            nome_tokens.append(w)
+        elif collecting:
+            break
+    return " ".join(nome_tokens) if nome_tokens else None
+
+
 class MLExtractor:
-    def __init__(self, line_model_dir: str, ner_model_dir: str, device: str = "cpu", conf_thr: float = 0.55):
+    """Line classifier and NOME tagger behind one batched interface.
+
+    ``conf_thr`` (one value, or one per label) overrides the ``accept``
+    thresholds of the line model's ``thresholds.json``; its ``cascade``
+    thresholds are kept in :attr:`cascade_thr` (see :mod:`~cne_ml_extractor.cascade`).
+    """
+
+    def __init__(self, line_model_dir: str, ner_model_dir: str, device: str = "cpu",
+                 conf_thr: Union[float, Mapping[str, float], None] = None,
+                 dtype: str = "float32", backend: str = "torch", memo: Optional[InferenceMemo] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"unsupported dtype {dtype!r}; expected one of {sorted(DTYPES)}")
+        if backend not in BACKENDS:
+            raise ValueError(f"unsupported backend {backend!r}; expected one of {list(BACKENDS)}")
         self.dev = device
-        self.conf_thr = conf_thr
-        self.tok_line = AutoTokenizer.from_pretrained(line_model_dir)
-        self.m_line   = AutoModelForSequenceClassification.from_pretrained(line_model_dir).to(device).eval()
-        self.tok_ner  = AutoTokenizer.from_pretrained(ner_model_dir)
-        self.m_ner    = AutoModelForTokenClassification.from_pretrained(ner_model_dir).to(device).eval()
+        self.dtype = dtype
+        self.backend = backend
+        calibrated = load_thresholds(line_model_dir)
+        self.conf_thr = as_thresholds(conf_thr) if conf_thr is not None else calibrated.get("accept", Thresholds())
+        self.cascade_thr: Optional[Thresholds] = calibrated.get("cascade")
+        self.memo = memo
+        self._model_dirs = (line_model_dir, ner_model_dir)
+        self._fingerprint: Optional[str] = None
         self.softmax  = torch.nn.Softmax(dim=-1)
+        self.line_student = self.joint = self.tok_joint = None
+        self.tok_line = self.m_line = self.tok_ner = self.m_ner = None
+        from .joint import JointLineNerModel, is_joint_dir  # needs torch, like everything below
+        if is_joint_dir(line_model_dir):
+            # One encoder gives label and NOME (ml/train_joint.py); ner_model_dir is not used.
+            if backend not in ("torch", "torch-int8"):
+                raise ValueError(f"backend {backend!r} does not support joint models")
+            self.tok_joint = transformers.AutoTokenizer.from_pretrained(line_model_dir)
+            joint = JointLineNerModel.from_pretrained(line_model_dir).eval()
+            if backend == "torch-int8":
+                self.joint = torch.ao.quantization.quantize_dynamic(joint, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                self.joint = joint.to(device=device, dtype=getattr(torch, dtype))
+            self._model_dirs = (line_model_dir,)
+            return
+        # A distilled student (ml/distill_line_cls.py) replaces the transformer line classifier.
+        self.line_student = HashedNgramClassifier.load(line_model_dir) if is_student_dir(line_model_dir) else None
+        if self.line_student is None:
+            self.tok_line = transformers.AutoTokenizer.from_pretrained(line_model_dir)
+            self.m_line   = load_model(transformers.AutoModelForSequenceClassification, line_model_dir, device, dtype, backend)
+            self.line_labels = label_names(self.m_line.config)
+        self.tok_ner  = transformers.AutoTokenizer.from_pretrained(ner_model_dir)
+        self.m_ner    = load_model(transformers.AutoModelForTokenClassification, ner_model_dir, device, dtype, backend)
+
+    @property
+    def single_pass(self) -> bool:
+        """True when :meth:`classify_and_extract_lines` costs one forward pass per line."""
+        return self.joint is not None
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the loaded models and settings in :attr:`memo` keys."""
+        if self._fingerprint is None:
+            self._fingerprint = model_fingerprint(*self._model_dirs, device=self.dev, dtype=self.dtype,
+                                                  backend=self.backend)
+        return self._fingerprint
+
+    def _memoized(self, kind: str, lines: Sequence[str], compute):
+        if self.memo is None:
+            return compute(lines)
+        return self.memo.lookup(self.fingerprint, kind, lines, compute)
+
+    def warm_up(self, text: str = "1. João Silva") -> None:
+        """Run one dummy pass through both models so the first real line is not slow."""
+        self.classify_line(text)
+        self.extract_nome(text)
 
     def classify_line(self, text: str):
-        with torch.no_grad():
+        if self.joint is not None or self.memo is not None:
+            return self.classify_lines([text])[0]
+        if self.line_student is not None:
+            with stage("forward"):
+                return self.line_student.classify_lines([text])[0]
+        with torch.no_grad(), stage("forward"):
             enc = self.tok_line(text, return_tensors="pt", truncation=True).to(self.dev)
-            logits = self.m_line(**enc).logits
+            logits = self.m_line(**enc).logits.float()
             probs = self.softmax(logits)[0].cpu().tolist()
             idx = int(logits.argmax(-1).item())
-            return LABELS[idx], float(probs[idx])
+            return self.line_labels[idx], float(probs[idx])
+
+    def classify_lines(self, lines: Sequence[str], batch_size: int = 64) -> List[Tuple[str, float]]:
+        """Batched :meth:`classify_line`, returning one ``(label, prob)`` per line.
+
+        Lines are tokenized once, sorted by token length and padded per batch
+        only up to the longest member, so short lines do not pay for long ones.
+        """
+        if self.joint is not None:
+            return [res[:2] for res in self.classify_and_extract_lines(lines, batch_size=batch_size)]
+        return self._memoized("line", lines, lambda todo: self._classify_lines(todo, batch_size))
+
+    def _classify_lines(self, lines: Sequence[str], batch_size: int = 64) -> List[Tuple[str, float]]:
+        if self.line_student is not None:
+            with stage("forward"):
+                return self.line_student.classify_lines(lines)
+        if not lines:
+            return []
+        probs = line_probs(self.tok_line, self.m_line, lines, batch_size=batch_size, device=self.dev)
+        best_probs, best_idx = probs.max(-1)
+        return [(self.line_labels[idx], float(prob)) for idx, prob in zip(best_idx.tolist(), best_probs.tolist())]
 
     def extract_nome(self, text: str):
+        if self.joint is not None or self.memo is not None:
+            return self.extract_nomes([text])[0]
         words = text.split()
         if not words:
             return None
-        with torch.no_grad():
+        with torch.no_grad(), stage("ner"):
             enc = self.tok_ner(
                 words,
                 is_split_into_words=True,
                 return_tensors="pt",
                 truncation=True,
             ).to(self.dev)
-            logits = self.m_ner(**enc).logits[0].cpu()
-            word_ids = enc.word_ids()
-            id2label = self.m_ner.config.id2label
-
-        tags = []
-        seen_word_idx = set()
-        for idx, word_idx in enumerate(word_ids):
-            if word_idx is None or word_idx in seen_word_idx:
-                continue
-            seen_word_idx.add(word_idx)
-            tag_id = int(logits[idx].argmax().item())
-            tags.append(id2label.get(tag_id, "O"))
-
-        tags = tags[: len(words)]
-        nome_tokens = []
-        collecting = False
-        for w, t in zip(words, tags):
-            if t.startswith("B-"):
-                nome_tokens = [w]; collecting = True
-            elif t.startswith("I-") and collecting:
-                nome_tokens.append(w)
-            elif collecting:
-                break
-        return " ".join(nome_tokens) if nome_tokens else None
+            logits = self.m_ner(**enc).logits[0].float().cpu()
+        return decode_nome(words, enc.word_ids(), logits, self.m_ner.config.id2label)
+
+    def extract_nomes(self, lines: Sequence[str], batch_size: int = 64) -> List[Optional[str]]:
+        """Batched :meth:`extract_nome`, padding each length-sorted batch dynamically."""
+        if self.joint is not None:
+            return [res[2] for res in self.classify_and_extract_lines(lines, batch_size=batch_size)]
+        return self._memoized("nome", lines, lambda todo: self._extract_nomes(todo, batch_size))
+
+    def _extract_nomes(self, lines: Sequence[str], batch_size: int = 64) -> List[Optional[str]]:
+        results: List[Optional[str]] = [None] * len(lines)
+        words = [line.split() for line in lines]
+        todo = [i for i, w in enumerate(words) if w]
+        if not todo:
+            return results
+        with stage("tokenize"):
+            enc = self.tok_ner([words[i] for i in todo], is_split_into_words=True, truncation=True)
+        input_ids = enc["input_ids"]
+        order = sorted(range(len(todo)), key=lambda j: len(input_ids[j]))
+        with torch.no_grad(), stage("ner"):
+            for start in range(0, len(order), batch_size):
+                chunk = order[start:start + batch_size]
+                batch = self.tok_ner.pad(
+                    {key: [enc[key][j] for j in chunk] for key in enc.keys()},
+                    return_tensors="pt",
+                ).to(self.dev)
+                logits = self.m_ner(**batch).logits.float().cpu()
+                for row, j in enumerate(chunk):
+                    i = todo[j]
+                    results[i] = decode_nome(words[i], enc.word_ids(j), logits[row], self.m_ner.config.id2label)
+        return results
+
+    def classify_and_extract(self, text: str) -> Tuple[str, float, Optional[str]]:
+        return self.classify_and_extract_lines([text])[0]
+
+    def classify_and_extract_lines(self, lines: Sequence[str],
+                                   batch_size: int = 64) -> List[Tuple[str, float, Optional[str]]]:
+        """Return ``(label, prob, nome)`` per line.
+
+        With a joint model both come from a single padded forward pass per
+        batch; otherwise the line classifier and NER run one after the other.
+        """
+        if self.joint is None:
+            labels = self.classify_lines(lines, batch_size=batch_size)
+            nomes = self.extract_nomes(lines, batch_size=batch_size)
+            return [(lbl, prob, nome) for (lbl, prob), nome in zip(labels, nomes)]
+        return self._memoized("joint", lines, lambda todo: self._joint_lines(todo, batch_size))
+
+    def _joint_lines(self, lines: Sequence[str], batch_size: int = 64) -> List[Tuple[str, float, Optional[str]]]:
+        results: List[Tuple[str, float, Optional[str]]] = [("OUTRO", 0.0, None)] * len(lines)
+        words = [line.split() for line in lines]
+        todo = [i for i, w in enumerate(words) if w]
+        if not todo:
+            return results
+        id2label = dict(enumerate(self.joint.ner_labels))
+        with stage("tokenize"):
+            enc = self.tok_joint([words[i] for i in todo], is_split_into_words=True, truncation=True)
+        input_ids = enc["input_ids"]
+        order = sorted(range(len(todo)), key=lambda j: len(input_ids[j]))
+        with torch.no_grad(), stage("joint"):
+            for start in range(0, len(order), batch_size):
+                chunk = order[start:start + batch_size]
+                batch = self.tok_joint.pad(
+                    {key: [enc[key][j] for j in chunk] for key in enc.keys()},
+                    return_tensors="pt",
+                ).to(self.dev)
+                out = self.joint(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"])
+                probs = self.softmax(out["line_logits"].float()).cpu()
+                best_probs, best_idx = probs.max(-1)
+                ner_logits = out["ner_logits"].float().cpu()
+                for row, j in enumerate(chunk):
+                    i = todo[j]
+                    nome = decode_nome(words[i], enc.word_ids(j), ner_logits[row], id2label)
+                    results[i] = (self.joint.line_labels[int(best_idx[row])], float(best_probs[row]), nome)
+        return results
+
+
+RegistryKey = Tuple[Hashable, ...]
+
+class ModelRegistry:
+    """Thread-safe LRU cache of loaded :class:`MLExtractor` instances.
+
+    Entries are keyed by the model directories, device, dtype and backend,
+    so a long batch run loads each pair of models once.  Only ``max_size``
+    extractors are kept resident; the least recently used one is dropped
+    when a new key is loaded.
+    """
+
+    def __init__(self, max_size: int = 2):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[RegistryKey, MLExtractor]" = OrderedDict()
+        self._loading: dict[RegistryKey, threading.Lock] = {}
+
+    @staticmethod
+    def make_key(line_model_dir: str, ner_model_dir: str, device: str = "cpu", dtype: str = "float32",
+                 factory: Optional[Callable[..., MLExtractor]] = None, backend: str = "torch") -> RegistryKey:
+        return (os.path.abspath(line_model_dir), os.path.abspath(ner_model_dir), device, dtype, backend,
+                factory or MLExtractor)
+
+    def get(self, line_model_dir: str, ner_model_dir: str, device: str = "cpu", dtype: str = "float32",
+            factory: Optional[Callable[..., MLExtractor]] = None, warm_up: bool = False,
+            backend: str = "torch") -> MLExtractor:
+        """Return the cached extractor for this key, loading it on first use.
+
+        Concurrent callers asking for the same key wait for a single load;
+        callers asking for other keys are not blocked by it.
+        """
+        factory = factory or MLExtractor
+        key = self.make_key(line_model_dir, ner_model_dir, device, dtype, factory, backend)
+        with self._lock:
+            ml = self._lookup(key)
+            if ml is not None:
+                return ml
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                ml = self._lookup(key)
+                if ml is not None:
+                    return ml
+            try:
+                ml = factory(line_model_dir, ner_model_dir, device=device, dtype=dtype, backend=backend)
+                if warm_up and hasattr(ml, "warm_up"):
+                    ml.warm_up()
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            with self._lock:
+                self._loading.pop(key, None)
+                self._entries[key] = ml
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            return ml
+
+    def _lookup(self, key: RegistryKey) -> Optional[MLExtractor]:
+        ml = self._entries.get(key)
+        if ml is not None:
+            self._entries.move_to_end(key)
+        return ml
+
+    def evict(self, line_model_dir: str, ner_model_dir: str, device: str = "cpu", dtype: str = "float32",
+              factory: Optional[Callable[..., MLExtractor]] = None, backend: str = "torch") -> bool:
+        key = self.make_key(line_model_dir, ner_model_dir, device, dtype, factory, backend)
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+REGISTRY = ModelRegistry()
+
+def get_extractor(line_model_dir: str = "models/line-cls-xlmr",
+                  ner_model_dir: str = "models/ner-nome-xlmr",
+                  device: str = "cpu", dtype: str = "float32",
+                  factory: Optional[Callable[..., MLExtractor]] = None,
+                  warm_up: bool = False, backend: str = "torch",
+                  memo: Optional[InferenceMemo] = None) -> MLExtractor:
+    """Return a shared extractor from the process-wide :data:`REGISTRY`.
+
+    A ``memo`` does not change results, so it is not part of the registry
+    key: the caller gets a shallow copy of the cached extractor that shares
+    its models and uses ``memo``, and the shared instance is left as is.
+    """
+    ml = REGISTRY.get(line_model_dir, ner_model_dir, device=device, dtype=dtype,
+                      factory=factory, warm_up=warm_up, backend=backend)
+    if memo is not None:
+        ml = copy.copy(ml)
+        ml.memo = memo
+    return ml
@@ -0,0 +1,119 @@
+"""On-disk cache of extracted page lines, keyed by page content and OCR settings."""
+from __future__ import annotations
+import hashlib, json, os, tempfile
+from typing import List, Optional
+
+CACHE_VERSION = 3  # 2: region OCR at adaptive DPI; 3: text-layer order kept, larger regions only
+DEFAULT_CACHE_DIR = os.environ.get(
+    "CNE_PAGE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "cne-ml-extractor", "pages"),
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def page_digest(doc, page) -> str:
+    """Hash everything the text layer and the rendered image of ``page`` depend on.
+
+    That is the page content stream, its geometry and the raw streams of the
+    images, fonts (with their ToUnicode maps) and form XObjects it uses.  Two
+    byte-identical pages share a digest even across different PDFs.
+    """
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents())
+    xrefs = {img[0] for img in page.get_images(full=True)}
+    xrefs |= {xo[0] for xo in page.get_xobjects()}
+    for font in page.get_fonts(full=True):
+        xrefs.add(font[0])
+        kind, value = doc.xref_get_key(font[0], "ToUnicode")
+        if kind == "xref":
+            xrefs.add(int(value.split()[0]))
+    for xref in sorted(x for x in xrefs if x > 0):
+        raw = doc.xref_stream_raw(xref)
+        h.update(raw if raw is not None else doc.xref_object(xref, compressed=True).encode())
+    return h.hexdigest()
+
+
+class PageCache:
+    """Content-addressed store of ``list[str]`` page lines with an LRU size cap.
+
+    Each entry is a small JSON file under ``root``; reading an entry bumps its
+    modification time, and once the directory grows past ``max_bytes`` the
+    least recently used entries are deleted.  Writes are atomic, so several
+    processes can share one cache directory.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def make_key(digest: str, **settings) -> str:
+        payload = json.dumps({"v": CACHE_VERSION, "page": digest, **settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return lines
+
+    def put(self, key: str, lines: List[str]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(lines, f, ensure_ascii=False)
+        try:
+            old = os.path.getsize(path)  # rewriting a key replaces its entry
+        except OSError:
+            old = 0
+        os.replace(tmp, path)
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += os.path.getsize(path) - old
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for fn in filenames:
+                if not fn.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, fn)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache is under ~90% of its cap."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
@@ -1,110 +1,547 @@
 from __future__ import annotations
-import os, csv, re
-from typing import Optional, List
+import os, re
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional, List, Sequence, Tuple, Union
 from .utils import (
     pdf_to_lines,
+    iter_pdf_lines,
     SEC_EFETIVOS,
     SEC_SUPLENTES,
     LINE_NUM,
     normalize_quotes_dashes,
     guess_sigla,
     sigla_from_lista,
+    rule_label,
+    layout_label,
 )
-from .ml_infer import MLExtractor
+from .cascade import DEFAULT_ACCEPT, Thresholds, as_thresholds, load_first_stage
+from .layout import LayoutLine
+from .ml_infer import MLExtractor, get_extractor
+from .page_cache import PageCache
+from .profiling import Profiler, active, profiled, stage
+from .writers import open_writer, output_path
 
 def ensure_dir(path: str):
     dir_path = os.path.dirname(path)
     os.makedirs(dir_path or ".", exist_ok=True)
 
-def process_pdf_to_csv(pdf_path: str, dtmnfr: str, out_csv: str,
-                       line_model_dir: str = "models/line-cls-xlmr",
-                       ner_model_dir: str = "models/ner-nome-xlmr",
-                       device: str = "cpu") -> str:
-    pages = pdf_to_lines(pdf_path)
-    ml = MLExtractor(line_model_dir, ner_model_dir, device=device, conf_thr=0.55)
+def orgao_marker(line: str) -> Optional[str]:
+    """Return ``"AM"``/``"CM"`` when ``line`` opens that órgão's section."""
+    upper_line = line.upper()
+    if re.search(r"\b1\.\s*ASSEMBLEIA\s+MUNICIPAL\b", upper_line, re.I):
+        return "AM"
+    if re.search(r"\b2\.\s*C[ÂA]MARA\s+MUNICIPAL\b", upper_line, re.I):
+        return "CM"
+    return None
 
-    current_sigla: Optional[str] = None
-    current_nome_lista: Optional[str] = None
-    orgao = "AM"
-    in_section: Optional[str] = None
-    seq_in_list = 0
+CONF_THR = DEFAULT_ACCEPT  # when neither ``conf_thr`` nor the model's thresholds.json sets one
+CASCADE_THR = 0.9  # first-stage probability that skips the full model when none was calibrated
+HEADER = ["DTMNFR","ORGAO","TIPO","SIGLA","SIMBOLO","NOME_LISTA","NUM_ORDEM","NOME_CANDIDATO","PARTIDO_PROPONENTE","INDEPENDENTE"]
+# with ``details``: 1-based page and line of the row in the PDF and the probability of the line's label
+DETAIL_HEADER = ["PAGINA", "LINHA", "CONFIANCA"]
 
-    rows: List[List] = []
-    header = ["DTMNFR","ORGAO","TIPO","SIGLA","SIMBOLO","NOME_LISTA","NUM_ORDEM","NOME_CANDIDATO","PARTIDO_PROPONENTE","INDEPENDENTE"]
+class LineResult(NamedTuple):
+    """Precomputed model output for one normalised line."""
+    text: str
+    orgao: Optional[str] = None
+    label: Optional[str] = None
+    prob: float = 0.0
+    nome: Optional[str] = None
 
-    for page_idx, lines in enumerate(pages):
-        for raw in lines:
-            line = normalize_quotes_dashes(raw.strip())
-            if not line:
-                continue
+DocLine = Tuple[int, int, Union[str, LayoutLine]]
 
-            upper_line = line.upper()
-            if re.search(r"\b1\.\s*ASSEMBLEIA\s+MUNICIPAL\b", upper_line, re.I):
-                orgao = "AM"
-                continue
-            if re.search(r"\b2\.\s*C[ÂA]MARA\s+MUNICIPAL\b", upper_line, re.I):
-                orgao = "CM"
-                continue
-            lbl, prob = ml.classify_line(line)
-
-            # secções
-            if lbl == "SECAO" and prob >= 0.55:
-                if SEC_EFETIVOS.search(line):
-                    in_section = "EFETIVOS"; seq_in_list = 0;  continue
-                if SEC_SUPLENTES.search(line):
-                    in_section = "SUPLENTES"; seq_in_list = 0; continue
-
-            # header de lista
-            if lbl == "HEADER_LISTA" and prob >= 0.55:
-                current_nome_lista = line
-                sigla = guess_sigla(line)
-                if sigla is None:
-                    sigla = sigla_from_lista(line)
-                current_sigla = sigla or ""
-                seq_in_list = 0
-                in_section = None
+def iter_numbered_lines(pages: Iterable[list]) -> Iterator[DocLine]:
+    """Yield ``(page, line, text)`` for the normalised, non-empty lines of ``pages``.
+
+    ``page`` and ``line`` are 1-based positions in the extracted pages;
+    :class:`LayoutLine` rows keep their layout features, with the text normalised.
+    """
+    for page_no, lines in enumerate(pages, 1):
+        for line_no, raw in enumerate(lines, 1):
+            if isinstance(raw, LayoutLine):
+                line = normalize_quotes_dashes(raw.text.strip())
+                if line:
+                    yield page_no, line_no, raw._replace(text=line)
                 continue
+            line = normalize_quotes_dashes(raw.strip())
+            if line:
+                yield page_no, line_no, line
 
-            # candidato
-            if lbl == "CANDIDATO" and prob >= 0.55 and current_sigla:
-                nome = ml.extract_nome(line)
-                m = LINE_NUM.match(line)
-                if m:
-                    if not nome:
-                        nome = m.group(2)
-                    else:
-                        nome_match = LINE_NUM.match(nome)
-                        if nome_match:
-                            nome = nome_match.group(2)
-                if not nome:
-                    nome = line
-                if in_section is None:
-                    in_section = "EFETIVOS"; seq_in_list = 0
-                seq_in_list += 1
-                tipo = "2" if in_section == "EFETIVOS" else "3"
-                rows.append([dtmnfr, orgao, tipo, current_sigla, current_sigla, current_nome_lista, seq_in_list, nome, current_sigla, False])
+def iter_doc_lines(pages: Iterable[list]) -> Iterator[Union[str, LayoutLine]]:
+    """Yield the normalised, non-empty lines of ``pages`` in reading order."""
+    for _, _, line in iter_numbered_lines(pages):
+        yield line
+
+def classify_all(ml, lines: List[str], batch_size: int = 64) -> List[Tuple[str, float]]:
+    """Classify ``lines`` in batches when the extractor supports it."""
+    if not lines:
+        return []
+    classify_lines = getattr(ml, "classify_lines", None)
+    if classify_lines is not None:
+        return classify_lines(lines, batch_size=batch_size)
+    return [ml.classify_line(line) for line in lines]
+
+def extract_all(ml, lines: List[str], batch_size: int = 64) -> List[Optional[str]]:
+    """Run NER over ``lines`` in batches when the extractor supports it."""
+    if not lines:
+        return []
+    extract_nomes = getattr(ml, "extract_nomes", None)
+    if extract_nomes is not None:
+        return extract_nomes(lines, batch_size=batch_size)
+    return [ml.extract_nome(line) for line in lines]
+
+def conf_thresholds(ml, conf_thr: Union[Thresholds, float, Mapping[str, float], None] = None) -> Thresholds:
+    """``conf_thr`` if given, else the extractor's (calibrated) thresholds, else :data:`CONF_THR` for every label."""
+    if conf_thr is None:
+        conf_thr = getattr(ml, "conf_thr", None)
+    return as_thresholds(conf_thr if conf_thr is not None else CONF_THR)
+
+def bump(stats: Optional[dict], key: str, n: int = 1) -> None:
+    """Add ``n`` to counter ``key`` of an optional stats dict."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + n
+
+def infer_lines(ml, doc_lines: List[Union[str, LayoutLine]], batch_size: int = 64,
+                rules_first: bool = False, stats: Optional[dict] = None,
+                conf_thr: Union[Thresholds, float, Mapping[str, float], None] = None,
+                first_stage=None, cascade_thr: Union[Thresholds, float, Mapping[str, float], None] = None,
+                ) -> List[LineResult]:
+    """Label every line in batches, then run NER only over confident CANDIDATO lines.
+
+    With ``rules_first`` the lines that :func:`rule_label` decides on its own
+    skip the classifier, and its numbered candidates take the name straight
+    from :data:`LINE_NUM` instead of going through NER. A ``single_pass``
+    extractor (joint model) returns label and name from the same forward pass,
+    so no separate NER pass is made.
+
+    :class:`LayoutLine` rows are first offered to :func:`layout_label`, whose
+    labels (counted in ``layout_labels``) are taken without a model call
+    whether or not ``rules_first`` is set.
+
+    A ``first_stage`` classifier (see :mod:`~cne_ml_extractor.cascade`) then
+    labels the remaining lines cheaply; its label stands when its probability
+    reaches ``cascade_thr`` for that label (by default the extractor's
+    calibrated :attr:`cascade_thr`, else :data:`CASCADE_THR`) and only the
+    other lines escalate to ``ml``.  NER runs over the CANDIDATO lines that
+    pass ``conf_thr`` (see :func:`conf_thresholds`).
+    """
+    conf = conf_thresholds(ml, conf_thr)
+    hints = [layout_label(line) if isinstance(line, LayoutLine) else None for line in doc_lines]
+    doc_lines = [line.text if isinstance(line, LayoutLine) else line for line in doc_lines]
+    markers = [orgao_marker(line) for line in doc_lines]
+    todo = [i for i, mk in enumerate(markers) if mk is None]
+    results = [LineResult(line, orgao=mk) for line, mk in zip(doc_lines, markers)]
+    ruled = set()
+    if rules_first or any(hints):
+        for i in todo:
+            lbl = hints[i] or (rule_label(doc_lines[i]) if rules_first else None)
+            if lbl is None:
                 continue
+            nome = LINE_NUM.match(doc_lines[i]).group(2) if lbl == "CANDIDATO" else None
+            results[i] = LineResult(doc_lines[i], label=lbl, prob=1.0, nome=nome)
+            ruled.add(i)
+        todo = [i for i in todo if i not in ruled]
+    accepted: List[int] = []
+    if first_stage is not None and todo:
+        if cascade_thr is None:
+            cascade_thr = getattr(ml, "cascade_thr", None)
+        cascade = as_thresholds(cascade_thr, default=CASCADE_THR)
+        with stage("cascade"):
+            first = first_stage.classify_lines([doc_lines[i] for i in todo])
+        escalated = []
+        for i, (lbl, prob) in zip(todo, first):
+            if cascade.passes(lbl, prob):
+                results[i] = LineResult(doc_lines[i], label=lbl, prob=prob)
+                accepted.append(i)
+                bump(stats, f"cascade_accepted_{lbl}")
+            else:
+                escalated.append(i)
+        bump(stats, "cascade_accepted", len(accepted))
+        bump(stats, "cascade_escalated", len(escalated))
+        todo = escalated
+    single_pass = getattr(ml, "single_pass", False)
+    if single_pass:
+        joint = ml.classify_and_extract_lines([doc_lines[i] for i in todo], batch_size=batch_size) if todo else []
+        for i, (lbl, prob, nome) in zip(todo, joint):
+            keep = lbl == "CANDIDATO" and conf.passes(lbl, prob)
+            results[i] = LineResult(doc_lines[i], label=lbl, prob=prob, nome=nome if keep else None)
+    else:
+        labels = classify_all(ml, [doc_lines[i] for i in todo], batch_size=batch_size)
+        for i, (lbl, prob) in zip(todo, labels):
+            results[i] = LineResult(doc_lines[i], label=lbl, prob=prob)
+
+    # a joint model already named the lines it classified; cascade-accepted ones still need NER
+    cand = sorted(i for i in (accepted if single_pass else accepted + todo)
+                  if results[i].label == "CANDIDATO" and conf.passes("CANDIDATO", results[i].prob))
+    for i, nome in zip(cand, extract_all(ml, [doc_lines[i] for i in cand], batch_size=batch_size)):
+        results[i] = results[i]._replace(nome=nome)
+    joint_named = sum(1 for i in todo if results[i].label == "CANDIDATO"
+                      and conf.passes("CANDIDATO", results[i].prob)) if single_pass else 0
+
+    bump(stats, "lines", len(doc_lines))
+    bump(stats, "model_calls", len(todo))
+    bump(stats, "model_calls_avoided", len(ruled))
+    bump(stats, "layout_labels", sum(1 for i in ruled if hints[i]))
+    bump(stats, "ner_calls", len(cand))
+    bump(stats, "ner_calls_avoided", sum(1 for i in ruled if results[i].label == "CANDIDATO") + joint_named)
+    return results
+
+class ListState:
+    """Section/list-header/candidate state machine over precomputed :class:`LineResult`s.
+
+    A label is acted on when its probability passes ``conf_thr`` for that label.
+    :attr:`lists` counts the list headers opened so far; :meth:`snapshot` and
+    :meth:`restore` let a replay resume from any line.
+    """
+
+    FIELDS = ("current_sigla", "current_nome_lista", "orgao", "in_section", "seq_in_list")
 
-            # fallbacks
-            if SEC_EFETIVOS.search(line): in_section="EFETIVOS"; seq_in_list=0; continue
-            if SEC_SUPLENTES.search(line): in_section="SUPLENTES"; seq_in_list=0; continue
-            sigla_hint = guess_sigla(line) or sigla_from_lista(line)
-            if sigla_hint and ("-" in line or "LISTA" in line.upper()):
-                current_nome_lista = line
-                current_sigla = sigla_hint
-                seq_in_list = 0; in_section=None; continue
+    def __init__(self, dtmnfr: str, conf_thr: Union[Thresholds, float, Mapping[str, float]] = CONF_THR):
+        self.dtmnfr = dtmnfr
+        self.conf = as_thresholds(conf_thr)
+        self.current_sigla: Optional[str] = None
+        self.current_nome_lista: Optional[str] = None
+        self.orgao = "AM"
+        self.in_section: Optional[str] = None
+        self.seq_in_list = 0
+        self.lists = 0
 
+    def snapshot(self) -> dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def restore(self, snapshot: dict) -> None:
+        for name in self.FIELDS:
+            setattr(self, name, snapshot[name])
+
+    def _row(self, tipo: str, nome: str) -> List:
+        return [self.dtmnfr, self.orgao, tipo, self.current_sigla, self.current_sigla, self.current_nome_lista,
+                self.seq_in_list, nome, self.current_sigla, False]
+
+    def feed(self, res: LineResult) -> Optional[List]:
+        """Advance the state with one line and return the CSV row it produces, if any."""
+        line = res.text
+        if res.orgao is not None:
+            self.orgao = res.orgao
+            return None
+        lbl, prob = res.label, res.prob
+
+        # secções
+        if lbl == "SECAO" and self.conf.passes(lbl, prob):
+            if SEC_EFETIVOS.search(line):
+                self.in_section = "EFETIVOS"; self.seq_in_list = 0; return None
+            if SEC_SUPLENTES.search(line):
+                self.in_section = "SUPLENTES"; self.seq_in_list = 0; return None
+
+        # header de lista
+        if lbl == "HEADER_LISTA" and self.conf.passes(lbl, prob):
+            self.current_nome_lista = line
+            sigla = guess_sigla(line)
+            if sigla is None:
+                sigla = sigla_from_lista(line)
+            self.current_sigla = sigla or ""
+            self.seq_in_list = 0
+            self.in_section = None
+            self.lists += 1
+            return None
+
+        # candidato
+        if lbl == "CANDIDATO" and self.conf.passes(lbl, prob) and self.current_sigla:
+            nome = res.nome
             m = LINE_NUM.match(line)
-            if m and current_sigla:
-                in_section = in_section or "EFETIVOS"
-                seq_in_list += 1
-                rows.append([dtmnfr, orgao, ("2" if in_section=="EFETIVOS" else "3"),
-                             current_sigla, current_sigla, current_nome_lista, seq_in_list,
-                             m.group(2), current_sigla, False])
-
-    ensure_dir(out_csv)
-    with open(out_csv, "w", newline="", encoding="utf-8-sig") as f:
-        w = csv.writer(f, delimiter=";")
-        w.writerow(header)
-        w.writerows(rows)
-    return out_csv
+            if m:
+                if not nome:
+                    nome = m.group(2)
+                else:
+                    nome_match = LINE_NUM.match(nome)
+                    if nome_match:
+                        nome = nome_match.group(2)
+            if not nome:
+                nome = line
+            if self.in_section is None:
+                self.in_section = "EFETIVOS"; self.seq_in_list = 0
+            self.seq_in_list += 1
+            return self._row("2" if self.in_section == "EFETIVOS" else "3", nome)
+
+        # fallbacks
+        if SEC_EFETIVOS.search(line): self.in_section="EFETIVOS"; self.seq_in_list=0; return None
+        if SEC_SUPLENTES.search(line): self.in_section="SUPLENTES"; self.seq_in_list=0; return None
+        sigla_hint = guess_sigla(line) or sigla_from_lista(line)
+        if sigla_hint and ("-" in line or "LISTA" in line.upper()):
+            self.current_nome_lista = line
+            self.current_sigla = sigla_hint
+            self.lists += 1
+            self.seq_in_list = 0; self.in_section=None; return None
+
+        m = LINE_NUM.match(line)
+        if m and self.current_sigla:
+            self.in_section = self.in_section or "EFETIVOS"
+            self.seq_in_list += 1
+            return self._row("2" if self.in_section=="EFETIVOS" else "3", m.group(2))
+        return None
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group ``items`` into lists of ``size`` (one single list when ``size <= 0``)."""
+    if size <= 0:
+        yield list(items)
+        return
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def feed_rows(state: ListState, lines: Sequence[DocLine], results: Sequence[LineResult],
+              details: bool = False) -> List[List]:
+    """Replay ``results`` through ``state``; with ``details`` rows end with the :data:`DETAIL_HEADER` columns."""
+    rows = []
+    for (page_no, line_no, _), res in zip(lines, results):
+        row = state.feed(res)
+        if row is not None:
+            rows.append(row + [page_no, line_no, round(res.prob, 4)] if details else row)
+    return rows
+
+def iter_rows(ml, pages: Iterable[list], dtmnfr: str, chunk_lines: int = 0, batch_size: int = 64,
+              rules_first: bool = False, stats: Optional[dict] = None,
+              details: bool = False, conf_thr=None, first_stage=None) -> Iterator[List[List]]:
+    """Yield the CSV rows of ``pages`` one chunk of at most ``chunk_lines`` lines at a time.
+
+    Each chunk goes through :func:`infer_lines` and a single :class:`ListState`
+    carries the section/list state across chunks, so the rows do not depend on
+    the chunk size.
+    """
+    conf = conf_thresholds(ml, conf_thr)
+    state = ListState(dtmnfr, conf)
+    for chunk in chunked(iter_numbered_lines(pages), chunk_lines):
+        results = infer_lines(ml, [line for _, _, line in chunk], batch_size=batch_size,
+                              rules_first=rules_first, stats=stats, conf_thr=conf, first_stage=first_stage)
+        rows = feed_rows(state, chunk, results, details)
+        bump(stats, "rows", len(rows))
+        yield rows
+
+def process_pdf_to_csv(pdf_path: str, dtmnfr: str, out_csv: str,
+                       line_model_dir: str = "models/line-cls-xlmr",
+                       ner_model_dir: str = "models/ner-nome-xlmr",
+                       device: str = "cpu",
+                       dtype: str = "float32",
+                       backend: str = "torch",
+                       ml: Optional[MLExtractor] = None,
+                       batch_size: int = 64,
+                       rules_first: bool = False,
+                       stats: Optional[dict] = None,
+                       pdf_workers: int = 0,
+                       page_cache: Optional[PageCache] = None,
+                       stream: bool = False,
+                       chunk_lines: int = 512,
+                       layout: bool = False,
+                       out_format: Optional[str] = None,
+                       details: bool = False,
+                       partition_by: Sequence[str] = (),
+                       conf_thr: Union[float, Mapping[str, float], None] = None,
+                       first_stage_dir: Optional[str] = None,
+                       incremental: bool = False) -> str:
+    """Extract the candidate lists of ``pdf_path`` into ``out_csv``.
+
+    ``ml`` may be an already loaded extractor; otherwise one is taken from the
+    process-wide model registry, so repeated calls reuse the same models
+    (``backend`` selects torch, int8 or ONNX Runtime inference, see
+    :data:`~cne_ml_extractor.ml_infer.BACKENDS`).  The document is processed in three passes: every line is classified in
+    batches of ``batch_size``, NER runs in batches over the CANDIDATO lines
+    only, and :class:`ListState` then replays the section/list logic.
+
+    ``rules_first`` lets the regex heuristics settle unambiguous lines without
+    a model call (see :func:`infer_lines`); when ``stats`` is given, line and
+    model-call counters, including ``model_calls_avoided``, are added to it.
+    ``pdf_workers > 1`` extracts and OCRs the pages in a process pool, and
+    pages already in ``page_cache`` skip extraction and OCR entirely.
+    ``layout`` reads text pages as visual rows with layout features (see
+    :mod:`~cne_ml_extractor.layout`), which untangles multi-column editais,
+    rejoins wrapped names and lets bold headers and sections skip the model.
+
+    With ``stream`` the pages are read lazily and processed ``chunk_lines``
+    lines at a time, and rows are flushed to ``out_csv`` after each chunk, so
+    memory stays bounded however long the document is.  The CSV is the same
+    in both modes.
+
+    ``out_format`` (``csv``, ``jsonl`` or ``parquet``; by default taken from
+    the extension of ``out_csv``) picks the writer from
+    :mod:`~cne_ml_extractor.writers`, which receives the rows one chunk at a
+    time; ``partition_by`` splits Parquet output by columns such as
+    ``("DTMNFR", "ORGAO")``, and the dataset root (the folder of ``out_csv``)
+    is returned instead of ``out_csv``.  ``details`` adds the :data:`DETAIL_HEADER`
+    columns (page, line and label probability) to every row.
+
+    ``conf_thr`` (one value or one per label) overrides the extractor's
+    acceptance thresholds, which come from the line model's
+    ``thresholds.json`` when ``ml/calibrate_thresholds.py`` wrote one.
+    ``first_stage_dir`` puts a distilled student in front of the line
+    classifier: lines it is confident about skip the full model (the
+    ``cascade_*`` counters in ``stats``, see :func:`infer_lines`).
+
+    With ``incremental`` the run reuses the state the previous run left next
+    to ``out_csv``: unchanged pages are not extracted, lines already seen are
+    not inferred again and the list state machine is replayed from the first
+    affected list header (see :mod:`~cne_ml_extractor.incremental`).  The
+    output is the same as a full run's; ``stream`` and ``pdf_workers`` are
+    ignored.
+
+    When a :class:`~cne_ml_extractor.profiling.Profiler` is active (see
+    :func:`~cne_ml_extractor.profiling.profiled`) the document's totals are
+    recorded in it alongside the per-stage timings.
+    """
+    if incremental:
+        from .incremental import process_pdf_incremental
+
+        if ml is None:
+            ml = get_extractor(line_model_dir, ner_model_dir, device=device, dtype=dtype, backend=backend,
+                               factory=MLExtractor)
+        return process_pdf_incremental(pdf_path, dtmnfr, out_csv, ml, batch_size=batch_size,
+                                       rules_first=rules_first, stats=stats, page_cache=page_cache, layout=layout,
+                                       out_format=out_format, details=details, partition_by=partition_by,
+                                       conf_thr=conf_thr, first_stage_dir=first_stage_dir)
+    prof = active()
+    with (prof.document(pdf_path) if prof is not None else nullcontext({})) as doc:
+        if stream:
+            pages = iter_pdf_lines(pdf_path, workers=pdf_workers, cache=page_cache, layout=layout)
+        else:
+            pages = pdf_to_lines(pdf_path, workers=pdf_workers, cache=page_cache, layout=layout)
+            chunk_lines = 0
+        if ml is None:
+            ml = get_extractor(line_model_dir, ner_model_dir, device=device, dtype=dtype, backend=backend,
+                               factory=MLExtractor)
+
+        n_rows = 0
+        with open_writer(out_csv, HEADER + DETAIL_HEADER if details else HEADER, fmt=out_format,
+                         partition_by=partition_by) as w:
+            for rows in iter_rows(ml, pages, dtmnfr, chunk_lines=chunk_lines, batch_size=batch_size,
+                                  rules_first=rules_first, stats=stats, details=details, conf_thr=conf_thr,
+                                  first_stage=load_first_stage(first_stage_dir) if first_stage_dir else None):
+                with stage("write"):
+                    w.write(rows)
+                    if stream:
+                        w.flush()
+                n_rows += len(rows)
+        doc["rows"] = n_rows
+    return output_path(out_csv, partition_by)
+
+
+def _extract_doc(pdf_path: str, cache: Optional[PageCache], layout: bool, profile: bool):
+    # Runs in a worker process; with ``profile`` the stage timings come back for the parent to merge.
+    prof = Profiler() if profile else None
+    with profiled(prof):
+        pages = pdf_to_lines(pdf_path, cache=cache, layout=layout)
+    return (pages, prof.report()) if profile else pages
+
+def iter_docs_lines(pdf_paths: Sequence[str], workers: int = 0, cache: Optional[PageCache] = None,
+                    layout: bool = False) -> Iterator[List[DocLine]]:
+    """Yield the numbered lines (see :func:`iter_numbered_lines`) of each PDF of ``pdf_paths``, in order.
+
+    With ``workers > 1`` whole documents are extracted by a process pool, one
+    per task, with at most ``2 * workers`` in flight; for many small PDFs that
+    beats splitting each one into page ranges.
+    """
+    if workers <= 1:
+        for path in pdf_paths:
+            yield list(iter_numbered_lines(pdf_to_lines(path, cache=cache, layout=layout)))
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    prof = active()
+    paths = iter(pdf_paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque(pool.submit(_extract_doc, path, cache, layout, prof is not None)
+                               for path in islice(paths, 2 * workers))
+        while pending:
+            pages = pending.popleft().result()
+            if prof is not None:
+                pages, report = pages
+                prof.merge(report)
+            nxt = next(paths, None)
+            if nxt is not None:
+                pending.append(pool.submit(_extract_doc, nxt, cache, layout, prof is not None))
+            yield list(iter_numbered_lines(pages))
+
+def process_pdfs_to_csv(docs: Iterable[Tuple[str, str, str]],
+                        line_model_dir: str = "models/line-cls-xlmr",
+                        ner_model_dir: str = "models/ner-nome-xlmr",
+                        device: str = "cpu",
+                        dtype: str = "float32",
+                        backend: str = "torch",
+                        ml: Optional[MLExtractor] = None,
+                        batch_size: int = 64,
+                        rules_first: bool = False,
+                        stats: Optional[dict] = None,
+                        doc_stats: Optional[List[dict]] = None,
+                        pdf_workers: int = 0,
+                        page_cache: Optional[PageCache] = None,
+                        layout: bool = False,
+                        group_lines: int = 4096,
+                        out_format: Optional[str] = None,
+                        details: bool = False,
+                        partition_by: Sequence[str] = (),
+                        conf_thr: Union[float, Mapping[str, float], None] = None,
+                        first_stage_dir: Optional[str] = None) -> List[str]:
+    """Run :func:`process_pdf_to_csv` over many ``(pdf_path, dtmnfr, out_csv)`` documents at once.
+
+    A two-page edital fills only a handful of batches, so the lines of
+    consecutive documents are pooled until they reach ``group_lines`` and go
+    through :func:`infer_lines` together: the classifier and NER see full,
+    length-sorted batches drawn from every document of the group.  The
+    results are then split back per document and replayed through a fresh
+    :class:`ListState` each, so every CSV is identical to the one
+    :func:`process_pdf_to_csv` writes for that document alone (``out_format``,
+    ``details``, ``partition_by``, ``conf_thr`` and ``first_stage_dir`` mean
+    the same as there).
+
+    ``pdf_workers > 1`` extracts whole documents in a process pool (see
+    :func:`iter_docs_lines`).  ``stats`` receives the counters of the whole
+    run; when ``doc_stats`` is given one ``{"lines", "rows"}`` dict per
+    document is appended to it.  Returns the output paths in input order.
+    """
+    docs = list(docs)
+    if ml is None:
+        ml = get_extractor(line_model_dir, ner_model_dir, device=device, dtype=dtype, backend=backend,
+                           factory=MLExtractor)
+    conf = conf_thresholds(ml, conf_thr)
+    first_stage = load_first_stage(first_stage_dir) if first_stage_dir else None
+    prof = active()
+    written: List[str] = []
+    group: List[Tuple[Tuple[str, str, str], list]] = []
+
+    def flush() -> None:
+        pooled = [line for _, lines in group for _, _, line in lines]
+        with (prof.document(group[0][0][0], pdfs=[d[0] for d, _ in group]) if prof is not None
+              else nullcontext({})) as entry:
+            results = infer_lines(ml, pooled, batch_size=batch_size, rules_first=rules_first, stats=stats,
+                                  conf_thr=conf, first_stage=first_stage)
+            start = n_rows = 0
+            for (pdf_path, dtmnfr, out_csv), lines in group:
+                state = ListState(dtmnfr, conf)
+                part = results[start:start + len(lines)]
+                start += len(lines)
+                rows = feed_rows(state, lines, part, details)
+                with stage("write"), open_writer(out_csv, HEADER + DETAIL_HEADER if details else HEADER,
+                                                 fmt=out_format, partition_by=partition_by) as w:
+                    w.write(rows)
+                n_rows += len(rows)
+                if doc_stats is not None:
+                    doc_stats.append({"lines": len(lines), "rows": len(rows)})
+                written.append(output_path(out_csv, partition_by))
+            bump(stats, "rows", n_rows)
+            entry["rows"] = n_rows
+        group.clear()
+
+    n_pooled = 0
+    for doc, lines in zip(docs, iter_docs_lines([d[0] for d in docs], workers=pdf_workers,
+                                                cache=page_cache, layout=layout)):
+        group.append((doc, lines))
+        n_pooled += len(lines)
+        if n_pooled >= group_lines:
+            flush()
+            n_pooled = 0
+    if group:
+        flush()
+    return written
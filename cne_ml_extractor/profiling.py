@@ -0,0 +1,154 @@
+"""Opt-in per-stage timing: wall/CPU seconds and call counts, plus per-document totals.
+
+Code paths mark their work with ``with stage("ocr"):``.  Nothing is recorded
+unless a :class:`Profiler` has been activated with :func:`profiled` in the
+current context, and then a stage costs two clock reads; when none is active
+it costs one ``ContextVar`` lookup.
+
+Stages used by the pipeline: ``open``, ``text`` (text layer), ``ocr`` (one per
+OCRed region), ``cascade`` (first-stage classifier), ``tokenize`` and
+``forward`` (line classifier), ``ner``, ``joint``, ``microbatch`` (time
+waiting on a shared micro-batch) and ``write``.
+"""
+from __future__ import annotations
+import sys, threading, time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, List, Optional
+
+_ACTIVE: ContextVar[Optional["Profiler"]] = ContextVar("cne_profiler", default=None)
+_NULL = nullcontext()
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or ``None`` where it cannot be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return int(getattr(info, "peak_wset", info.rss))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class _Stage:
+    __slots__ = ("prof", "name", "wall", "cpu")
+
+    def __init__(self, prof: "Profiler", name: str):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.prof.add(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing ``name`` in the active profiler (a no-op when there is none)."""
+    prof = _ACTIVE.get()
+    return _NULL if prof is None else _Stage(prof, name)
+
+
+def active() -> Optional["Profiler"]:
+    return _ACTIVE.get()
+
+
+@contextmanager
+def profiled(profiler: Optional["Profiler"]) -> Iterator[Optional["Profiler"]]:
+    """Make ``profiler`` the active one for the enclosed code (``None`` disables profiling)."""
+    token = _ACTIVE.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _ACTIVE.reset(token)
+
+
+class Profiler:
+    """Thread-safe accumulator of stage timings and per-document totals.
+
+    CPU time is process CPU time, so it includes torch's intra-op threads
+    (and any other thread running at the same time).  ``max_documents``
+    bounds the per-document entries kept (``0`` keeps none) for long-running
+    processes; :attr:`documents_total` and :attr:`documents_wall_s` still
+    count every document.
+    """
+
+    def __init__(self, max_documents: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, List[float]] = {}  # name -> [count, wall_s, cpu_s]
+        self.documents: Deque[dict] = deque(maxlen=max_documents)
+        self.documents_total = 0
+        self.documents_wall_s = 0.0
+
+    def add(self, name: str, wall: float, cpu: float, count: int = 1) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += wall
+            entry[2] += cpu
+
+    @contextmanager
+    def document(self, name: str, **extra) -> Iterator[dict]:
+        """Record wall/CPU totals and peak RSS of one document; the yielded dict may be filled in."""
+        doc = {"document": name, **extra}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield doc
+        finally:
+            doc["wall_s"] = round(time.perf_counter() - wall, 6)
+            doc["cpu_s"] = round(time.process_time() - cpu, 6)
+            doc["peak_rss_bytes"] = peak_rss_bytes()
+            with self._lock:
+                self.documents.append(doc)
+                self.documents_total += 1
+                self.documents_wall_s += doc["wall_s"]
+
+    def merge(self, report: dict) -> None:
+        """Fold another profiler's :meth:`report` (e.g. from a worker process) into this one."""
+        for name, st in report.get("stages", {}).items():
+            self.add(name, st["wall_s"], st["cpu_s"], st["count"])
+        documents = report.get("documents", [])
+        with self._lock:
+            self.documents.extend(documents)
+            self.documents_total += report.get("documents_total", len(documents))
+            self.documents_wall_s += report.get("documents_wall_s", sum(d.get("wall_s", 0) for d in documents))
+
+    def report(self) -> dict:
+        with self._lock:
+            stages = {name: {"count": int(c), "wall_s": round(w, 6), "cpu_s": round(cpu, 6)}
+                      for name, (c, w, cpu) in sorted(self.stages.items())}
+            documents = [dict(d) for d in self.documents]
+            totals = {"documents_total": self.documents_total, "documents_wall_s": round(self.documents_wall_s, 6)}
+        return {"stages": stages, "documents": documents, **totals, "peak_rss_bytes": peak_rss_bytes()}
+
+
+def to_prometheus(report: dict, prefix: str = "cne") -> str:
+    """Render a :meth:`Profiler.report` in the Prometheus text exposition format."""
+    out = [f"# TYPE {prefix}_stage_calls_total counter",
+           f"# TYPE {prefix}_stage_wall_seconds_total counter",
+           f"# TYPE {prefix}_stage_cpu_seconds_total counter"]
+    for name, st in report.get("stages", {}).items():
+        out.append(f'{prefix}_stage_calls_total{{stage="{name}"}} {st["count"]}')
+        out.append(f'{prefix}_stage_wall_seconds_total{{stage="{name}"}} {st["wall_s"]}')
+        out.append(f'{prefix}_stage_cpu_seconds_total{{stage="{name}"}} {st["cpu_s"]}')
+    docs = report.get("documents", [])
+    n_docs = report.get("documents_total", len(docs))
+    wall = report.get("documents_wall_s", sum(d.get("wall_s", 0) for d in docs))
+    out.append(f"# TYPE {prefix}_documents_total counter")
+    out.append(f"{prefix}_documents_total {n_docs}")
+    out.append(f"# TYPE {prefix}_document_wall_seconds_total counter")
+    out.append(f"{prefix}_document_wall_seconds_total {round(wall, 6)}")
+    if report.get("peak_rss_bytes") is not None:
+        out.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+        out.append(f"{prefix}_peak_rss_bytes {report['peak_rss_bytes']}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,79 @@
+"""Lightweight line classifier distilled from the XLM-R model (see ``ml/distill_line_cls.py``)."""
+from __future__ import annotations
+import json, os, zlib
+from typing import List, Sequence, Tuple
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+STUDENT_CONFIG = "student.json"
+STUDENT_WEIGHTS = "student_weights.npz"
+
+
+def is_student_dir(model_dir: str) -> bool:
+    return os.path.exists(os.path.join(model_dir, STUDENT_CONFIG))
+
+
+class HashedNgramClassifier:
+    """Softmax-linear classifier over hashed character n-grams.
+
+    Each line is turned into the counts of its character n-grams (padded with
+    spaces, case kept since headers are often upper case), hashed into
+    ``n_features`` buckets and L2-normalised; a score is one weight row per
+    n-gram summed, so inference is a few thousand numpy additions per line.
+    """
+
+    def __init__(self, labels: Sequence[str], n_features: int = 1 << 18, ngram_min: int = 1, ngram_max: int = 4,
+                 weights: np.ndarray | None = None, bias: np.ndarray | None = None):
+        self.labels = list(labels)
+        self.n_features = n_features
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+        self.weights = weights if weights is not None else np.zeros((n_features, len(self.labels)), np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(self.labels), np.float32)
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(bucket indices, normalised counts)`` for one line."""
+        padded = f" {text.strip()} "
+        counts: dict[int, int] = {}
+        for n in range(self.ngram_min, self.ngram_max + 1):
+            for i in range(len(padded) - n + 1):
+                idx = zlib.crc32(padded[i:i + n].encode("utf-8")) % self.n_features
+                counts[idx] = counts.get(idx, 0) + 1
+        idx = np.fromiter(counts.keys(), np.int64, len(counts))
+        val = np.fromiter(counts.values(), np.float32, len(counts))
+        norm = float(np.sqrt((val * val).sum())) or 1.0
+        return idx, val / norm
+
+    def predict_proba(self, lines: Sequence[str]) -> np.ndarray:
+        scores = np.empty((len(lines), len(self.labels)), np.float32)
+        for row, text in enumerate(lines):
+            idx, val = self.features(text)
+            scores[row] = val @ self.weights[idx] + self.bias
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def classify_lines(self, lines: Sequence[str]) -> List[Tuple[str, float]]:
+        if not lines:
+            return []
+        probs = self.predict_proba(lines)
+        best = probs.argmax(axis=1)
+        return [(self.labels[b], float(probs[i, b])) for i, b in enumerate(best)]
+
+    def save(self, model_dir: str) -> None:
+        os.makedirs(model_dir, exist_ok=True)
+        with open(os.path.join(model_dir, STUDENT_CONFIG), "w", encoding="utf-8") as f:
+            json.dump({"type": "hashed-char-ngram", "labels": self.labels, "n_features": self.n_features,
+                       "ngram_min": self.ngram_min, "ngram_max": self.ngram_max}, f, indent=2)
+        np.savez_compressed(os.path.join(model_dir, STUDENT_WEIGHTS), weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, model_dir: str) -> "HashedNgramClassifier":
+        with open(os.path.join(model_dir, STUDENT_CONFIG), encoding="utf-8") as f:
+            cfg = json.load(f)
+        arrays = np.load(os.path.join(model_dir, STUDENT_WEIGHTS))
+        return cls(cfg["labels"], n_features=cfg["n_features"], ngram_min=cfg["ngram_min"],
+                   ngram_max=cfg["ngram_max"], weights=arrays["weights"], bias=arrays["bias"])
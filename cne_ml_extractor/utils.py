@@ -1,23 +1,253 @@
 from __future__ import annotations
-import fitz, re
-from io import BytesIO
-from typing import List, Optional
+import hashlib, re, threading
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import Iterator, List, Optional
 
-from PIL import Image
-import pytesseract
+from .layout import LayoutLine, page_layout_lines
+from .lazy import lazy_import
+from .page_cache import PageCache, page_digest
+from .profiling import Profiler, active, profiled, stage
+
+fitz = lazy_import("fitz")
+np = lazy_import("numpy")
+Image = lazy_import("PIL.Image")
+pytesseract = lazy_import("pytesseract")
+# optional: one persistent Tesseract handle per thread instead of a process per call
+tesserocr = lazy_import("tesserocr", optional=True)
+
+OCR_LANG = "por"
+OCR_DPI_RANGE = (150, 400)
+OCR_DEFAULT_DPI = 300  # when no glyph size can be measured
+OCR_LINE_PX = 32  # rendered text-line height Tesseract reads well: ~300 DPI for 10 pt print
+OCR_PROBE_DPI = 100
+OCR_MIN_REGION = 0.10  # images covering less of the page (crests, logos, stamps, signatures) are not OCRed
+
+_TESS = threading.local()
+
+def _tess_api(lang: str):
+    api = getattr(_TESS, "api", None)
+    if api is None or _TESS.lang != lang:
+        if api is not None:
+            api.End()
+        api = _TESS.api = tesserocr.PyTessBaseAPI(lang=lang)
+        _TESS.lang = lang
+    return api
+
+def ocr_image(image: Image.Image, lang: str = OCR_LANG) -> str:
+    """OCR a PIL image through tesserocr's persistent API when installed, else a ``tesseract`` process."""
+    if tesserocr is not None:
+        api = _tess_api(lang)
+        api.SetImage(image)
+        return api.GetUTF8Text() or ""
+    return pytesseract.image_to_string(image, lang=lang) or ""
+
+def ocr_pixmap(pixmap, lang: str = OCR_LANG) -> str:
+    """OCR a PyMuPDF pixmap, handing its raw samples to Tesseract without a PNG round-trip."""
+    mode = "RGBA" if pixmap.alpha else ("L" if pixmap.n == 1 else "RGB")
+    image = Image.frombuffer(mode, (pixmap.width, pixmap.height), pixmap.samples, "raw", mode, 0, 1)
+    return ocr_image(image, lang=lang)
+
+@lru_cache(maxsize=1)
+def tesseract_version() -> str:
+    try:
+        if tesserocr is not None:
+            return tesserocr.tesseract_version().split()[1]
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unavailable"
+
+def line_height_px(pixmap) -> Optional[float]:
+    """Median height in pixels of the text lines of ``pixmap``, from its horizontal ink profile."""
+    ink = np.frombuffer(pixmap.samples, np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    ink = ink[..., :min(pixmap.n, 3)].mean(axis=2) < 128
+    rows = np.concatenate(([False], ink.mean(axis=1) > 0.002, [False]))
+    edges = np.flatnonzero(rows[1:] != rows[:-1])
+    runs = edges[1::2] - edges[::2]
+    runs = runs[runs >= 2]
+    return float(np.median(runs)) if runs.size else None
+
+def ocr_dpi(page, clip=None) -> int:
+    """Pick the DPI that renders the glyphs in ``clip`` (default: the page) at :data:`OCR_LINE_PX`.
+
+    The line height is measured on a cheap grey render at :data:`OCR_PROBE_DPI`,
+    so small print gets more pixels and large print is not rendered needlessly
+    big; the result is clamped to :data:`OCR_DPI_RANGE`.
+    """
+    probe = page.get_pixmap(dpi=OCR_PROBE_DPI, clip=clip, colorspace=fitz.csGRAY)
+    height = line_height_px(probe)
+    if not height:
+        return OCR_DEFAULT_DPI
+    lo, hi = OCR_DPI_RANGE
+    return int(min(hi, max(lo, OCR_PROBE_DPI * OCR_LINE_PX / height)))
+
+def ocr_regions(page, min_region: float = OCR_MIN_REGION) -> list:
+    """Return the rects of the images on ``page`` that carry no text layer of their own.
+
+    Images covering less than ``min_region`` of the page are ignored, and so
+    are those under a text layer (searchable scans already have their text).
+    """
+    if not page.get_images():  # cheap resource lookup; most text pages stop here
+        return []
+    area = abs(page.rect)
+    words = None
+    regions = []
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & page.rect
+        if rect.is_empty or abs(rect) < min_region * area:
+            continue
+        if words is None:
+            words = [fitz.Rect(w[:4]) for w in page.get_text("words")]
+        if any(rect.contains((w.tl + w.br) / 2) for w in words):
+            continue
+        regions.append(rect)
+    return regions
+
+def _split_lines(txt: str) -> list[str]:
+    return [ln.strip() for ln in txt.splitlines() if ln.strip()]
+
+def ocr_region(page, clip=None, lang: str = OCR_LANG, dpi: Optional[int] = None) -> list[str]:
+    """OCR one region of ``page`` (the whole page when ``clip`` is ``None``) at ``dpi`` or an adaptive DPI."""
+    with stage("ocr"):
+        pixmap = page.get_pixmap(dpi=dpi or ocr_dpi(page, clip), clip=clip)
+        txt = ocr_pixmap(pixmap, lang=lang)
+    return _split_lines(txt)
+
+def _insert_regions(page, ocred: list) -> list[str]:
+    """The text layer's lines in their own order, with each OCRed region before the first text block under it.
+
+    A block is under a region when it starts below the region's top and
+    overlaps it horizontally, so a region stays in its column of a multi-column
+    page; regions with no block under them come last.
+    """
+    out, pending = [], list(ocred)
+    for b in page.get_text("blocks"):
+        if b[6] != 0:
+            continue
+        block = fitz.Rect(b[:4])
+        for part in [p for p in pending if block.y0 >= p[0].y0 and block.x0 < p[0].x1 and block.x1 > p[0].x0]:
+            out.extend(part[1])
+            pending.remove(part)
+        out.extend(_split_lines(b[4]))
+    return out + [ln for _, lines in pending for ln in lines]
+
+def page_to_lines(page, lang: str = OCR_LANG, dpi: Optional[int] = None, layout: bool = False) -> list:
+    """Return the non-empty lines of one page, OCRing only what has no text layer.
+
+    Image regions without text of their own (see :func:`ocr_regions`) are
+    rasterised and OCRed one by one, so a scanned annex on a text page is no
+    longer lost; their lines are slotted into the text layer's, which keeps
+    its order (:func:`_insert_regions`).  A page with neither text nor images
+    is OCRed whole.  Each
+    region gets ``dpi`` or, by default, a DPI chosen from its glyph size
+    (:func:`ocr_dpi`), and is timed as one ``ocr`` stage.
+
+    With ``layout`` a page with a text layer yields :class:`LayoutLine` rows
+    (see :func:`~cne_ml_extractor.layout.page_layout_lines`) instead of
+    strings, followed by the lines OCRed from its image regions.
+    """
+    with stage("text"):
+        rows = page_layout_lines(page) if layout else []
+        txt = "" if rows else (page.get_text("text") or "")
+        regions = ocr_regions(page)
+    if not regions:
+        if rows:
+            return rows
+        if txt.strip():
+            return _split_lines(txt)
+        return ocr_region(page, lang=lang, dpi=dpi)
+    ocred = [(r, ocr_region(page, r, lang=lang, dpi=dpi)) for r in sorted(regions, key=lambda r: (r.y0, r.x0))]
+    if rows:
+        return rows + [ln for _, lines in ocred for ln in lines]
+    if txt.strip():  # hybrid page
+        return _insert_regions(page, ocred)
+    return [ln for _, lines in ocred for ln in lines]
+
+def cached_page_to_lines(doc, page, lang: str = OCR_LANG, dpi: Optional[int] = None,
+                         cache: Optional[PageCache] = None, layout: bool = False) -> list:
+    """:func:`page_to_lines` behind an optional :class:`PageCache`; a hit skips extraction and OCR."""
+    if cache is None:
+        return page_to_lines(page, lang=lang, dpi=dpi, layout=layout)
+    settings = {"layout": True} if layout else {}
+    key = PageCache.make_key(page_digest(doc, page), lang=lang, dpi=dpi,
+                             tesseract=tesseract_version(), pymupdf=fitz.VersionBind, **settings)
+    lines = cache.get(key)
+    if lines is None:
+        lines = page_to_lines(page, lang=lang, dpi=dpi, layout=layout)
+        cache.put(key, lines)
+    elif layout:
+        # layout rows are stored as JSON arrays
+        lines = [LayoutLine(*ln) if isinstance(ln, list) else ln for ln in lines]
+    return lines
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _page_range_to_lines(pdf_path: str, start: int, stop: int, lang: str, dpi: Optional[int],
+                         cache: Optional[PageCache], profile: bool = False, layout: bool = False):
+    # Runs in a worker process: each worker opens its own document handle.
+    # With ``profile`` the stage timings come back as a report for the parent to merge.
+    prof = Profiler() if profile else None
+    with profiled(prof):
+        with stage("open"):
+            doc = fitz.open(pdf_path)
+        with doc:
+            lines = [cached_page_to_lines(doc, doc[i], lang=lang, dpi=dpi, cache=cache, layout=layout)
+                     for i in range(start, stop)]
+    return (lines, prof.report()) if profile else lines
+
+def iter_pdf_lines(pdf_path: str, workers: int = 0, lang: str = OCR_LANG, dpi: Optional[int] = None,
+                   cache: Optional[PageCache] = None, layout: bool = False) -> Iterator[list]:
+    """Yield the lines of each page of ``pdf_path`` lazily, in page order.
+
+    With ``workers > 1`` contiguous page ranges are extracted (and OCRed) by
+    a process pool, each worker opening its own document; at most
+    ``2 * workers`` ranges are in flight so memory stays bounded.  Pages
+    found in ``cache`` are neither extracted nor OCRed again.  ``layout``
+    is passed on to :func:`page_to_lines`.
+    """
+    if workers <= 1:
+        with stage("open"):
+            doc = fitz.open(pdf_path)
+        with doc:
+            for page in doc:
+                yield cached_page_to_lines(doc, page, lang=lang, dpi=dpi, cache=cache, layout=layout)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
 
-def pdf_to_lines(pdf_path: str) -> list[list[str]]:
-    pages = []
     with fitz.open(pdf_path) as doc:
-        for page in doc:
-            txt = page.get_text("text") or ""
-            if not txt.strip():
-                pixmap = page.get_pixmap()
-                image = Image.open(BytesIO(pixmap.tobytes("png")))
-                txt = pytesseract.image_to_string(image, lang="por") or ""
-            lines = [ln.strip() for ln in txt.splitlines() if ln.strip()]
-            pages.append(lines)
-    return pages
+        n_pages = doc.page_count
+    if n_pages == 0:
+        return
+    step = max(1, min(16, -(-n_pages // (workers * 4))))
+    ranges = iter([(start, min(start + step, n_pages)) for start in range(0, n_pages, step)])
+    prof = active()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for start, stop in islice(ranges, 2 * workers):
+            pending.append(pool.submit(_page_range_to_lines, pdf_path, start, stop, lang, dpi, cache,
+                                       prof is not None, layout))
+        while pending:
+            part = pending.popleft().result()
+            if prof is not None:
+                part, report = part
+                prof.merge(report)
+            nxt = next(ranges, None)
+            if nxt is not None:
+                pending.append(pool.submit(_page_range_to_lines, pdf_path, *nxt, lang, dpi, cache,
+                                           prof is not None, layout))
+            yield from part
+
+def pdf_to_lines(pdf_path: str, workers: int = 0, lang: str = OCR_LANG, dpi: Optional[int] = None,
+                 cache: Optional[PageCache] = None, layout: bool = False) -> list[list]:
+    """Return the lines of every page of ``pdf_path`` (see :func:`iter_pdf_lines`)."""
+    return list(iter_pdf_lines(pdf_path, workers=workers, lang=lang, dpi=dpi, cache=cache, layout=layout))
 
 SEC_EFETIVOS  = re.compile(r"CANDIDAT[OA]S?\s+EFETIV[OA]S", re.I)
 SEC_SUPLENTES = re.compile(r"CANDIDAT[OA]S?\s+SUPLENTES",   re.I)
@@ -65,3 +295,53 @@ def guess_sigla(line: str) -> Optional[str]:
         return cleaned
 
     return None
+
+_HEADER_LEAD = re.compile(rf"^\s*(?:(?=[A-ZÁÉÍÓÚÂÊÔÃÕÇ]){_SIGLA_PART}\s*-\s*\S|(?i:LISTA)\s+[A-Z0-9]\b)")
+_NAME_WORD = re.compile(r"^(?:[A-ZÁÉÍÓÚÂÊÔÃÕÇ][\w'.-]*|d[aoe]s?|e)$")
+
+def candidate_name(line: str) -> Optional[str]:
+    """Return the name of a numbered candidate line that looks like a person's name."""
+    m = LINE_NUM.match(line)
+    if not m:
+        return None
+    words = m.group(2).split()
+    if len(words) >= 2 and not any(ch.isdigit() for ch in m.group(2)) and all(_NAME_WORD.match(w) for w in words):
+        return m.group(2)
+    return None
+
+def rule_label(line: str) -> Optional[str]:
+    """Return the line label when the regex heuristics decide it unambiguously.
+
+    Only one of the section, list-header and numbered-candidate rules may
+    fire; anything else (including lines matching several rules) returns
+    ``None`` and is left to the classifier.
+    """
+    is_secao = bool(SEC_EFETIVOS.search(line) or SEC_SUPLENTES.search(line))
+    is_header = bool(_HEADER_LEAD.match(line)) and (guess_sigla(line) or sigla_from_lista(line)) is not None
+    is_candidato = candidate_name(line) is not None
+    if is_secao + is_header + is_candidato != 1:
+        return None
+    if is_secao:
+        return "SECAO"
+    if is_header:
+        return "HEADER_LISTA"
+    return "CANDIDATO"
+
+def layout_label(line: LayoutLine) -> Optional[str]:
+    """Return the label that the layout features of ``line`` settle on their own.
+
+    Bold section titles and bold ``SIGLA - Nome`` headers, and non-bold
+    numbered rows whose number sits in the numbering gutter and whose text
+    reads as a name, are decided here; bold also breaks the ties that make
+    :func:`rule_label` give up.  Anything else returns ``None``.
+    """
+    text = line.text
+    if line.bold:
+        if SEC_EFETIVOS.search(text) or SEC_SUPLENTES.search(text):
+            return "SECAO"
+        if not line.numbered and _HEADER_LEAD.match(text) and guess_sigla(text) is not None:
+            return "HEADER_LISTA"
+        return None
+    if line.numbered and candidate_name(text) is not None:
+        return "CANDIDATO"
+    return None
@@ -0,0 +1,200 @@
+"""Output writers for extracted rows: ``;`` CSV, JSON Lines and Parquet.
+
+Every writer takes whole chunks of rows (``write(rows)``) and is used as a
+context manager, so the pipeline never builds a document's rows up in
+memory.  The CSV keeps the historical layout (utf-8-sig, ``;``, booleans as
+``True``/``False``); JSON Lines and Parquet keep the column types
+(:data:`COLUMN_TYPES`), so analytics jobs can load them without re-parsing.
+Parquet needs the optional ``pyarrow`` dependency (``pip install .[parquet]``)
+and can be partitioned hive-style by columns such as DTMNFR/ORGAO.
+"""
+from __future__ import annotations
+import csv, glob, json, os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# columns that are not plain strings; the Parquet schema uses these types
+COLUMN_TYPES: Dict[str, str] = {
+    "NUM_ORDEM": "int32",
+    "INDEPENDENTE": "bool",
+    "PAGINA": "int32",
+    "LINHA": "int32",
+    "CONFIANCA": "float32",
+}
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+FORMATS = tuple(EXTENSIONS)
+
+
+def format_of(path: str) -> str:
+    """Guess the output format from the extension of ``path`` (``csv`` when unknown)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    return "csv"
+
+
+class RowWriter:
+    """Base class: ``with open_writer(path, columns) as w: w.write(rows)``."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def output_path(path: str, partition_by: Sequence[str] = ()) -> str:
+    """Where the output written for ``path`` lives: the file itself, or the dataset root holding its partitions."""
+    return (os.path.dirname(path) or ".") if partition_by else path
+
+
+def _ensure_parent(path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+
+class CsvRowWriter(RowWriter):
+    def __init__(self, path: str, columns: Sequence[str]):
+        super().__init__(path, columns)
+        _ensure_parent(path)
+        self._f = open(path, "w", newline="", encoding="utf-8-sig")
+        self._w = csv.writer(self._f, delimiter=";")
+        self._w.writerow(self.columns)
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        self._w.writerows(rows)
+        self.rows += len(rows)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class JsonlRowWriter(RowWriter):
+    """One JSON object per row, keyed by column name, with numbers and booleans kept as such."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        super().__init__(path, columns)
+        _ensure_parent(path)
+        self._f = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        self._f.write("".join(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n"
+                              for row in rows))
+        self.rows += len(rows)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ParquetRowWriter(RowWriter):
+    """Typed Parquet output, one row group per :meth:`write`.
+
+    With ``partition_by`` the rows are split hive-style: ``a/b/out.parquet``
+    partitioned by DTMNFR and ORGAO becomes
+    ``a/b/DTMNFR=<x>/ORGAO=<y>/out.parquet``, one file per partition, and the
+    partition columns are left out of the files (readers take them from the
+    path).  The partition files of ``out.parquet`` left by an earlier run are
+    removed first, so a partition that has no rows any more does not linger.
+    Without ``partition_by`` a document with no rows still gets an empty file
+    with the schema.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], partition_by: Sequence[str] = ()):
+        super().__init__(path, columns)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet output needs pyarrow (pip install .[parquet])") from exc
+        unknown = set(partition_by) - set(self.columns)
+        if unknown:
+            raise ValueError(f"cannot partition by unknown columns: {sorted(unknown)}")
+        self._pa, self._pq = pa, pq
+        self.partition_by = list(partition_by)
+        self._keys = [self.columns.index(c) for c in self.partition_by]
+        self._kept = [i for i in range(len(self.columns)) if i not in self._keys]
+        self._schema = pa.schema([(name, pa.type_for_alias(COLUMN_TYPES.get(name, "string")))
+                                  for name in (self.columns[i] for i in self._kept)])
+        self._writers: Dict[Tuple, object] = {}
+        if self.partition_by:
+            self._clear_partitions()
+
+    def _clear_partitions(self) -> None:
+        root, name = os.path.split(self.path)
+        root = os.path.normpath(root or ".")
+        pattern = os.path.join(glob.escape(root), *(f"{glob.escape(col)}=*" for col in self.partition_by),
+                               glob.escape(name))
+        for path in glob.glob(pattern):
+            os.remove(path)
+            parent = os.path.dirname(path)
+            while os.path.normpath(parent) != root and not os.listdir(parent):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+
+    def _file(self, key: Tuple) -> str:
+        root, name = os.path.split(self.path)
+        parts = [f"{col}={value}" for col, value in zip(self.partition_by, key)]
+        return os.path.join(root, *parts, name)
+
+    def _writer(self, key: Tuple):
+        if key not in self._writers:
+            path = self._file(key)
+            _ensure_parent(path)
+            self._writers[key] = self._pq.ParquetWriter(path, self._schema)
+        return self._writers[key]
+
+    def _batch(self, rows: Sequence[Sequence]):
+        pa = self._pa
+        return pa.RecordBatch.from_arrays(
+            [pa.array([row[i] for row in rows], type=field.type) for i, field in zip(self._kept, self._schema)],
+            schema=self._schema)
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        if not rows:
+            return
+        groups: Dict[Tuple, List[Sequence]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row[i] for i in self._keys), []).append(row)
+        for key, part in groups.items():
+            self._writer(key).write_batch(self._batch(part))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if not self._writers and not self.partition_by:
+            self._writer(())
+        for w in self._writers.values():
+            w.close()
+        self._writers.clear()
+
+
+def open_writer(path: str, columns: Sequence[str], fmt: Optional[str] = None,
+                partition_by: Sequence[str] = ()) -> RowWriter:
+    """Open a writer for ``path`` in ``fmt`` (by default guessed with :func:`format_of`)."""
+    fmt = fmt or format_of(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}; expected one of {FORMATS}")
+    if partition_by and fmt != "parquet":
+        raise ValueError("partition_by is only supported for Parquet output")
+    if fmt == "parquet":
+        return ParquetRowWriter(path, columns, partition_by=partition_by)
+    return (JsonlRowWriter if fmt == "jsonl" else CsvRowWriter)(path, columns)
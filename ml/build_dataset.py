@@ -1,6 +1,8 @@
 from __future__ import annotations
-import os, csv
+import argparse, csv, json, os, tempfile
+from concurrent.futures import ProcessPoolExecutor
 from cne_ml_extractor.utils import (
+    file_sha256,
     pdf_to_lines,
     SEC_EFETIVOS,
     SEC_SUPLENTES,
@@ -8,55 +10,117 @@ from cne_ml_extractor.utils import (
     normalize_quotes_dashes,
     guess_sigla,
 )
+from cne_ml_extractor.page_cache import PageCache
 
 IN_ROOT = './samples'
 OUT_DIR = './data'
-os.makedirs(os.path.join(OUT_DIR,'line_cls'), exist_ok=True)
-os.makedirs(os.path.join(OUT_DIR,'ner'), exist_ok=True)
+SHARD_VERSION = 1  # mudar quando label_line mudar, para re-rotular todos os PDFs
+
+def label_line(line):
+    """Return ``(label, bio)`` for one normalised line; ``bio`` is a list of (token, tag) for CANDIDATO lines."""
+    if SEC_EFETIVOS.search(line) or SEC_SUPLENTES.search(line):
+        return 'SECAO', None
+    sigla_hint = guess_sigla(line)
+    if sigla_hint and ("-" in line or "LISTA" in line.upper()):
+        return 'HEADER_LISTA', None
+    m = LINE_NUM.match(line)
+    if m:
+        tokens = line.split()
+        # marca tokens do nome como BIO (heurístico simples)
+        try:
+            start = tokens.index(m.group(1)) + 1
+        except ValueError:
+            start = 1
+        tags = ['O' if i < start else 'B-NOME' if i == start else 'I-NOME' for i in range(len(tokens))]
+        return 'CANDIDATO', list(zip(tokens, tags))
+    return 'OUTRO', None
+
+def label_pdf(pdf, cache_dir=None):
+    """Label every line of ``pdf``: ``{"lines": [[text, label], ...], "ner": [[[tok, tag], ...], ...]}``."""
+    cache = PageCache(cache_dir) if cache_dir else PageCache()  # mesma cache de páginas/OCR que o pipeline
+    lines, ner = [], []
+    for page in pdf_to_lines(pdf, cache=cache):
+        for raw in page:
+            line = normalize_quotes_dashes(raw.strip())
+            if not line: continue
+            label, bio = label_line(line)
+            lines.append([line, label])
+            if bio is not None:
+                ner.append(bio)
+    return {'lines': lines, 'ner': ner}
+
+def shard_path(shard_dir, sha256):
+    return os.path.join(shard_dir, f'{sha256}-v{SHARD_VERSION}.json')
+
+def build_shard(pdf, path, cache_dir=None):
+    """Label ``pdf`` into the shard file ``path`` (written atomically); runs in a worker process."""
+    shard = label_pdf(pdf, cache_dir)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({'pdf': pdf, **shard}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return pdf
+
+def find_pdfs(root):
+    return sorted(os.path.join(d, fn) for d, _, files in os.walk(root) for fn in files if fn.lower().endswith('.pdf'))
+
+def merge_shards(shard_paths, line_csv, ner_conll):
+    """Concatenate shards into the line CSV and the CoNLL file (one sentence per CANDIDATO row, same order)."""
+    n_lines = 0
+    with open(line_csv, 'w', newline='', encoding='utf-8') as f_line, open(ner_conll, 'w', encoding='utf-8') as f_ner:
+        w_line = csv.writer(f_line); w_line.writerow(['text','label'])
+        for path in shard_paths:
+            with open(path, encoding='utf-8') as f:
+                shard = json.load(f)
+            w_line.writerows(shard['lines'])
+            n_lines += len(shard['lines'])
+            for bio in shard['ner']:
+                f_ner.write(''.join(f"{t} {tag}\n" for t, tag in bio) + "\n")
+    return n_lines
+
+def build_dataset(root=IN_ROOT, out_dir=OUT_DIR, workers=None, force=False, cache_dir=None):
+    """Extract and label new or changed PDFs of ``root`` in a process pool, then merge every shard.
+
+    Shards live in ``<out_dir>/shards`` keyed by the PDF's SHA-256, so an
+    unchanged PDF (even moved or renamed) is never extracted again; shards of
+    PDFs that are gone are deleted.  Returns ``(n_pdfs, n_built, n_lines)``.
+    """
+    shard_dir = os.path.join(out_dir, 'shards')
+    for d in (shard_dir, os.path.join(out_dir, 'line_cls'), os.path.join(out_dir, 'ner')):
+        os.makedirs(d, exist_ok=True)
+    pdfs = find_pdfs(root)
+    shards = [shard_path(shard_dir, file_sha256(pdf)) for pdf in pdfs]
+    todo = {s: pdf for pdf, s in zip(pdfs, shards) if force or not os.path.exists(s)}
+    if todo:
+        workers = workers or max(1, min(len(todo), os.cpu_count() or 1))
+        if workers == 1:
+            for s, pdf in todo.items():
+                build_shard(pdf, s, cache_dir)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for done in pool.map(build_shard, todo.values(), todo.keys(), [cache_dir] * len(todo)):
+                    print(f"[INFO] {done}")
+    keep = set(shards)
+    for fn in os.listdir(shard_dir):
+        path = os.path.join(shard_dir, fn)
+        if path not in keep:
+            os.remove(path)
+    unique = list(dict.fromkeys(shards))  # cópias idênticas do mesmo PDF entram uma só vez
+    n_lines = merge_shards(unique, os.path.join(out_dir, 'line_cls', 'all_lines.csv'),
+                           os.path.join(out_dir, 'ner', 'all.conll'))
+    return len(pdfs), len(todo), n_lines
 
 def main():
-    line_csv = os.path.join(OUT_DIR, 'line_cls', 'all_lines.csv')
-    ner_conll = os.path.join(OUT_DIR, 'ner', 'all.conll')
-    w_line = csv.writer(open(line_csv, 'w', newline='', encoding='utf-8')); w_line.writerow(['text','label'])
-    ner_out = open(ner_conll, 'w', encoding='utf-8')
-
-    for dirpath, dirnames, filenames in os.walk(IN_ROOT):
-        for fn in filenames:
-            if not fn.lower().endswith('.pdf'): continue
-            pdf = os.path.join(dirpath, fn)
-            pages = pdf_to_lines(pdf)
-            for lines in pages:
-                for raw in lines:
-                    line = normalize_quotes_dashes(raw.strip())
-                    if not line: continue
-                    if SEC_EFETIVOS.search(line):
-                        w_line.writerow([line,'SECAO']); continue
-                    if SEC_SUPLENTES.search(line):
-                        w_line.writerow([line,'SECAO']); continue
-                    sigla_hint = guess_sigla(line)
-                    if sigla_hint and ("-" in line or "LISTA" in line.upper()):
-                        w_line.writerow([line,'HEADER_LISTA']); continue
-                    if LINE_NUM.match(line):
-                        w_line.writerow([line,'CANDIDATO'])
-                        m = LINE_NUM.match(line)
-                        tokens = line.split()
-                        # marca tokens do nome como BIO (heurístico simples)
-                        try:
-                            num_tok = tokens.index(m.group(1))
-                            start = num_tok + 1
-                        except Exception:
-                            start = 1
-                        for i,t in enumerate(tokens):
-                            if i < start: tag = 'O'
-                            elif i == start: tag = 'B-NOME'
-                            else: tag = 'I-NOME'
-                            ner_out.write(f"{t} {tag}\n")
-                        ner_out.write("\n")
-                        continue
-                    w_line.writerow([line,'OUTRO'])
-
-    ner_out.close()
-    print(f"[OK] Dataset: {line_csv} / {ner_conll}")
+    ap = argparse.ArgumentParser(description='Gera all_lines.csv e all.conll a partir dos PDFs, só reprocessando os novos ou alterados.')
+    ap.add_argument('--root', default=IN_ROOT)
+    ap.add_argument('--out', default=OUT_DIR)
+    ap.add_argument('--workers', type=int, help='processos (por omissão: um por núcleo)')
+    ap.add_argument('--cache-dir', help='cache de páginas/OCR (por omissão a cache partilhada)')
+    ap.add_argument('--force', action='store_true', help='re-extrair todos os PDFs')
+    args = ap.parse_args()
+    n_pdfs, n_built, n_lines = build_dataset(args.root, args.out, args.workers, args.force, args.cache_dir)
+    print(f"[OK] Dataset: {n_pdfs} PDF(s), {n_built} extraído(s) de novo, {n_lines} linhas em "
+          f"{os.path.join(args.out, 'line_cls', 'all_lines.csv')} / {os.path.join(args.out, 'ner', 'all.conll')}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import argparse, csv, json, os
+from cne_ml_extractor.cascade import (THRESHOLDS_FILE, Thresholds, calibrate_accept, calibrate_cascade,
+                                      cascade_report)
+from cne_ml_extractor.ml_infer import MLExtractor
+from cne_ml_extractor.student import HashedNgramClassifier
+
+DEV = './data/line_cls/dev.csv'
+LINE_MODEL = './models/line-cls-xlmr'
+NER_MODEL  = './models/ner-nome-xlmr'
+
+def load_dev(path: str):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [r for r in csv.DictReader(f) if r.get('text')]
+    return [r['text'] for r in rows], [r['label'] for r in rows]
+
+def main():
+    ap = argparse.ArgumentParser(description='Calibra limiares de confiança por rótulo (e da cascata) no split dev.')
+    ap.add_argument('--dev', default=DEV, help='split dev gravado por ml/train_line_cls.py')
+    ap.add_argument('--line-model', default=LINE_MODEL)
+    ap.add_argument('--ner-model', default=NER_MODEL)
+    ap.add_argument('--student', help='classificador leve (ml/distill_line_cls.py) a usar como 1.ª fase da cascata')
+    ap.add_argument('--target', type=float, default=0.995,
+                    help='precisão mínima das linhas que a 1.ª fase decide sem o XLM-R')
+    ap.add_argument('--min-support', type=int, default=20, help='linhas dev mínimas para confiar num limiar')
+    ap.add_argument('--batch-size', type=int, default=64)
+    ap.add_argument('--out', help=f'ficheiro JSON (por omissão <line-model>/{THRESHOLDS_FILE})')
+    args = ap.parse_args()
+
+    texts, gold = load_dev(args.dev)
+    full = MLExtractor(args.line_model, args.ner_model).classify_lines(texts, batch_size=args.batch_size)
+    accept = calibrate_accept(full, gold)
+    cfg = {'accept': {lbl: r['threshold'] for lbl, r in accept.items()},
+           'report': {'dev_lines': len(texts), 'accept': accept}}
+    print(f"[dev] {len(texts)} linhas")
+    for lbl, r in accept.items():
+        print(f"  aceitar {lbl:<13} p>={r['threshold']:.2f}  F1={r['f1']:.4f}  ({r['support']} linhas)")
+
+    if args.student:
+        first = HashedNgramClassifier.load(args.student).classify_lines(texts)
+        cascade = calibrate_cascade(first, gold, target=args.target, min_support=args.min_support)
+        cfg['cascade'] = {lbl: r['threshold'] for lbl, r in cascade.items()}
+        report = cascade_report(first, full, gold, Thresholds(cfg['cascade'], default=float('inf')))
+        cfg['report'].update(cascade=cascade, cascade_dev=report)
+        for lbl, r in cascade.items():
+            print(f"  cascata {lbl:<13} p>={r['threshold']:.2f}  precisão={r['precision']:.4f}  ({r['accepted']} linhas)")
+        print(f"  XLM-R em {100 * report['escalated_share']:.1f}% das linhas; exatidão "
+              f"{report['cascade_accuracy']:.4f} (só XLM-R: {report['full_accuracy']:.4f})")
+
+    out = args.out or os.path.join(args.line_model, THRESHOLDS_FILE)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(cfg, f, indent=2, ensure_ascii=False)
+    print("[OK] Limiares salvos em", out)
+
+if __name__ == '__main__':
+    main()
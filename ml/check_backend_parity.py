@@ -0,0 +1,64 @@
+from __future__ import annotations
+import argparse, csv, json, sys, time
+from cne_ml_extractor.ml_infer import BACKENDS, MLExtractor
+
+DEV = './data/line_cls/dev.csv'
+LINE_MODEL = './models/line-cls-xlmr'
+NER_MODEL  = './models/ner-nome-xlmr'
+
+def load_dev(path: str):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [r for r in csv.DictReader(f) if r.get('text')]
+    return [r['text'] for r in rows], [r['label'] for r in rows]
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+def compare(ref: MLExtractor, cand: MLExtractor, texts, gold, batch_size: int = 64) -> dict:
+    """Compare ``cand`` against the fp32 reference on the dev split."""
+    ref_lbl, t_ref = timed(ref.classify_lines, texts, batch_size=batch_size)
+    cand_lbl, t_cand = timed(cand.classify_lines, texts, batch_size=batch_size)
+    cand_lines = [t for t, g in zip(texts, gold) if g == 'CANDIDATO']
+    ref_nome, t_ref_ner = timed(ref.extract_nomes, cand_lines, batch_size=batch_size)
+    cand_nome, t_cand_ner = timed(cand.extract_nomes, cand_lines, batch_size=batch_size)
+    n = max(1, len(texts))
+    return {
+        'lines': len(texts),
+        'label_agreement': sum(a[0] == b[0] for a, b in zip(ref_lbl, cand_lbl)) / n,
+        'max_prob_diff': max((abs(a[1] - b[1]) for a, b in zip(ref_lbl, cand_lbl)), default=0.0),
+        'ref_accuracy': sum(a[0] == g for a, g in zip(ref_lbl, gold)) / n,
+        'cand_accuracy': sum(a[0] == g for a, g in zip(cand_lbl, gold)) / n,
+        'nome_agreement': sum(a == b for a, b in zip(ref_nome, cand_nome)) / max(1, len(cand_lines)),
+        'ref_ms_per_line': 1000 * t_ref / n,
+        'cand_ms_per_line': 1000 * t_cand / n,
+        'ref_ner_ms_per_line': 1000 * t_ref_ner / max(1, len(cand_lines)),
+        'cand_ner_ms_per_line': 1000 * t_cand_ner / max(1, len(cand_lines)),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description='Compara um backend de inferência com o modelo fp32 no split dev.')
+    ap.add_argument('--backend', default='onnx', choices=[b for b in BACKENDS if b != 'torch'])
+    ap.add_argument('--dev', default=DEV)
+    ap.add_argument('--line-model', default=LINE_MODEL)
+    ap.add_argument('--ner-model', default=NER_MODEL)
+    ap.add_argument('--batch-size', type=int, default=64)
+    ap.add_argument('--min-agreement', type=float, default=0.99)
+    ap.add_argument('--out', help='grava o relatório JSON neste ficheiro')
+    args = ap.parse_args()
+
+    texts, gold = load_dev(args.dev)
+    ref = MLExtractor(args.line_model, args.ner_model)
+    cand = MLExtractor(args.line_model, args.ner_model, backend=args.backend)
+    report = {'backend': args.backend, **compare(ref, cand, texts, gold, batch_size=args.batch_size)}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    ok = report['label_agreement'] >= args.min_agreement and report['nome_agreement'] >= args.min_agreement
+    print("[OK] Paridade" if ok else f"[FALHA] Paridade abaixo de {args.min_agreement}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import argparse, csv, json, os, time
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from cne_ml_extractor.ml_infer import LABELS, label_columns, line_probs
+from cne_ml_extractor.student import HashedNgramClassifier
+
+TEACHER = './models/line-cls-xlmr'
+TRAIN   = './data/line_cls/train.csv'
+DEV     = './data/line_cls/dev.csv'
+OUT     = './models/line-cls-student'
+
+def load_split(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [r for r in csv.DictReader(f) if r.get('text')]
+    return [r['text'] for r in rows], [LABELS.index(r['label']) for r in rows]
+
+def teacher_probs(tok, teacher, texts):
+    """Teacher softmax with its columns reordered from ``config.id2label`` into :data:`LABELS` order."""
+    return line_probs(tok, teacher, texts)[:, label_columns(teacher.config)]
+
+def bag_inputs(feats, rows):
+    """Pack the hashed features of ``rows`` into EmbeddingBag (indices, offsets, weights)."""
+    idx = [feats[r][0] for r in rows]
+    val = [feats[r][1] for r in rows]
+    offsets = np.cumsum([0] + [len(i) for i in idx[:-1]])
+    return (torch.from_numpy(np.concatenate(idx)), torch.from_numpy(offsets),
+            torch.from_numpy(np.concatenate(val)))
+
+def train_student(texts, gold, soft, n_features=1 << 18, epochs=20, lr=0.5, alpha=0.7, seed=42):
+    """Fit the student on ``alpha`` * teacher soft labels + (1 - ``alpha``) * gold labels."""
+    torch.manual_seed(seed)
+    student = HashedNgramClassifier(LABELS, n_features=n_features)
+    feats = [student.features(t) for t in texts]
+    bag = torch.nn.EmbeddingBag(n_features, len(LABELS), mode='sum')
+    torch.nn.init.zeros_(bag.weight)
+    bias = torch.nn.Parameter(torch.zeros(len(LABELS)))
+    opt = torch.optim.Adagrad([bag.weight, bias], lr=lr)
+    gold_t = torch.tensor(gold)
+    for epoch in range(epochs):
+        perm = torch.randperm(len(texts))
+        for start in range(0, len(texts), 256):
+            rows = perm[start:start + 256]
+            idx, offsets, val = bag_inputs(feats, rows.tolist())
+            logp = torch.log_softmax(bag(idx, offsets, per_sample_weights=val) + bias, dim=-1)
+            hard = logp[torch.arange(len(rows)), gold_t[rows]]
+            loss = -(alpha * (soft[rows] * logp).sum(-1) + (1 - alpha) * hard).mean()
+            opt.zero_grad(); loss.backward(); opt.step()
+    student.weights = bag.weight.detach().numpy().astype(np.float32)
+    student.bias = bias.detach().numpy().astype(np.float32)
+    return student
+
+def evaluate(name, classify, texts, gold):
+    t0 = time.perf_counter()
+    pred = classify(texts)
+    secs = time.perf_counter() - t0
+    acc = sum(LABELS.index(p[0]) == g for p, g in zip(pred, gold)) / max(1, len(gold))
+    print(f"  {name:<8} acc={acc:.4f}  {len(texts) / max(secs, 1e-9):,.0f} linhas/s")
+    return pred, {'accuracy': acc, 'lines_per_s': len(texts) / max(secs, 1e-9)}
+
+def main():
+    ap = argparse.ArgumentParser(description='Destila o classificador de linhas XLM-R num modelo de n-gramas.')
+    ap.add_argument('--teacher', default=TEACHER)
+    ap.add_argument('--train', default=TRAIN)
+    ap.add_argument('--dev', default=DEV)
+    ap.add_argument('--out', default=OUT)
+    ap.add_argument('--n-features', type=int, default=1 << 18)
+    ap.add_argument('--epochs', type=int, default=20)
+    ap.add_argument('--alpha', type=float, default=0.7, help='peso das etiquetas suaves do professor')
+    args = ap.parse_args()
+
+    tok = AutoTokenizer.from_pretrained(args.teacher)
+    teacher = AutoModelForSequenceClassification.from_pretrained(args.teacher).eval()
+    texts, gold = load_split(args.train)
+    soft = teacher_probs(tok, teacher, texts)
+    student = train_student(texts, gold, soft, n_features=args.n_features, epochs=args.epochs, alpha=args.alpha)
+    student.save(args.out)
+
+    dev_texts, dev_gold = load_split(args.dev)
+    print(f"[dev] {len(dev_texts)} linhas")
+    t_pred, t_rep = evaluate('teacher', lambda xs: [(LABELS[int(i)], 0.0) for i in teacher_probs(tok, teacher, xs).argmax(-1)],
+                             dev_texts, dev_gold)
+    s_pred, s_rep = evaluate('student', student.classify_lines, dev_texts, dev_gold)
+    agreement = sum(a[0] == b[0] for a, b in zip(t_pred, s_pred)) / max(1, len(dev_texts))
+    report = {'dev_lines': len(dev_texts), 'teacher': t_rep, 'student': s_rep, 'agreement': agreement,
+              'speedup': s_rep['lines_per_s'] / max(t_rep['lines_per_s'], 1e-9)}
+    with open(os.path.join(args.out, 'student_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"  concordância={agreement:.4f}  speedup={report['speedup']:.1f}x")
+    print("[OK] Estudante salvo em", args.out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+import argparse, os
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoModelForTokenClassification
+from cne_ml_extractor.ml_infer import ONNX_FILES, ONNX_SUBDIR
+
+LINE_MODEL = './models/line-cls-xlmr'
+NER_MODEL  = './models/ner-nome-xlmr'
+
+def export(model_cls, model_dir: str, quantize: bool = True, opset: int = 17) -> str:
+    """Write ``<model_dir>/onnx/model.onnx`` (and the int8 variant) for ONNX Runtime."""
+    out_dir = os.path.join(model_dir, ONNX_SUBDIR)
+    os.makedirs(out_dir, exist_ok=True)
+    tok = AutoTokenizer.from_pretrained(model_dir)
+    m = model_cls.from_pretrained(model_dir, attn_implementation='eager').eval()
+    m.config.return_dict = True
+    enc = tok(["1 João Silva", "PS - Partido Socialista"], padding=True, return_tensors='pt')
+    path = os.path.join(out_dir, ONNX_FILES['onnx'])
+    axes = {'input_ids': {0: 'batch', 1: 'seq'}, 'attention_mask': {0: 'batch', 1: 'seq'}}
+    axes['logits'] = {0: 'batch', 1: 'seq'} if model_cls is AutoModelForTokenClassification else {0: 'batch'}
+    with torch.no_grad():
+        torch.onnx.export(m, (), path, kwargs={'input_ids': enc['input_ids'], 'attention_mask': enc['attention_mask']},
+                          input_names=['input_ids', 'attention_mask'], output_names=['logits'],
+                          dynamic_axes=axes, opset_version=opset, dynamo=False)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(path, os.path.join(out_dir, ONNX_FILES['onnx-int8']), weight_type=QuantType.QInt8)
+    return out_dir
+
+def main():
+    ap = argparse.ArgumentParser(description='Exporta os modelos de linha e NER para ONNX Runtime.')
+    ap.add_argument('--line-model', default=LINE_MODEL)
+    ap.add_argument('--ner-model', default=NER_MODEL)
+    ap.add_argument('--no-int8', action='store_true', help='não gerar a variante quantizada int8')
+    args = ap.parse_args()
+    for model_cls, model_dir in ((AutoModelForSequenceClassification, args.line_model),
+                                 (AutoModelForTokenClassification, args.ner_model)):
+        out_dir = export(model_cls, model_dir, quantize=not args.no_int8)
+        print("[OK] ONNX em", out_dir)
+    print("Verifica a paridade com: python ./ml/check_backend_parity.py --backend onnx")
+
+if __name__ == '__main__':
+    main()
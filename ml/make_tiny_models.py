@@ -0,0 +1,74 @@
+from __future__ import annotations
+import os, sys
+from tokenizers import Tokenizer, models, pre_tokenizers, processors, trainers
+from transformers import (PreTrainedTokenizerFast, XLMRobertaConfig, XLMRobertaModel,
+                          XLMRobertaForSequenceClassification, XLMRobertaForTokenClassification)
+
+OUT = './models/tiny'
+LINE_LABELS = ["OUTRO","SECAO","HEADER_LISTA","CANDIDATO"]
+NER_LABELS = ["B-NOME","I-NOME","O"]
+
+CORPUS = [
+    "1. Assembleia Municipal", "2. Câmara Municipal",
+    "CANDIDATOS EFETIVOS", "CANDIDATOS SUPLENTES",
+    "PS - Partido Socialista", "PPD/PSD - Partido Social Democrata", "Lista A - Movimento Independente",
+    "1 João Silva", "2 Maria Costa", "3 Carlos Gomes", "4 Ana Dias", "5 Rui Pereira Santos",
+    "Edital", "O Presidente", "Tribunal da Comarca", "Eleição dos órgãos das autarquias locais",
+]
+
+def build_tokenizer() -> PreTrainedTokenizerFast:
+    """Train a small word-piece tokenizer with the XLM-R special tokens."""
+    tok = Tokenizer(models.WordPiece(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    trainer = trainers.WordPieceTrainer(vocab_size=400, special_tokens=["<s>","<pad>","</s>","<unk>","<mask>"])
+    tok.train_from_iterator(CORPUS * 4, trainer=trainer)
+    tok.post_processor = processors.TemplateProcessing(
+        single="<s> $A </s>", pair="<s> $A </s> </s> $B </s>",
+        special_tokens=[("<s>", tok.token_to_id("<s>")), ("</s>", tok.token_to_id("</s>"))],
+    )
+    return PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>", unk_token="<unk>",
+                                   pad_token="<pad>", mask_token="<mask>", cls_token="<s>", sep_token="</s>")
+
+def tiny_config(tok: PreTrainedTokenizerFast, labels: list[str]) -> XLMRobertaConfig:
+    return XLMRobertaConfig(
+        vocab_size=len(tok), hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        max_position_embeddings=130, pad_token_id=tok.pad_token_id, bos_token_id=tok.bos_token_id,
+        eos_token_id=tok.eos_token_id, id2label=dict(enumerate(labels)), label2id={l:i for i,l in enumerate(labels)},
+    )
+
+def build_tiny_models(out_dir: str = OUT, seed: int = 0, line_labels: list[str] = LINE_LABELS) -> tuple[str, str]:
+    """Write random-init line-cls and NER models small enough for offline tests and benchmarks.
+
+    ``line_labels`` sets the line model's ``id2label`` order (``ml/train_line_cls.py`` sorts it).
+    """
+    import torch
+    torch.manual_seed(seed)
+    tok = build_tokenizer()
+    line_dir = os.path.join(out_dir, 'line-cls')
+    ner_dir = os.path.join(out_dir, 'ner-nome')
+    for path, cls, labels in ((line_dir, XLMRobertaForSequenceClassification, line_labels),
+                              (ner_dir, XLMRobertaForTokenClassification, NER_LABELS)):
+        os.makedirs(path, exist_ok=True)
+        cls(tiny_config(tok, labels)).save_pretrained(path)
+        tok.save_pretrained(path)
+    return line_dir, ner_dir
+
+def build_tiny_joint(out_dir: str = OUT, seed: int = 0) -> str:
+    """Write a random-init joint line+NER model (see ``cne_ml_extractor.joint``)."""
+    import torch
+    from cne_ml_extractor.joint import JointLineNerModel
+    torch.manual_seed(seed)
+    tok = build_tokenizer()
+    joint_dir = os.path.join(out_dir, 'joint')
+    JointLineNerModel(XLMRobertaModel(tiny_config(tok, LINE_LABELS)), LINE_LABELS, NER_LABELS).save_pretrained(joint_dir)
+    tok.save_pretrained(joint_dir)
+    return joint_dir
+
+def main():
+    out = sys.argv[1] if len(sys.argv) > 1 else OUT
+    line_dir, ner_dir = build_tiny_models(out)
+    joint_dir = build_tiny_joint(out)
+    print("[OK] Modelos tiny em", line_dir, "/", ner_dir, "/", joint_dir)
+
+if __name__ == '__main__':
+    main()
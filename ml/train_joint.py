@@ -0,0 +1,87 @@
+from __future__ import annotations
+import argparse, csv, random
+import torch
+from torch.nn.utils.rnn import pad_sequence
+from transformers import AutoTokenizer, TrainingArguments, Trainer
+from cne_ml_extractor.conll import iter_conll
+from cne_ml_extractor.joint import JointLineNerModel
+from cne_ml_extractor.ml_infer import LABELS
+
+LINES = './data/line_cls/all_lines.csv'
+CONLL = './data/ner/all.conll'
+OUT   = './models/line-ner-joint'
+BASE  = 'xlm-roberta-base'
+
+def load_joint(lines_csv, conll):
+    """Pair every line with its label and, for CANDIDATO lines, its BIO tags.
+
+    ``ml/build_dataset.py`` writes one CoNLL sentence per CANDIDATO row, in the
+    same order, so the two files are zipped rather than matched by text.
+    """
+    sentences = list(iter_conll(conll))
+    with open(lines_csv, newline='', encoding='utf-8') as f:
+        rows = [r for r in csv.DictReader(f) if r.get('text')]
+    texts, labels, ner = [], [], []
+    k = 0
+    for r in rows:
+        texts.append(r['text']); labels.append(r['label'])
+        if r['label'] == 'CANDIDATO' and k < len(sentences) and sentences[k]['tokens'] == r['text'].split():
+            ner.append(sentences[k]['ner_tags']); k += 1
+        else:
+            ner.append(None)
+    return texts, labels, ner
+
+def main():
+    ap = argparse.ArgumentParser(description='Treina o modelo conjunto (etiqueta de linha + NOME) num só encoder.')
+    ap.add_argument('--lines', default=LINES)
+    ap.add_argument('--conll', default=CONLL)
+    ap.add_argument('--base', default=BASE)
+    ap.add_argument('--out', default=OUT)
+    ap.add_argument('--epochs', type=float, default=5)
+    ap.add_argument('--line-weight', type=float, default=1.0, help='peso da perda de classificação de linhas')
+    args = ap.parse_args()
+
+    texts, labels, ner = load_joint(args.lines, args.conll)
+    ner_labels = sorted({t for seq in ner if seq for t in seq} | {'O'})
+    line2id = {l: i for i, l in enumerate(LABELS)}
+    ner2id = {l: i for i, l in enumerate(ner_labels)}
+    tok = AutoTokenizer.from_pretrained(args.base)
+
+    def features(i):
+        words = texts[i].split()
+        enc = tok(words, is_split_into_words=True, truncation=True)
+        if ner[i] is None:
+            y = [-100] * len(enc['input_ids'])
+        else:
+            # only the first sub-token of each word is tagged, as in decode_nome
+            y, seen = [], set()
+            for wid in enc.word_ids():
+                y.append(-100 if wid is None or wid in seen else ner2id[ner[i][wid]])
+                if wid is not None: seen.add(wid)
+        return {'input_ids': enc['input_ids'], 'attention_mask': enc['attention_mask'],
+                'line_labels': line2id[labels[i]], 'ner_labels': y}
+
+    idx = [i for i, t in enumerate(texts) if t.split()]
+    random.Random(42).shuffle(idx)
+    m = int(0.8 * len(idx))
+    ds_train = [features(i) for i in idx[:m]]
+    ds_dev = [features(i) for i in idx[m:]]
+
+    def collate(batch):
+        def pad(key, pad_val):
+            return pad_sequence([torch.tensor(f[key]) for f in batch], batch_first=True, padding_value=pad_val)
+        return {'input_ids': pad('input_ids', tok.pad_token_id), 'attention_mask': pad('attention_mask', 0),
+                'line_labels': torch.tensor([f['line_labels'] for f in batch]), 'ner_labels': pad('ner_labels', -100)}
+
+    model = JointLineNerModel.from_encoder(args.base, LABELS, ner_labels, line_weight=args.line_weight)
+    targs = TrainingArguments(output_dir=args.out, per_device_train_batch_size=16, per_device_eval_batch_size=16,
+                              learning_rate=3e-5, num_train_epochs=args.epochs, eval_strategy='epoch',
+                              save_strategy='no', logging_steps=50, label_names=['line_labels', 'ner_labels'],
+                              remove_unused_columns=False)
+    tr = Trainer(model=model, args=targs, train_dataset=ds_train, eval_dataset=ds_dev, data_collator=collate)
+    tr.train()
+    model.save_pretrained(args.out); tok.save_pretrained(args.out)
+    print("[OK] Modelo conjunto salvo em", args.out)
+
+if __name__ == '__main__':
+    main()
@@ -1,62 +1,58 @@
 from __future__ import annotations
-import os, random
+import hashlib, json, os
 from transformers import AutoTokenizer, AutoModelForTokenClassification, TrainingArguments, Trainer
-from datasets import Dataset, DatasetDict
+from datasets import Dataset, DatasetDict, Features, Sequence, Value
+from cne_ml_extractor.conll import iter_conll, split_indices
+from cne_ml_extractor.utils import file_sha256
 
-DATA = './data/ner/all.conll'
-OUT  = './models/ner-nome-xlmr'
+DATA  = './data/ner/all.conll'
+OUT   = './models/ner-nome-xlmr'
+CACHE = './data/ner/cache'  # Arrow do CoNLL e da tokenização, reaproveitado entre execuções
+BASE  = 'xlm-roberta-base'
+DEV_FRAC = 0.2
+SEED  = 42
+CONLL_FEATURES = Features({'tokens': Sequence(Value('string')), 'ner_tags': Sequence(Value('string'))})
 
-def load_conll(path):
-    sents, tags = [], []
-    with open(path, 'r', encoding='utf-8') as f:
-        tokens, t = [], []
-        for line in f:
-            line=line.rstrip()
-            if not line:
-                if tokens:
-                    sents.append(tokens); tags.append(t)
-                    tokens, t = [], []
-                continue
-            tok, tag = line.split()
-            tokens.append(tok); t.append(tag)
-    if tokens: sents.append(tokens); tags.append(t)
-    return sents, tags
+def load_splits(path, cache_dir=CACHE, dev_frac=DEV_FRAC, seed=SEED):
+    """Stream ``path`` into an Arrow-backed ``Dataset`` and select train/dev by index, without copying rows."""
+    digest = file_sha256(path)
+    ds = Dataset.from_generator(iter_conll, features=CONLL_FEATURES, cache_dir=cache_dir,
+                                gen_kwargs={'path': path, 'digest': digest})
+    train_idx, dev_idx = split_indices(len(ds), dev_frac, seed)
+    return DatasetDict(train=ds.select(train_idx), validation=ds.select(dev_idx)), digest
+
+def collect_labels(splits, batch_size=10_000):
+    labels = set()
+    for ds in splits.values():
+        for batch in ds.iter(batch_size=batch_size):
+            for seq in batch['ner_tags']:
+                labels.update(seq)
+    return sorted(labels)
 
 def main():
     os.makedirs(OUT, exist_ok=True)
-    sents, tags = load_conll(DATA)
-    idx = list(range(len(sents)))
-    random.Random(42).shuffle(idx)
-    m = int(0.8*len(idx))
-    train_idx, dev_idx = idx[:m], idx[m:]
-    train = {'tokens':[s for i,s in enumerate(sents) if i in train_idx], 'ner_tags':[t for i,t in enumerate(tags) if i in train_idx]}
-    dev   = {'tokens':[s for i,s in enumerate(sents) if i in dev_idx],   'ner_tags':[t for i,t in enumerate(tags) if i in dev_idx]}
+    os.makedirs(CACHE, exist_ok=True)
+    splits, digest = load_splits(DATA, dev_frac=DEV_FRAC, seed=SEED)
 
-    labels = sorted({tag for seq in (train['ner_tags']+dev['ner_tags']) for tag in seq})
+    labels = collect_labels(splits)
     label2id = {l:i for i,l in enumerate(labels)}
     id2label = {i:l for l,i in label2id.items()}
 
-    tok = AutoTokenizer.from_pretrained('xlm-roberta-base')
+    tok = AutoTokenizer.from_pretrained(BASE)
 
     def to_features(batch):
-        from transformers import BatchEncoding
-        input_ids, attn, lab = [], [], []
-        for tokens, tags in zip(batch['tokens'], batch['ner_tags']):
-            enc = tok(tokens, is_split_into_words=True, truncation=True)
-            word_ids = enc.word_ids()
-            y = []
-            for wid in word_ids:
-                if wid is None: y.append(-100)
-                else: y.append(label2id[tags[wid]])
-            input_ids.append(enc['input_ids']); attn.append(enc['attention_mask']); lab.append(y)
-        return {'input_ids': input_ids, 'attention_mask': attn, 'labels': lab}
+        enc = tok(batch['tokens'], is_split_into_words=True, truncation=True)
+        lab = []
+        for i, tags in enumerate(batch['ner_tags']):
+            lab.append([-100 if wid is None else label2id[tags[wid]] for wid in enc.word_ids(i)])
+        return {'input_ids': enc['input_ids'], 'attention_mask': enc['attention_mask'], 'labels': lab}
 
-    ds = DatasetDict(
-        train=Dataset.from_dict(train),
-        validation=Dataset.from_dict(dev),
-    ).map(to_features, batched=True)
+    # a tokenização fica em disco, identificada pelo CoNLL, pelo tokenizador, pelas etiquetas e pelo split
+    key = hashlib.sha256(json.dumps([digest, BASE, labels, splits.num_rows, DEV_FRAC, SEED]).encode()).hexdigest()[:16]
+    ds = splits.map(to_features, batched=True, remove_columns=['tokens', 'ner_tags'],
+                    cache_file_names={k: os.path.join(CACHE, f'tok-{key}-{k}.arrow') for k in splits})
 
-    m = AutoModelForTokenClassification.from_pretrained('xlm-roberta-base', num_labels=len(labels), id2label=id2label, label2id=label2id)
+    m = AutoModelForTokenClassification.from_pretrained(BASE, num_labels=len(labels), id2label=id2label, label2id=label2id)
     args = TrainingArguments(output_dir=OUT, per_device_train_batch_size=8, per_device_eval_batch_size=8, learning_rate=3e-5,
                              num_train_epochs=8, evaluation_strategy='epoch', save_strategy='epoch', logging_steps=50)
 
@@ -0,0 +1,105 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor import batch
+
+
+def make_tree(root):
+    for municipio, code in (("Odivelas", "111600"), ("Loures", None)):
+        in_dir = root / municipio / "input"
+        in_dir.mkdir(parents=True)
+        (in_dir / "edital.pdf").write_bytes(b"%PDF-1.4 " + municipio.encode())
+        (in_dir / "notas.txt").write_text("ignorar")
+        if code:
+            (root / municipio / "ALL_context.yaml").write_text(f'dtmnfr: "{code}"\norgao: null\n')
+
+
+def test_discover_jobs_reads_dtmnfr_from_context(tmp_path):
+    make_tree(tmp_path)
+
+    jobs = batch.discover_jobs(str(tmp_path))
+
+    assert [(j.municipio, j.dtmnfr) for j in jobs] == [("Odivelas", "111600")]
+    assert jobs[0].out_csv.endswith("Odivelas/output/edital_AM_CM_final.csv")
+    assert len(batch.discover_jobs(str(tmp_path), dtmnfr="999")) == 2
+
+
+def test_plan_workers_splits_cores():
+    assert batch.plan_workers(8, 100) == (4, 2)
+    assert batch.plan_workers(8, 2) == (2, 4)
+    assert batch.plan_workers(8, 100, workers=8) == (8, 1)
+    assert batch.plan_workers(1, 10) == (1, 1)
+
+
+def test_run_batch_resumes_and_records_progress(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    calls = []
+
+    def fake_process(pdf_path, dtmnfr, out_csv, stats=None, **kwargs):
+        calls.append(pdf_path)
+        Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+        Path(out_csv).write_text("DTMNFR\n")
+        stats["rows"] = 3
+        return out_csv
+
+    monkeypatch.setattr(batch, "process_pdf_to_csv", fake_process)
+    jobs = batch.discover_jobs(str(tmp_path), dtmnfr="111600")
+    opts = {"line_model_dir": "l", "ner_model_dir": "n", "device": "cpu", "dtype": "float32",
+            "batch_size": 8, "rules_first": False, "cache_dir": None, "preload": False}
+    progress = tmp_path / "progress.jsonl"
+
+    first = batch.run_batch(jobs, opts, progress_path=str(progress))
+    second = batch.run_batch(jobs, opts, progress_path=str(progress))
+
+    assert [r["status"] for r in first] == ["ok", "ok"]
+    assert [r["status"] for r in second] == ["skipped", "skipped"]
+    assert len(calls) == 2
+    recorded = [json.loads(line) for line in progress.read_text().splitlines()]
+    assert [r["rows"] for r in recorded] == [3, 3]
+
+    # a changed PDF is processed again
+    Path(jobs[0].pdf_path).write_bytes(b"%PDF-1.4 republicado")
+    third = batch.run_batch(jobs, opts, progress_path=str(progress))
+    assert [r["status"] for r in third] == ["ok", "skipped"]
+    assert batch.format_summary(third).endswith("ok=1 skipped=1")
+
+
+def test_run_batch_fuses_small_pdfs_and_falls_back_per_pdf(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    fused, single = [], []
+
+    def fake_fused(docs, stats=None, doc_stats=None, **kwargs):
+        fused.append([d[0] for d in docs])
+        if len(fused) > 1:
+            raise RuntimeError("boom")
+        for _, _, out_csv in docs:
+            Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+            Path(out_csv).write_text("DTMNFR\n")
+            doc_stats.append({"lines": 10, "rows": 2})
+        stats.update(lines=20, rows=4, model_calls=8)
+        return [d[2] for d in docs]
+
+    def fake_process(pdf_path, dtmnfr, out_csv, stats=None, **kwargs):
+        single.append(pdf_path)
+        Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+        Path(out_csv).write_text("DTMNFR\n")
+        return out_csv
+
+    monkeypatch.setattr(batch, "process_pdfs_to_csv", fake_fused)
+    monkeypatch.setattr(batch, "process_pdf_to_csv", fake_process)
+    jobs = batch.discover_jobs(str(tmp_path), dtmnfr="111600")
+    opts = {"line_model_dir": "l", "ner_model_dir": "n", "device": "cpu", "dtype": "float32",
+            "batch_size": 8, "rules_first": False, "cache_dir": None, "preload": False, "fuse": 2}
+
+    first = batch.run_batch(jobs, opts, progress_path=str(tmp_path / "p1.jsonl"))
+
+    assert [r["status"] for r in first] == ["ok", "ok"]
+    assert [(r["fused"], r["rows"], r["model_calls"]) for r in first] == [(2, 2, 4), (2, 2, 4)]
+    assert single == []
+
+    second = batch.run_batch(jobs, opts, progress_path=str(tmp_path / "p2.jsonl"))
+    assert [r["status"] for r in second] == ["ok", "ok"]
+    assert single == [j.pdf_path for j in jobs]
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import fitz
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import run
+from benchmarks.synth_edital import write_edital
+from cne_ml_extractor.pipeline_ml import LINE_NUM
+from cne_ml_extractor.utils import pdf_to_lines
+
+
+def test_write_edital_controls_size_and_scanned_pages(tmp_path):
+    pdf = write_edital(str(tmp_path / "e.pdf"), pages=3, lists=2, candidates=4, suplentes=2)
+    scanned = write_edital(str(tmp_path / "s.pdf"), pages=3, lists=2, candidates=4, suplentes=2, scanned=1)
+
+    pages = pdf_to_lines(pdf.path)
+    numbered = [ln for page in pages for ln in page if LINE_NUM.match(ln) and "Municipal" not in ln]
+
+    assert pdf.pages == len(pages) == 3
+    assert len(numbered) == pdf.candidates == 2 * 2 * (4 + 2)
+    assert "1. Assembleia Municipal" in pages[0]
+    assert scanned.scanned_pages == 1
+    with fitz.open(scanned.path) as doc:
+        assert [bool(page.get_text("text").strip()) for page in doc] == [True, True, False]
+
+
+def test_compare_flags_only_regressions():
+    old = {"results": {"small": {"pdf_to_lines": {"median_s": 1.0, "pages_per_s": 10.0}, "pages": 2}}}
+    new = {"results": {"small": {"pdf_to_lines": {"median_s": 1.05, "pages_per_s": 8.0}, "pages": 4}}}
+
+    regressions = run.compare(old, new, threshold=0.10)
+
+    assert [r["metric"] for r in regressions] == ["small.pdf_to_lines.pages_per_s"]
+
+
+def test_run_benchmarks_smoke(tmp_path):
+    report = run.run_benchmarks(["small"], repeat=1, scanned=0, models_dir=str(tmp_path))
+
+    small = report["results"]["small"]
+    assert small["process_pdf_to_csv"]["rows"] == small["candidates"]
+    assert small["classify_lines"]["lines_per_s"] > 0
+    assert report["meta"]["repeat"] == 1
@@ -0,0 +1,44 @@
+import csv
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.synth_edital import write_edital
+from ml import build_dataset as bd
+from ml.train_joint import load_joint
+
+
+def read_rows(out):
+    with open(os.path.join(out, "line_cls", "all_lines.csv"), newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_build_dataset_only_extracts_new_or_changed_pdfs(tmp_path, monkeypatch):
+    root, out, cache = tmp_path / "samples", str(tmp_path / "data"), str(tmp_path / "cache")
+    for name, seed in (("Lisboa", 1), ("Porto", 2)):
+        (root / name / "input").mkdir(parents=True)
+        write_edital(str(root / name / "input" / "edital.pdf"), lists=2, candidates=3, suplentes=1, seed=seed)
+
+    assert bd.build_dataset(str(root), out, workers=2, cache_dir=cache)[:2] == (2, 2)
+    rows = read_rows(out)
+    texts, labels, ner = load_joint(os.path.join(out, "line_cls", "all_lines.csv"),
+                                    os.path.join(out, "ner", "all.conll"))
+    assert sum(1 for r in rows if r["label"] == "CANDIDATO") == 2 * (2 * 2 * 4 + 2)  # plus the numbered órgão headings
+    assert all(tags is not None for lbl, tags in zip(labels, ner) if lbl == "CANDIDATO")
+
+    built = []
+    real_build_shard = bd.build_shard
+    monkeypatch.setattr(bd, "build_shard", lambda pdf, path, cache_dir=None: built.append(pdf)
+                        or real_build_shard(pdf, path, cache_dir))
+    (root / "Braga" / "input").mkdir(parents=True)
+    write_edital(str(root / "Braga" / "input" / "edital.pdf"), lists=1, candidates=2, suplentes=1, seed=3)
+    assert bd.build_dataset(str(root), out, workers=1, cache_dir=cache)[:2] == (3, 1)
+    assert built == [str(root / "Braga" / "input" / "edital.pdf")]
+    assert len(read_rows(out)) > len(rows)
+
+    os.remove(root / "Braga" / "input" / "edital.pdf")
+    assert bd.build_dataset(str(root), out, workers=1, cache_dir=cache)[:2] == (2, 0)
+    assert read_rows(out) == rows
+    assert len(os.listdir(os.path.join(out, "shards"))) == 2
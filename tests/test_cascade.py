@@ -0,0 +1,49 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor import cascade
+
+
+def test_thresholds_fall_back_to_default():
+    thr = cascade.Thresholds({"CANDIDATO": 0.8})
+    assert thr["CANDIDATO"] == 0.8 and thr["SECAO"] == cascade.DEFAULT_ACCEPT
+    assert not thr.passes("CANDIDATO", 0.7) and thr.passes("SECAO", 0.7)
+    assert cascade.as_thresholds(0.4)["OUTRO"] == 0.4
+
+
+def test_load_thresholds_reads_accept_and_cascade(tmp_path):
+    assert cascade.load_thresholds(str(tmp_path)) == {}
+    (tmp_path / cascade.THRESHOLDS_FILE).write_text(json.dumps(
+        {"accept": {"CANDIDATO": 0.6}, "cascade": {"OUTRO": 0.9}}))
+
+    loaded = cascade.load_thresholds(str(tmp_path))
+
+    assert loaded["accept"]["CANDIDATO"] == 0.6
+    assert loaded["cascade"]["OUTRO"] == 0.9
+    assert not loaded["cascade"].passes("CANDIDATO", 1.0)  # uncalibrated labels always escalate
+
+
+def test_calibrate_accept_maximises_f1():
+    preds = [("CANDIDATO", 0.95), ("CANDIDATO", 0.9), ("CANDIDATO", 0.5), ("OUTRO", 0.8)]
+    gold = ["CANDIDATO", "CANDIDATO", "OUTRO", "OUTRO"]
+
+    out = cascade.calibrate_accept(preds, gold)
+
+    assert 0.5 < out["CANDIDATO"]["threshold"] <= 0.9
+    assert out["CANDIDATO"]["f1"] == 1.0
+    assert out["OUTRO"]["threshold"] == cascade.GRID[0]
+
+
+def test_calibrate_cascade_and_report():
+    first = [("OUTRO", 0.99)] * 30 + [("OUTRO", 0.6)] * 10 + [("CANDIDATO", 0.97)] * 5
+    gold = ["OUTRO"] * 30 + ["CANDIDATO"] * 10 + ["CANDIDATO"] * 5
+
+    out = cascade.calibrate_cascade(first, gold, target=0.99, min_support=20)
+
+    assert out == {"OUTRO": {"threshold": 0.61, "precision": 1.0, "accepted": 30}}  # too few CANDIDATO lines
+    full = [("CANDIDATO", 0.9) if g == "CANDIDATO" else ("OUTRO", 0.9) for g in gold]
+    report = cascade.cascade_report(first, full, gold, cascade.Thresholds({"OUTRO": 0.61}, default=float("inf")))
+    assert report["escalated"] == 15 and report["cascade_accuracy"] == 1.0
@@ -0,0 +1,29 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor.conll import iter_conll, split_indices
+
+
+def test_iter_conll_yields_one_sentence_per_block(tmp_path):
+    path = tmp_path / "all.conll"
+    path.write_text("João B-NOME\nSilva I-NOME\n\n\nPS O\n\nAna B-NOME", encoding="utf-8")
+
+    assert list(iter_conll(str(path))) == [
+        {"tokens": ["João", "Silva"], "ner_tags": ["B-NOME", "I-NOME"]},
+        {"tokens": ["PS"], "ner_tags": ["O"]},
+        {"tokens": ["Ana"], "ner_tags": ["B-NOME"]},
+    ]
+
+
+def test_split_indices_matches_the_previous_shuffled_split():
+    for n in (0, 1, 7, 100, 1234):
+        idx = list(range(n))
+        random.Random(42).shuffle(idx)
+        m = int(0.8 * n)
+        old_train = [i for i in range(n) if i in idx[:m]]
+        old_dev = [i for i in range(n) if i in idx[m:]]
+
+        assert split_indices(n) == (old_train, old_dev)
@@ -0,0 +1,81 @@
+import csv
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor import incremental, pipeline_ml, utils
+
+PAGES = [
+    ["1. Assembleia Municipal", "PS - Lista A", "1 Ana Lopes", "2 Rui Dias"],
+    ["PSD - Lista B", "1 Maria Costa", "Candidatos suplentes", "1 Joana Reis"],
+    ["2. Câmara Municipal", "CDU - Lista C", "1 Pedro Nunes", "2 Vasco Lima"],
+]
+
+
+def make_pdf(path, pages):
+    with utils.fitz.open() as doc:
+        for lines in pages:
+            page = doc.new_page()
+            for i, text in enumerate(lines):
+                page.insert_text((72, 72 + 18 * i), text)
+        doc.save(str(path))
+
+
+class CountingML:
+    fingerprint = "counting"
+
+    def __init__(self):
+        self.seen = []
+
+    def classify_lines(self, lines, batch_size=64):
+        self.seen.extend(lines)
+        return [("HEADER_LISTA", 0.95) if "LISTA" in line.upper() else
+                ("CANDIDATO", 0.95) if pipeline_ml.LINE_NUM.match(line) else ("OUTRO", 0.9) for line in lines]
+
+    def extract_nomes(self, lines, batch_size=64):
+        return [line.split(" ", 1)[1] for line in lines]
+
+
+def read_rows(path):
+    with Path(path).open(encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f, delimiter=";"))
+
+
+def test_incremental_rerun_matches_full_run_and_only_redoes_the_change(tmp_path):
+    pdf, out = tmp_path / "edital.pdf", tmp_path / "out.csv"
+    make_pdf(pdf, PAGES)
+    first = CountingML()
+    pipeline_ml.process_pdf_to_csv(str(pdf), "010100", str(out), ml=first, incremental=True)
+    assert Path(incremental.state_path(str(out))).exists()
+
+    # republished: one candidate of the last list corrected
+    changed = PAGES[:2] + [PAGES[2][:3] + ["2 Vasco Lima Santos"]]
+    make_pdf(pdf, changed)
+    ml, stats = CountingML(), {}
+    pipeline_ml.process_pdf_to_csv(str(pdf), "010100", str(out), ml=ml, stats=stats, incremental=True)
+
+    full = tmp_path / "full.csv"
+    pipeline_ml.process_pdf_to_csv(str(pdf), "010100", str(full), ml=CountingML())
+    assert read_rows(out) == read_rows(full)
+    assert read_rows(out)[-1][7] == "Vasco Lima Santos"
+    assert ml.seen == ["2 Vasco Lima Santos"]
+    assert stats["pages_reused"] == 2 and stats["pages_extracted"] == 1
+    assert stats["lines"] == 12 and stats["lines_reused"] == 11
+    assert stats["replayed_lines"] == 3  # from the "CDU - Lista C" header on
+    assert stats["rows_reused"] == 4 and stats["rows"] == 6
+
+
+def test_incremental_replays_from_the_start_when_settings_change(tmp_path):
+    pdf, out = tmp_path / "edital.pdf", tmp_path / "out.jsonl"
+    make_pdf(pdf, PAGES)
+    pipeline_ml.process_pdf_to_csv(str(pdf), "010100", str(out), ml=CountingML(), incremental=True)
+
+    ml, stats = CountingML(), {}
+    pipeline_ml.process_pdf_to_csv(str(pdf), "010100", str(out), ml=ml, stats=stats, incremental=True)
+    assert ml.seen == [] and stats["replayed_lines"] == 0
+
+    ml, stats = CountingML(), {}
+    pipeline_ml.process_pdf_to_csv(str(pdf), "999999", str(out), ml=ml, stats=stats, incremental=True)
+    assert len(ml.seen) == 10 and stats["replayed_lines"] == 12
+    assert '"DTMNFR": "999999"' in out.read_text(encoding="utf-8")
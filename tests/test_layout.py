@@ -0,0 +1,72 @@
+import fitz
+
+from cne_ml_extractor.layout import LayoutLine, page_layout_lines
+from cne_ml_extractor.utils import layout_label, pdf_to_lines
+
+
+def two_column_page(doc):
+    """Two lists side by side, written row by row across the columns like a table."""
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((60, 60), "1. Assembleia Municipal", fontsize=11, fontname="hebo")
+    y = 90
+    for left, right, bold in (("PS - Partido Socialista", "CH - Chega", True),
+                              ("CANDIDATOS EFETIVOS", "CANDIDATOS EFETIVOS", True),
+                              ("1.", "1.", False), ("2.", "2.", False)):
+        for x, text in ((60, left), (320, right)):
+            page.insert_text((x, y), text, fontsize=10, fontname="hebo" if bold else "helv")
+            if not bold:
+                page.insert_text((x + 18, y), f"Maria Costa {'Silva' if x == 60 else 'Dias'} {text[0]}",
+                                 fontsize=10)
+        y += 14
+    page.insert_text((78, y), "Pereira Gomes", fontsize=10)  # wraps the left column's last name
+    page.insert_text((60, y + 40), "2. Câmara Municipal", fontsize=11, fontname="hebo")
+    for x, text in ((60, "BE - Bloco de Esquerda"), (320, "L - Livre")):
+        page.insert_text((x, y + 70), text, fontsize=10, fontname="hebo")
+    return page
+
+
+def test_page_layout_lines_reads_columns_and_rejoins_wrapped_names():
+    with fitz.open() as doc:
+        lines = page_layout_lines(two_column_page(doc))
+
+    assert [ln.text for ln in lines] == [
+        "1. Assembleia Municipal",
+        "PS - Partido Socialista", "CANDIDATOS EFETIVOS",
+        "1. Maria Costa Silva 1", "2. Maria Costa Silva 2 Pereira Gomes",
+        "CH - Chega", "CANDIDATOS EFETIVOS",
+        "1. Maria Costa Dias 1", "2. Maria Costa Dias 2",
+        "2. Câmara Municipal",
+        "BE - Bloco de Esquerda", "L - Livre",
+    ]
+    assert [ln.column for ln in lines[1:9]] == [0] * 4 + [1] * 4
+    assert lines[9].column == -1
+    assert lines[1].bold and not lines[3].bold
+    assert lines[3].numbered and lines[3].indent == 0
+
+
+def test_page_layout_lines_is_empty_without_text_layer():
+    with fitz.open() as doc:
+        assert page_layout_lines(doc.new_page()) == []
+
+
+def test_layout_label_uses_bold_and_numbering():
+    assert layout_label(LayoutLine("CANDIDATOS SUPLENTES", bold=True)) == "SECAO"
+    assert layout_label(LayoutLine("PS - Partido Socialista", bold=True)) == "HEADER_LISTA"
+    assert layout_label(LayoutLine("PS - Partido Socialista")) is None
+    assert layout_label(LayoutLine("3 Ana Maria Lopes", numbered=True)) == "CANDIDATO"
+    assert layout_label(LayoutLine("3 Ana Maria Lopes", indent=40.0)) is None
+    assert layout_label(LayoutLine("Edital", bold=True)) is None
+
+
+def test_pdf_to_lines_layout_mode(tmp_path):
+    path = str(tmp_path / "edital.pdf")
+    with fitz.open() as doc:
+        two_column_page(doc)
+        doc.save(path)
+
+    plain = pdf_to_lines(path)[0]
+    layout = pdf_to_lines(path, layout=True)[0]
+
+    assert "1." in plain  # the flat text layer splits numbers from names
+    assert all(isinstance(ln, LayoutLine) for ln in layout)
+    assert len(layout) < len(plain)
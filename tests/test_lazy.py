@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from benchmarks.startup import HEAVY, parse_importtime
+from cne_ml_extractor.lazy import LazyModule, lazy_import
+
+
+@pytest.mark.parametrize("module", ["cne_ml_extractor.pipeline_ml", "cne_ml_extractor.batch", "webapp.server"])
+def test_entry_points_do_not_import_heavy_dependencies(module):
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == []
+
+
+def test_lazy_module_imports_on_first_use_and_forwards_writes(monkeypatch):
+    mod = lazy_import("colorsys")
+    assert isinstance(mod, LazyModule)
+    assert mod.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    monkeypatch.setattr(mod, "ONE_THIRD", 0.5)
+    assert sys.modules["colorsys"].ONE_THIRD == 0.5
+    assert lazy_import("no_such_module_here", optional=True) is None
+
+
+def test_parse_importtime_breaks_down_direct_imports():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 | site",
+        "import time:       200 |        200 |     deep",
+        "import time:       300 |       1500 |   heavy",
+        "import time:       400 |        400 |   light",
+        "import time:        50 |       1950 | target",
+    ])
+    report = parse_importtime(stderr, "target")
+    assert report == {"import_ms": 1.95, "top": [("heavy", 1.5), ("light", 0.4)]}
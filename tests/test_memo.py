@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor.memo import InferenceMemo, model_fingerprint
+
+
+def test_lookup_computes_each_normalized_text_once():
+    memo = InferenceMemo(max_size=10)
+    calls = []
+
+    def compute(lines):
+        calls.append(list(lines))
+        return [(line.upper(), 0.9) for line in lines]
+
+    first = memo.lookup("fp", "line", ["CANDIDATOS  EFETIVOS", "Edital", "CANDIDATOS EFETIVOS"], compute)
+    second = memo.lookup("fp", "line", ["Edital", " CANDIDATOS EFETIVOS "], compute)
+
+    assert calls == [["CANDIDATOS  EFETIVOS", "Edital"]]
+    assert first[0] == first[2] == second[1]
+    assert second[0] == ("EDITAL", 0.9)
+    assert memo.hits == 3 and memo.misses == 2
+    assert memo.hit_rate == 0.6
+    # another model fingerprint or kind never shares entries
+    memo.lookup("other", "line", ["Edital"], compute)
+    memo.lookup("fp", "nome", ["Edital"], compute)
+    assert len(calls) == 3
+
+
+def test_lru_keeps_max_size_entries():
+    memo = InferenceMemo(max_size=2)
+    memo.lookup("fp", "nome", ["a", "b", "c"], lambda lines: lines)
+
+    assert len(memo) == 2
+    assert memo.get_many([memo.make_key("fp", "nome", "a")]) == {}
+
+
+def test_sqlite_tier_is_shared_across_instances(tmp_path):
+    db = str(tmp_path / "memo.sqlite")
+    first = InferenceMemo(path=db)
+    first.lookup("fp", "line", ["1 João Silva"], lambda lines: [("CANDIDATO", 0.97)])
+    first.close()
+
+    second = InferenceMemo(path=db)
+    result = second.lookup("fp", "line", ["1 João Silva"], lambda lines: [])
+
+    assert result == [("CANDIDATO", 0.97)]
+    assert second.disk_hits == 1 and second.misses == 0
+
+
+def test_model_fingerprint_changes_with_config_and_settings(tmp_path):
+    (tmp_path / "config.json").write_text('{"a": 1}')
+    base = model_fingerprint(str(tmp_path), dtype="float32")
+
+    assert model_fingerprint(str(tmp_path), dtype="bfloat16") != base
+    (tmp_path / "config.json").write_text('{"a": 2}')
+    assert model_fingerprint(str(tmp_path), dtype="float32") != base
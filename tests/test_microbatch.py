@@ -0,0 +1,88 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor.microbatch import MicroBatcher
+
+
+class RecordingML:
+    single_pass = False
+
+    def __init__(self):
+        self.calls = []
+
+    def classify_lines(self, lines, batch_size=64):
+        self.calls.append(list(lines))
+        return [(line.upper(), float(len(line))) for line in lines]
+
+    def extract_nomes(self, lines, batch_size=64):
+        if "boom" in lines:
+            raise RuntimeError("boom")
+        return [line[::-1] for line in lines]
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    ml = RecordingML()
+    batcher = MicroBatcher(ml, max_batch_size=64, max_latency_ms=200)
+    start = threading.Barrier(4)
+    results = {}
+
+    def worker(i):
+        lines = [f"doc{i}-{j}" for j in range(i + 1)]
+        start.wait()
+        results[i] = batcher.classify_lines(lines)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert len(ml.calls) == 1 and len(ml.calls[0]) == 10
+    for i, res in results.items():
+        assert res == [(f"DOC{i}-{j}", float(len(f"doc{i}-{j}"))) for j in range(i + 1)]
+    assert batcher.stats() == {"requests": 4, "batches": 1, "items": 10, "avg_batch": 10.0}
+
+
+def test_full_request_is_not_delayed_and_errors_reach_caller():
+    import time
+
+    ml = RecordingML()
+    batcher = MicroBatcher(ml, max_batch_size=2, max_latency_ms=10_000)
+
+    t0 = time.monotonic()
+    assert batcher.classify_lines(["a", "bc"]) == [("A", 1.0), ("BC", 2.0)]
+    assert time.monotonic() - t0 < 5
+    assert batcher.extract_nomes([]) == []
+    with pytest.raises(RuntimeError):
+        batcher.extract_nomes(["boom", "x"])
+    assert batcher.single_pass is False
+    batcher.close()
+
+
+def test_model_stages_reach_the_callers_profiler():
+    from cne_ml_extractor.profiling import Profiler, profiled, stage
+
+    class StagedML(RecordingML):
+        def classify_lines(self, lines, batch_size=64):
+            with stage("forward"):
+                return super().classify_lines(lines, batch_size)
+
+    batcher = MicroBatcher(StagedML(), max_latency_ms=0)
+    prof = Profiler()
+    try:
+        with profiled(prof):
+            batcher.classify_lines(["a", "b"])
+            batcher.classify_lines(["c"])
+        batcher.classify_lines(["d"])  # unprofiled caller: not recorded
+    finally:
+        batcher.close()
+
+    stages = prof.report()["stages"]
+    assert stages["forward"]["count"] == 2
+    assert stages["microbatch"]["count"] == 2
@@ -0,0 +1,206 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor import ml_infer
+from ml.make_tiny_models import build_tiny_joint, build_tiny_models
+
+
+@pytest.fixture(scope="module")
+def tiny_ml(tmp_path_factory):
+    line_dir, ner_dir = build_tiny_models(str(tmp_path_factory.mktemp("tiny")))
+    return ml_infer.MLExtractor(line_dir, ner_dir)
+
+
+class CountingML:
+    loads = 0
+
+    def __init__(self, line_model_dir, ner_model_dir, device="cpu", dtype="float32", backend="torch"):
+        type(self).loads += 1
+        self.key = (line_model_dir, ner_model_dir, device, dtype)
+        self.warmed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+
+def test_registry_loads_each_key_once():
+    CountingML.loads = 0
+    registry = ml_infer.ModelRegistry(max_size=2)
+    results = []
+
+    def worker():
+        results.append(registry.get("line", "ner", factory=CountingML, warm_up=True))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert CountingML.loads == 1
+    assert all(ml is results[0] for ml in results)
+    assert results[0].warmed
+
+
+def test_registry_evicts_least_recently_used():
+    CountingML.loads = 0
+    registry = ml_infer.ModelRegistry(max_size=2)
+    a = registry.get("line", "ner", dtype="float32", factory=CountingML)
+    registry.get("line", "ner", dtype="bfloat16", factory=CountingML)
+    assert registry.get("line", "ner", dtype="float32", factory=CountingML) is a
+    registry.get("line", "ner", device="cuda", factory=CountingML)
+
+    assert len(registry) == 2
+    assert CountingML.loads == 3
+    # bfloat16 was the least recently used entry and must be reloaded
+    registry.get("line", "ner", dtype="bfloat16", factory=CountingML)
+    assert CountingML.loads == 4
+
+
+def test_get_extractor_memo_leaves_shared_instance_alone(monkeypatch):
+    from cne_ml_extractor.memo import InferenceMemo
+
+    CountingML.loads = 0
+    monkeypatch.setattr(ml_infer, "REGISTRY", ml_infer.ModelRegistry())
+    memo = InferenceMemo()
+    with_memo = ml_infer.get_extractor("line", "ner", factory=CountingML, memo=memo)
+    shared = ml_infer.get_extractor("line", "ner", factory=CountingML)
+
+    assert with_memo.memo is memo
+    assert getattr(shared, "memo", None) is None
+    assert with_memo.key == shared.key and CountingML.loads == 1
+
+
+def test_classify_lines_matches_classify_line(tiny_ml):
+    lines = [
+        "1 João Silva",
+        "PS - Partido Socialista",
+        "CANDIDATOS EFETIVOS",
+        "Eleição dos órgãos das autarquias locais",
+        "2",
+    ] * 3
+
+    batched = tiny_ml.classify_lines(lines, batch_size=4)
+
+    assert len(batched) == len(lines)
+    for line, (label, prob) in zip(lines, batched):
+        ref_label, ref_prob = tiny_ml.classify_line(line)
+        assert label == ref_label
+        assert prob == pytest.approx(ref_prob, abs=1e-5)
+    assert tiny_ml.classify_lines([]) == []
+
+
+def test_line_labels_follow_model_id2label(tmp_path):
+    # ml/train_line_cls.py numbers the labels in sorted order, not in LABELS order
+    line_dir, ner_dir = build_tiny_models(str(tmp_path), line_labels=sorted(ml_infer.LABELS))
+    ml = ml_infer.MLExtractor(line_dir, ner_dir)
+    id2label = ml.m_line.config.id2label
+    assert [id2label[i] for i in range(len(id2label))] != list(ml_infer.LABELS)
+    lines = ["1 João Silva", "PS - Partido Socialista", "CANDIDATOS EFETIVOS", "2"]
+
+    raw = ml_infer.line_probs(ml.tok_line, ml.m_line, lines)
+    got = ml.classify_lines(lines)
+
+    for i, (label, prob) in enumerate(got):
+        idx = int(raw[i].argmax())
+        assert label == id2label[idx]
+        assert prob == pytest.approx(float(raw[i, idx]), abs=1e-5)
+        assert ml.classify_line(lines[i])[0] == label
+    assert ml_infer.label_columns(ml.m_line.config) == [ml.m_line.config.label2id[l] for l in ml_infer.LABELS]
+
+
+def test_extract_nomes_matches_extract_nome(tiny_ml):
+    lines = ["1 João Silva", "", "2. Maria da Costa Pereira", "Ana"] * 3
+
+    batched = tiny_ml.extract_nomes(lines, batch_size=3)
+
+    assert batched == [tiny_ml.extract_nome(line) for line in lines]
+
+
+def ner_probs(ml, lines):
+    enc = ml.tok_ner([line.split() for line in lines], is_split_into_words=True, truncation=True,
+                     padding=True, return_tensors="pt")
+    with torch.no_grad():
+        return torch.softmax(ml.m_ner(**enc).logits.float(), dim=-1)
+
+
+@pytest.mark.parametrize("backend", ["torch-int8", "onnx", "onnx-int8"])
+def test_backends_match_fp32(tiny_ml, tmp_path, backend):
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+        from ml.export_onnx import export
+        from transformers import AutoModelForSequenceClassification, AutoModelForTokenClassification
+
+        line_dir, ner_dir = build_tiny_models(str(tmp_path))
+        export(AutoModelForSequenceClassification, line_dir)
+        export(AutoModelForTokenClassification, ner_dir)
+    else:
+        line_dir, ner_dir = build_tiny_models(str(tmp_path))
+    ref = ml_infer.MLExtractor(line_dir, ner_dir)
+    cand = ml_infer.MLExtractor(line_dir, ner_dir, backend=backend)
+    lines = ["1 João Silva", "PS - Partido Socialista", "CANDIDATOS EFETIVOS", "Edital"]
+
+    # random-init heads give nearly tied classes, so compare probabilities rather than argmax labels
+    line_ref = ml_infer.line_probs(ref.tok_line, ref.m_line, lines)
+    line_cand = ml_infer.line_probs(cand.tok_line, cand.m_line, lines)
+    assert torch.allclose(line_cand, line_ref, atol=2e-2)
+    assert torch.allclose(ner_probs(cand, lines), ner_probs(ref, lines), atol=2e-2)
+    assert len(cand.classify_lines(lines)) == len(cand.extract_nomes(lines)) == len(lines)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        ml_infer.MLExtractor("line", "ner", backend="tensorrt")
+
+
+def test_joint_model_single_pass_matches_separate_calls(tmp_path):
+    joint_dir = build_tiny_joint(str(tmp_path))
+    ml = ml_infer.MLExtractor(joint_dir, "unused-ner-dir")
+    lines = ["1 João Silva", "PS - Partido Socialista", "", "2. Maria da Costa Pereira", "Edital"] * 2
+
+    joint = ml.classify_and_extract_lines(lines, batch_size=3)
+
+    assert ml.single_pass
+    assert [res[:2] for res in joint] == ml.classify_lines(lines, batch_size=4)
+    assert [res[2] for res in joint] == [ml.extract_nome(line) for line in lines]
+    for line, (label, prob, _) in zip(lines, joint):
+        ref_label, ref_prob = ml.classify_line(line)
+        assert label == ref_label
+        assert prob == pytest.approx(ref_prob, abs=1e-5)
+
+
+def test_joint_model_rejects_incomplete_heads(tmp_path):
+    from cne_ml_extractor.joint import JOINT_HEADS, JointLineNerModel
+
+    joint_dir = build_tiny_joint(str(tmp_path))
+    path = Path(joint_dir) / JOINT_HEADS
+    heads = torch.load(path)
+    del heads[next(k for k in heads if k.startswith("ner"))]
+    torch.save(heads, path)
+
+    with pytest.raises(ValueError, match="missing"):
+        JointLineNerModel.from_pretrained(joint_dir)
+
+
+def test_memo_returns_same_results_without_recomputing(tmp_path):
+    from cne_ml_extractor.memo import InferenceMemo
+
+    line_dir, ner_dir = build_tiny_models(str(tmp_path))
+    ref = ml_infer.MLExtractor(line_dir, ner_dir)
+    ml = ml_infer.MLExtractor(line_dir, ner_dir, memo=InferenceMemo())
+    lines = ["1 João Silva", "CANDIDATOS EFETIVOS", "1 João  Silva", "Edital"] * 2
+
+    labels = ml.classify_lines(lines)
+    nomes = ml.extract_nomes(lines)
+
+    assert [lbl for lbl, _ in labels] == [lbl for lbl, _ in ref.classify_lines(lines)]
+    assert nomes == ref.extract_nomes(lines)
+    assert ml.memo.misses == 6 and ml.memo.hits == 10
+    assert ml.classify_line("Edital") == labels[3]
+    assert ml.memo.misses == 6
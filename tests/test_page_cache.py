@@ -0,0 +1,72 @@
+import os
+
+from cne_ml_extractor import utils
+from cne_ml_extractor.page_cache import PageCache, page_digest
+
+
+def make_pdf(path, texts):
+    with utils.fitz.open() as doc:
+        for text in texts:
+            page = doc.new_page()
+            if text:
+                page.insert_text((72, 72), text)
+        doc.save(str(path))
+
+
+def test_pdf_to_lines_cache_hit_skips_extraction_and_ocr(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "doc.pdf"
+    make_pdf(pdf_path, ["1 João Silva", ""])
+    ocr_calls = []
+
+    def fake_image_to_string(image, lang):
+        ocr_calls.append(lang)
+        return "Linha OCR"
+
+    monkeypatch.setattr(utils.pytesseract, "image_to_string", fake_image_to_string)
+    cache = PageCache(str(tmp_path / "cache"))
+
+    first = utils.pdf_to_lines(str(pdf_path), cache=cache)
+    second = utils.pdf_to_lines(str(pdf_path), cache=cache)
+
+    assert first == second == [["1 João Silva"], ["Linha OCR"]]
+    assert ocr_calls == ["por"]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # a different OCR setting is a different entry
+    utils.pdf_to_lines(str(pdf_path), cache=cache, dpi=150)
+    assert len(ocr_calls) == 2
+
+
+def test_page_digest_ignores_page_position(tmp_path):
+    a, b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    make_pdf(a, ["Lista A", "1 Ana Dias"])
+    make_pdf(b, ["1 Ana Dias", "Lista B"])
+
+    with utils.fitz.open(str(a)) as da, utils.fitz.open(str(b)) as db:
+        assert page_digest(da, da[1]) == page_digest(db, db[0])
+        assert page_digest(da, da[0]) != page_digest(db, db[1])
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=150)
+    keys = [PageCache.make_key(str(i)) for i in range(3)]
+    cache.put(keys[0], ["x" * 60])
+    cache.put(keys[1], ["y" * 60])
+    os.utime(cache._path(keys[1]), (1, 1))  # keys[1] is now the oldest entry
+    cache.put(keys[2], ["z" * 60])
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == ["x" * 60]
+    assert cache.get(keys[2]) == ["z" * 60]
+
+
+def test_page_cache_rewriting_a_key_keeps_size_exact(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=1000)
+    key, other = PageCache.make_key("0"), PageCache.make_key("1")
+    cache.put(other, ["y" * 60])
+    for _ in range(3):
+        cache.put(key, ["x" * 60])
+
+    assert cache._size == cache._scan_size()
+    assert cache.get(other) == ["y" * 60]
+    assert cache.get(key) == ["x" * 60]
@@ -1,4 +1,5 @@
 import csv
+import json
 import sys
 from pathlib import Path
 
@@ -7,11 +8,12 @@ import pytest
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from cne_ml_extractor import pipeline_ml
+from cne_ml_extractor.layout import LayoutLine
 
 
 @pytest.fixture(autouse=True)
 def stub_ml(monkeypatch):
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: [])
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: [])
 
     class DummyML:
         def __init__(self, *args, **kwargs):
@@ -79,7 +81,7 @@ def test_process_pdf_to_csv_exports_candidates_with_generic_sigla(tmp_path, monk
         def extract_nome(self, line):
             return line.split(" ", 1)[1]
 
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: pages)
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
     monkeypatch.setattr(pipeline_ml, "MLExtractor", DummyML)
 
     output_path = pipeline_ml.process_pdf_to_csv(
@@ -118,7 +120,7 @@ def test_process_pdf_to_csv_handles_ordinais(tmp_path, monkeypatch):
         def extract_nome(self, line):
             return line  # return original line to force ordinal stripping
 
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: pages)
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
     monkeypatch.setattr(pipeline_ml, "MLExtractor", DummyML)
 
     output_path = pipeline_ml.process_pdf_to_csv(
@@ -156,7 +158,7 @@ def test_process_pdf_to_csv_fallback_sigla_without_hyphen(tmp_path, monkeypatch)
         def extract_nome(self, line):
             return line.split(" ", 1)[1]
 
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: pages)
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
     monkeypatch.setattr(pipeline_ml, "MLExtractor", DummyML)
 
     output_path = pipeline_ml.process_pdf_to_csv(
@@ -194,7 +196,7 @@ def test_process_pdf_to_csv_handles_lista_single_letter(tmp_path, monkeypatch):
         def extract_nome(self, line):
             return line.split(" ", 1)[1]
 
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: pages)
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
     monkeypatch.setattr(pipeline_ml, "MLExtractor", DummyML)
 
     output_path = pipeline_ml.process_pdf_to_csv(
@@ -235,7 +237,7 @@ def test_process_pdf_to_csv_handles_mixed_orgao_pages(tmp_path, monkeypatch):
         def extract_nome(self, line):
             return line.split(" ", 1)[1]
 
-    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path: pages)
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
     monkeypatch.setattr(pipeline_ml, "MLExtractor", DummyML)
 
     output_path = pipeline_ml.process_pdf_to_csv(
@@ -250,3 +252,356 @@ def test_process_pdf_to_csv_handles_mixed_orgao_pages(tmp_path, monkeypatch):
     assert rows[2][1] == "AM"
     assert rows[3][1] == "CM"
     assert rows[3][7] == "Carlos Gomes"
+
+
+def test_process_pdf_to_csv_uses_given_extractor(tmp_path, monkeypatch):
+    pages = [["Lista A", "1 João Silva"]]
+
+    class FailingML:
+        def __init__(self, *args, **kwargs):
+            raise AssertionError("models must not be loaded when an extractor is given")
+
+    class GivenML:
+        def classify_line(self, line):
+            if "LISTA" in line.upper():
+                return "HEADER_LISTA", 0.95
+            return "CANDIDATO", 0.95
+
+        def extract_nome(self, line):
+            return line.split(" ", 1)[1]
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+    monkeypatch.setattr(pipeline_ml, "MLExtractor", FailingML)
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=GivenML()
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert rows[1][7] == "João Silva"
+
+
+def test_process_pdf_to_csv_classifies_in_batches(tmp_path, monkeypatch):
+    pages = [["1. Assembleia Municipal", "Lista A", "1 João Silva"], ["2 Maria Costa"]]
+    calls = []
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            calls.append(list(lines))
+            return [
+                ("HEADER_LISTA", 0.95) if "LISTA" in line.upper() else ("CANDIDATO", 0.95)
+                for line in lines
+            ]
+
+        def classify_line(self, line):
+            raise AssertionError("classify_line must not be called per line")
+
+        def extract_nome(self, line):
+            return line.split(" ", 1)[1]
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=BatchML()
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert calls == [["Lista A", "1 João Silva", "2 Maria Costa"]]
+    assert [r[7] for r in rows[1:]] == ["João Silva", "Maria Costa"]
+
+
+def test_process_pdf_to_csv_runs_ner_only_on_candidate_lines(tmp_path, monkeypatch):
+    pages = [["Lista A", "Edital", "1 João Silva", "2 Maria Costa"]]
+    ner_calls = []
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            out = []
+            for line in lines:
+                if "LISTA" in line.upper():
+                    out.append(("HEADER_LISTA", 0.95))
+                elif pipeline_ml.LINE_NUM.match(line):
+                    out.append(("CANDIDATO", 0.95))
+                else:
+                    out.append(("OUTRO", 0.9))
+            return out
+
+        def extract_nomes(self, lines, batch_size=64):
+            ner_calls.append(list(lines))
+            return [line.split(" ", 1)[1] for line in lines]
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=BatchML()
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert ner_calls == [["1 João Silva", "2 Maria Costa"]]
+    assert [r[7] for r in rows[1:]] == ["João Silva", "Maria Costa"]
+
+
+def test_process_pdf_to_csv_single_pass_skips_ner(tmp_path, monkeypatch):
+    pages = [["Lista A", "Edital", "1 João Silva", "2 Maria Costa"]]
+    calls = []
+
+    class JointML:
+        single_pass = True
+
+        def classify_and_extract_lines(self, lines, batch_size=64):
+            calls.append(list(lines))
+            out = []
+            for line in lines:
+                if "LISTA" in line.upper():
+                    out.append(("HEADER_LISTA", 0.95, "Lista"))
+                elif pipeline_ml.LINE_NUM.match(line):
+                    out.append(("CANDIDATO", 0.95, line.split(" ", 1)[1]))
+                else:
+                    out.append(("OUTRO", 0.9, None))
+            return out
+
+        def extract_nomes(self, lines, batch_size=64):
+            raise AssertionError("a single-pass extractor needs no NER pass")
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+    stats = {}
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=JointML(), stats=stats
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert calls == [pages[0]]
+    assert [r[7] for r in rows[1:]] == ["João Silva", "Maria Costa"]
+    assert stats["ner_calls"] == 0 and stats["ner_calls_avoided"] == 2
+
+
+def test_process_pdf_to_csv_rules_first_skips_decided_lines(tmp_path, monkeypatch):
+    pages = [["PS - Partido Socialista", "Candidatos suplentes", "1 João Silva", "Edital n.º 3"]]
+    classified = []
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            classified.extend(lines)
+            return [("OUTRO", 0.9) for _ in lines]
+
+        def extract_nomes(self, lines, batch_size=64):
+            raise AssertionError("rule-decided candidates must not go through NER")
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+    stats = {}
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=BatchML(),
+        rules_first=True, stats=stats,
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert classified == ["Edital n.º 3"]
+    assert stats["model_calls"] == 1
+    assert stats["model_calls_avoided"] == 3
+    assert rows[1][2:4] == ["3", "PS"]
+    assert rows[1][7] == "João Silva"
+
+
+def test_process_pdf_to_csv_stream_matches_batch_mode(tmp_path, monkeypatch):
+    pages = [["Lista A", "1 João Silva"], ["Candidatos suplentes", "1 Maria Costa", "2 Rui Dias"]]
+    batches = []
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            batches.append(len(lines))
+            out = []
+            for line in lines:
+                if "LISTA" in line.upper():
+                    out.append(("HEADER_LISTA", 0.95))
+                elif pipeline_ml.LINE_NUM.match(line):
+                    out.append(("CANDIDATO", 0.95))
+                else:
+                    out.append(("OUTRO", 0.9))
+            return out
+
+        def extract_nomes(self, lines, batch_size=64):
+            return [line.split(" ", 1)[1] for line in lines]
+
+    def lazy_pages(path, **kwargs):
+        for page in pages:
+            yield page
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+    monkeypatch.setattr(pipeline_ml, "iter_pdf_lines", lazy_pages)
+
+    full = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "full.csv"), ml=BatchML()
+    )
+    streamed = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "stream.csv"), ml=BatchML(),
+        stream=True, chunk_lines=2,
+    )
+
+    assert Path(full).read_bytes() == Path(streamed).read_bytes()
+    assert batches == [5, 2, 2, 1]
+
+
+def test_process_pdf_to_csv_layout_lines_skip_the_model(tmp_path, monkeypatch):
+    pages = [[
+        LayoutLine("PS - Partido Socialista", bold=True),
+        LayoutLine("CANDIDATOS SUPLENTES", bold=True),
+        LayoutLine("1. Ana Maria Lopes", numbered=True),
+        LayoutLine("Edital n.º 3"),
+    ]]
+    classified = []
+    seen = {}
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            classified.extend(lines)
+            return [("OUTRO", 0.9) for _ in lines]
+
+        def extract_nomes(self, lines, batch_size=64):
+            raise AssertionError("layout-decided candidates must not go through NER")
+
+    def fake_pdf_to_lines(path, **kwargs):
+        seen.update(kwargs)
+        return pages
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", fake_pdf_to_lines)
+    stats = {}
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.csv"), ml=BatchML(), stats=stats, layout=True,
+    )
+
+    with Path(output_path).open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+
+    assert seen["layout"] is True
+    assert classified == ["Edital n.º 3"]
+    assert stats["layout_labels"] == 3
+    assert stats["model_calls_avoided"] == 3
+    assert rows[1][2:4] == ["3", "PS"]
+    assert rows[1][7] == "Ana Maria Lopes"
+
+
+def test_process_pdfs_to_csv_pools_documents_into_shared_batches(tmp_path, monkeypatch):
+    docs = {
+        "a.pdf": [["1. Assembleia Municipal", "Lista A", "1 João Silva"], ["2 Maria Costa"]],
+        "b.pdf": [["Candidatos suplentes", "1 Rui Dias"]],
+        "c.pdf": [["PS - Lista B", "1 Ana Lopes"]],
+    }
+    batches = []
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            batches.append(list(lines))
+            return [
+                ("HEADER_LISTA", 0.95) if "LISTA" in line.upper()
+                else ("CANDIDATO", 0.95) if pipeline_ml.LINE_NUM.match(line) else ("OUTRO", 0.9)
+                for line in lines
+            ]
+
+        def extract_nomes(self, lines, batch_size=64):
+            return [line.split(" ", 1)[1] for line in lines]
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: docs[path])
+    singles = [Path(pipeline_ml.process_pdf_to_csv(pdf, "DTMNFR", str(tmp_path / f"single-{pdf}.csv"),
+                                                   ml=BatchML())).read_bytes() for pdf in docs]
+    batches.clear()
+    stats, doc_stats = {}, []
+
+    written = pipeline_ml.process_pdfs_to_csv(
+        [(pdf, "DTMNFR", str(tmp_path / f"fused-{pdf}.csv")) for pdf in docs],
+        ml=BatchML(), stats=stats, doc_stats=doc_stats,
+    )
+
+    assert [Path(p).read_bytes() for p in written] == singles
+    assert len(batches) == 1 and len(batches[0]) == 7
+    assert doc_stats == [{"lines": 4, "rows": 2}, {"lines": 2, "rows": 0}, {"lines": 2, "rows": 1}]
+    assert stats["lines"] == 8 and stats["rows"] == 3
+
+    batches.clear()
+    pipeline_ml.process_pdfs_to_csv(
+        [(pdf, "DTMNFR", str(tmp_path / f"grouped-{pdf}.csv")) for pdf in docs], ml=BatchML(), group_lines=5,
+    )
+    assert [len(b) for b in batches] == [5, 2]
+
+
+def test_process_pdf_to_csv_jsonl_with_details_and_partitioned_parquet(tmp_path, monkeypatch):
+    pages = [["Edital", "Lista A"], ["", "1 João Silva"]]
+
+    class BatchML:
+        def classify_lines(self, lines, batch_size=64):
+            return [
+                ("HEADER_LISTA", 0.95) if "LISTA" in line.upper()
+                else ("CANDIDATO", 0.875) if pipeline_ml.LINE_NUM.match(line) else ("OUTRO", 0.9)
+                for line in lines
+            ]
+
+        def extract_nomes(self, lines, batch_size=64):
+            return [line.split(" ", 1)[1] for line in lines]
+
+    monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: pages)
+
+    output_path = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "results.jsonl"), ml=BatchML(), details=True,
+    )
+
+    records = [json.loads(line) for line in Path(output_path).read_text(encoding="utf-8").splitlines()]
+    assert records == [{
+        "DTMNFR": "DTMNFR", "ORGAO": "AM", "TIPO": "2", "SIGLA": "A", "SIMBOLO": "A", "NOME_LISTA": "Lista A",
+        "NUM_ORDEM": 1, "NOME_CANDIDATO": "João Silva", "PARTIDO_PROPONENTE": "A", "INDEPENDENTE": False,
+        "PAGINA": 2, "LINHA": 2, "CONFIANCA": 0.875,
+    }]
+
+    pytest.importorskip("pyarrow")
+    dataset = pipeline_ml.process_pdf_to_csv(
+        "dummy.pdf", "DTMNFR", str(tmp_path / "ds" / "results.parquet"), ml=BatchML(),
+        partition_by=("DTMNFR", "ORGAO"),
+    )
+    assert dataset == str(tmp_path / "ds")
+    assert (tmp_path / "ds" / "DTMNFR=DTMNFR" / "ORGAO=AM" / "results.parquet").exists()
+
+
+def test_infer_lines_cascade_escalates_only_unsure_lines():
+    lines = ["Edital n.º 3", "Lista A", "1 João Silva", "2 Maria Costa"]
+    escalated, named = [], []
+
+    class FirstStage:
+        def classify_lines(self, lines):
+            return [("OUTRO", 0.99) if line.startswith("Edital") else
+                    ("CANDIDATO", 0.97) if line.startswith("1") else ("CANDIDATO", 0.6) for line in lines]
+
+    class BatchML:
+        conf_thr = {"CANDIDATO": 0.9}
+
+        def classify_lines(self, lines, batch_size=64):
+            escalated.extend(lines)
+            return [("HEADER_LISTA", 0.95) if "Lista" in line else ("CANDIDATO", 0.8) for line in lines]
+
+        def extract_nomes(self, lines, batch_size=64):
+            named.extend(lines)
+            return [line.split(" ", 1)[1] for line in lines]
+
+    stats = {}
+    results = pipeline_ml.infer_lines(BatchML(), lines, stats=stats, first_stage=FirstStage(),
+                                      cascade_thr={"OUTRO": 0.95, "CANDIDATO": 0.95})
+
+    assert escalated == ["Lista A", "2 Maria Costa"]
+    assert named == ["1 João Silva"]  # 0.8 is below the model's CANDIDATO threshold
+    assert [r.label for r in results] == ["OUTRO", "HEADER_LISTA", "CANDIDATO", "CANDIDATO"]
+    assert stats["cascade_accepted"] == 2 and stats["cascade_escalated"] == 2
+    assert stats["cascade_accepted_CANDIDATO"] == 1 and stats["model_calls"] == 2
+
+    state = pipeline_ml.ListState("DTMNFR", BatchML.conf_thr)
+    rows = [row for row in map(state.feed, results) if row is not None]
+    assert [r[7] for r in rows] == ["João Silva", "Maria Costa"]  # the regex fallback still numbers Maria
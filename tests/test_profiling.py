@@ -0,0 +1,86 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import fitz
+
+from cne_ml_extractor import pipeline_ml, profiling
+from cne_ml_extractor.utils import pdf_to_lines
+
+
+def test_stage_is_a_shared_noop_without_profiler():
+    assert profiling.active() is None
+    assert profiling.stage("ocr") is profiling.stage("forward")
+    with profiling.stage("ocr"):
+        pass
+
+
+def test_profiled_records_stages_and_merges():
+    prof = profiling.Profiler()
+    with profiling.profiled(prof):
+        for _ in range(3):
+            with profiling.stage("ocr"):
+                pass
+        with profiling.stage("write"):
+            pass
+    with profiling.stage("ocr"):  # outside: not recorded
+        pass
+
+    report = prof.report()
+    assert report["stages"]["ocr"]["count"] == 3
+    assert report["stages"]["write"]["count"] == 1
+
+    total = profiling.Profiler()
+    total.merge(report)
+    total.merge(json.loads(json.dumps(report)))
+    assert total.report()["stages"]["ocr"]["count"] == 6
+
+    text = profiling.to_prometheus(total.report())
+    assert 'cne_stage_calls_total{stage="ocr"} 6' in text
+    assert "cne_documents_total 0" in text
+
+
+def test_pipeline_records_document_and_page_stages(tmp_path, monkeypatch):
+    pdf = tmp_path / "edital.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Lista A\n1 João Silva")
+    doc.save(str(pdf))
+    doc.close()
+
+    class DummyML:
+        def classify_lines(self, lines, batch_size=64):
+            return [("HEADER_LISTA", 0.9) if "Lista" in line else ("CANDIDATO", 0.9) for line in lines]
+
+        def extract_nomes(self, lines, batch_size=64):
+            return [line.split(" ", 1)[1] for line in lines]
+
+    prof = profiling.Profiler()
+    with profiling.profiled(prof):
+        assert pdf_to_lines(str(pdf)) == [["Lista A", "1 João Silva"]]
+        monkeypatch.setattr(pipeline_ml, "pdf_to_lines", lambda path, **kwargs: [["Lista A", "1 João Silva"]])
+        pipeline_ml.process_pdf_to_csv(str(pdf), "DTMNFR", str(tmp_path / "out.csv"), ml=DummyML())
+
+    report = prof.report()
+    assert {"open", "text", "write"} <= set(report["stages"])
+    assert "ocr" not in report["stages"]
+    [document] = report["documents"]
+    assert document["document"] == str(pdf) and document["rows"] == 1
+    assert document["wall_s"] >= 0
+
+
+def test_bounded_profiler_keeps_document_totals():
+    prof = profiling.Profiler(max_documents=0)
+    for name in ("a.pdf", "b.pdf"):
+        with prof.document(name):
+            pass
+    job = profiling.Profiler()
+    with job.document("c.pdf"):
+        pass
+    prof.merge(job.report())
+
+    report = prof.report()
+    assert report["documents"] == []
+    assert report["documents_total"] == 3
+    assert "cne_documents_total 3" in profiling.to_prometheus(report)
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cne_ml_extractor import ml_infer
+from cne_ml_extractor.student import HashedNgramClassifier, is_student_dir
+from ml.distill_line_cls import teacher_probs, train_student
+from ml.make_tiny_models import build_tiny_models
+
+TRAIN = [
+    ("1 João Silva", "CANDIDATO"),
+    ("2 Maria da Costa", "CANDIDATO"),
+    ("3 Rui Pereira Santos", "CANDIDATO"),
+    ("CANDIDATOS EFETIVOS", "SECAO"),
+    ("CANDIDATOS SUPLENTES", "SECAO"),
+    ("PS - Partido Socialista", "HEADER_LISTA"),
+    ("CDU - Coligação Democrática Unitária", "HEADER_LISTA"),
+    ("Edital", "OUTRO"),
+    ("O Presidente do Tribunal", "OUTRO"),
+]
+
+
+def test_student_is_a_drop_in_line_classifier(tmp_path):
+    texts = [t for t, _ in TRAIN]
+    gold = [ml_infer.LABELS.index(label) for _, label in TRAIN]
+    soft = torch.nn.functional.one_hot(torch.tensor(gold), len(ml_infer.LABELS)).float()
+    student = train_student(texts, gold, soft, n_features=1 << 12, epochs=30)
+    student_dir = tmp_path / "student"
+    student.save(str(student_dir))
+
+    assert is_student_dir(str(student_dir))
+    loaded = HashedNgramClassifier.load(str(student_dir))
+    assert [label for label, _ in loaded.classify_lines(texts)] == [label for _, label in TRAIN]
+
+    _, ner_dir = build_tiny_models(str(tmp_path / "tiny"))
+    ml = ml_infer.MLExtractor(str(student_dir), ner_dir)
+    assert ml.m_line is None
+    label, prob = ml.classify_line("4 Ana Dias")
+    assert label == "CANDIDATO"
+    assert 0.0 < prob <= 1.0
+    assert ml.classify_lines(["CANDIDATOS EFETIVOS"])[0][0] == "SECAO"
+
+
+def test_teacher_probs_follow_labels_order(tmp_path):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    line_dir, _ = build_tiny_models(str(tmp_path), line_labels=sorted(ml_infer.LABELS))
+    tok = AutoTokenizer.from_pretrained(line_dir)
+    teacher = AutoModelForSequenceClassification.from_pretrained(line_dir).eval()
+    texts = [t for t, _ in TRAIN]
+
+    raw = ml_infer.line_probs(tok, teacher, texts)
+    soft = teacher_probs(tok, teacher, texts)
+
+    for j, label in enumerate(ml_infer.LABELS):
+        assert torch.equal(soft[:, j], raw[:, teacher.config.label2id[label]])
@@ -1,29 +1,33 @@
-from io import BytesIO
-
 from PIL import Image
 
 from cne_ml_extractor import utils
 
 
 class FakePixmap:
-    def __init__(self, data: bytes):
-        self._data = data
+    def __init__(self, image: Image.Image):
+        self.width, self.height = image.size
+        self.n = len(image.getbands())
+        self.alpha = False
+        self.samples = image.tobytes()
 
     def tobytes(self, fmt: str) -> bytes:
-        assert fmt == "png"
-        return self._data
+        raise AssertionError("OCR must use the raw samples, not an encoded image")
 
 
 class FakePage:
     def __init__(self, text: str, pixmap: FakePixmap):
         self._text = text
         self._pixmap = pixmap
+        self.rect = utils.fitz.Rect(0, 0, pixmap.width, pixmap.height)
 
     def get_text(self, kind: str) -> str:
         assert kind == "text"
         return self._text
 
-    def get_pixmap(self) -> FakePixmap:
+    def get_images(self):
+        return []
+
+    def get_pixmap(self, **kwargs) -> FakePixmap:
         return self._pixmap
 
 
@@ -42,10 +46,8 @@ class FakeDoc:
 
 
 def test_pdf_to_lines_uses_ocr(monkeypatch):
-    image = Image.new("RGB", (2, 2), color="white")
-    buffer = BytesIO()
-    image.save(buffer, format="PNG")
-    fake_pixmap = FakePixmap(buffer.getvalue())
+    image = Image.new("RGB", (2, 3), color="white")
+    fake_pixmap = FakePixmap(image)
 
     fake_doc = FakeDoc([FakePage("", fake_pixmap)])
 
@@ -56,10 +58,112 @@ def test_pdf_to_lines_uses_ocr(monkeypatch):
 
     def fake_image_to_string(image_obj, lang):
         assert lang == "por"
+        assert image_obj.size == (2, 3)
         return "Linha 1\n\nLinha 2"
 
     monkeypatch.setattr(utils.pytesseract, "image_to_string", fake_image_to_string)
+    monkeypatch.setattr(utils, "tesserocr", None)
 
     result = utils.pdf_to_lines("dummy.pdf")
 
     assert result == [["Linha 1", "Linha 2"]]
+
+
+def test_pdf_to_lines_workers_keep_page_order(tmp_path):
+    pdf_path = tmp_path / "doc.pdf"
+    with utils.fitz.open() as doc:
+        for i in range(7):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Pagina {i}")
+            page.insert_text((72, 90), f"{i} Nome Apelido")
+        doc.save(str(pdf_path))
+
+    serial = utils.pdf_to_lines(str(pdf_path))
+    parallel = utils.pdf_to_lines(str(pdf_path), workers=3)
+
+    assert parallel == serial
+    assert [p[0] for p in parallel] == [f"Pagina {i}" for i in range(7)]
+
+
+def scanned_pixmap(text: str, fontsize: float = 12, dpi: int = 150):
+    with utils.fitz.open() as tmp:
+        page = tmp.new_page(width=300, height=120)
+        page.insert_text((10, 40), text, fontsize=fontsize)
+        page.insert_text((10, 40 + 1.5 * fontsize), text, fontsize=fontsize)
+        return page.get_pixmap(dpi=dpi)
+
+
+def test_page_to_lines_ocrs_only_image_regions_without_text(monkeypatch):
+    calls = []
+
+    def fake_image_to_string(image_obj, lang):
+        calls.append(image_obj.size)
+        return "Anexo digitalizado\n"
+
+    monkeypatch.setattr(utils.pytesseract, "image_to_string", fake_image_to_string)
+    monkeypatch.setattr(utils, "tesserocr", None)
+    with utils.fitz.open() as doc:
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((72, 72), "Texto antes")
+        page.insert_image(utils.fitz.Rect(72, 100, 522, 280), pixmap=scanned_pixmap("ANEXO"))
+        page.insert_text((72, 300), "Texto depois")
+        page.insert_image(utils.fitz.Rect(72, 400, 522, 580), pixmap=scanned_pixmap("OCULTO"))
+        page.insert_text((80, 450), "Camada de texto")  # searchable scan: no OCR needed
+        page.insert_image(utils.fitz.Rect(500, 20, 520, 40), pixmap=scanned_pixmap("logo"))  # too small
+
+        lines = utils.page_to_lines(page)
+
+    assert lines == ["Texto antes", "Anexo digitalizado", "Texto depois", "Camada de texto"]
+    assert len(calls) == 1
+    assert calls[0][0] < 595 * 300 / 72  # only the region is rasterised
+
+
+def test_two_column_page_keeps_text_order_and_skips_logo(monkeypatch):
+    calls = []
+
+    def fake_image_to_string(image_obj, lang):
+        calls.append(image_obj.size)
+        return "Anexo digitalizado\n"
+
+    monkeypatch.setattr(utils.pytesseract, "image_to_string", fake_image_to_string)
+    monkeypatch.setattr(utils, "tesserocr", None)
+    with utils.fitz.open() as doc:
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(utils.fitz.Rect(237, 20, 357, 80), pixmap=scanned_pixmap("brasao"))  # crest, ~1.7%
+        for x, lines in ((50, ["PS - Partido Socialista", "1 Ana Dias", "2 Rui Costa"]),
+                         (320, ["CDU - Coligação", "1 Eva Lopes", "2 Ivo Reis"])):
+            for i, line in enumerate(lines):
+                page.insert_text((x, 120 + 20 * i), line)
+        page.insert_image(utils.fitz.Rect(40, 500, 290, 800), pixmap=scanned_pixmap("ANEXO"),
+                          keep_proportion=False)  # scan, ~15%
+        text_order = [ln.strip() for ln in page.get_text("text").splitlines() if ln.strip()]
+
+        lines = utils.page_to_lines(page)
+
+    assert lines == text_order + ["Anexo digitalizado"]
+    assert text_order[:3] == ["PS - Partido Socialista", "1 Ana Dias", "2 Rui Costa"]
+    assert len(calls) == 1
+
+
+def test_ocr_dpi_follows_glyph_size():
+    with utils.fitz.open() as doc:
+        for fontsize in (7, 20):
+            page = doc.new_page(width=300, height=120)
+            page.insert_image(page.rect, pixmap=scanned_pixmap("Nome Apelido", fontsize=fontsize))
+        doc.new_page()
+        small, large, blank = doc
+
+        assert utils.ocr_dpi(small) > utils.ocr_dpi(large)
+        assert utils.OCR_DPI_RANGE[0] <= utils.ocr_dpi(large) <= utils.ocr_dpi(small) <= utils.OCR_DPI_RANGE[1]
+        assert utils.ocr_dpi(blank) == utils.OCR_DEFAULT_DPI
+
+
+def test_rule_label_decides_only_unambiguous_lines():
+    assert utils.rule_label("CANDIDATOS EFETIVOS") == "SECAO"
+    assert utils.rule_label("PPD/PSD - Partido Social Democrata") == "HEADER_LISTA"
+    assert utils.rule_label("Lista A") == "HEADER_LISTA"
+    assert utils.rule_label("1.º Maria da Costa") == "CANDIDATO"
+    # ambiguous or undecided lines go to the model
+    assert utils.rule_label("Lista A - Candidatos efetivos") is None
+    assert utils.rule_label("2 de Agosto de 2025") is None
+    assert utils.rule_label("Edital") is None
@@ -35,3 +35,171 @@ def test_directory_traversal_is_rejected(http_server):
     response = conn.getresponse()
     assert response.status == HTTPStatus.NOT_FOUND
     conn.close()
+
+
+def wait_for(conn, job_id, timeout=5.0):
+    import json
+    import time
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        conn.request("GET", f"/api/jobs/{job_id}")
+        job = json.loads(conn.getresponse().read())
+        if job["status"] in ("done", "error"):
+            return job
+        sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_upload_is_queued_polled_and_downloaded(http_server, tmp_path):
+    import json
+
+    from webapp.jobs import JobQueue
+
+    def runner(pdf_path, dtmnfr, out_csv, stats):
+        Path(out_csv).write_text(f"DTMNFR;NOME\n{dtmnfr};{Path(pdf_path).read_bytes()[:5].decode()}\n")
+        stats["rows"] = 1
+
+    http_server.jobs = JobQueue(runner, work_dir=str(tmp_path)).start()
+    try:
+        conn = HTTPConnection("127.0.0.1", http_server.server_port)
+        conn.request("POST", "/api/jobs?dtmnfr=110700", body=b"%PDF-1.4 fake",
+                     headers={"X-Filename": "edital%20Loures.pdf"})
+        response = conn.getresponse()
+        assert response.status == HTTPStatus.ACCEPTED
+        job = json.loads(response.read())
+
+        done = wait_for(conn, job["id"])
+        assert done["status"] == "done" and done["stats"] == {"rows": 1}
+
+        conn.request("GET", done["csv_url"])
+        response = conn.getresponse()
+        assert response.status == HTTPStatus.OK
+        assert "edital Loures_AM_CM_final.csv" in response.getheader("Content-Disposition")
+        assert response.read().decode() == "DTMNFR;NOME\n110700;%PDF-\n"
+        conn.close()
+    finally:
+        http_server.jobs.stop()
+
+
+def test_upload_rejects_bad_requests_and_full_queue(http_server, tmp_path):
+    import threading
+
+    from webapp.jobs import JobQueue
+
+    release = threading.Event()
+    http_server.jobs = JobQueue(lambda *args: release.wait(5), max_pending=1, work_dir=str(tmp_path)).start()
+    try:
+        conn = HTTPConnection("127.0.0.1", http_server.server_port)
+
+        def post(query, body=b"%PDF-1.4"):
+            conn.request("POST", f"/api/jobs{query}", body=body)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+
+        assert post("") == HTTPStatus.BAD_REQUEST
+        assert post("?dtmnfr=1107", body=b"not a pdf") == HTTPStatus.BAD_REQUEST
+        assert post("?dtmnfr=1107") == HTTPStatus.ACCEPTED  # taken by the worker
+        sleep(0.1)
+        assert post("?dtmnfr=1107") == HTTPStatus.ACCEPTED  # waits in the queue
+        assert post("?dtmnfr=1107") == HTTPStatus.SERVICE_UNAVAILABLE
+
+        # a full queue answers before the body is read
+        conn.close()
+        conn = HTTPConnection("127.0.0.1", http_server.server_port, timeout=2)
+        conn.putrequest("POST", "/api/jobs?dtmnfr=1107")
+        conn.putheader("Content-Length", str(1024 * 1024))
+        conn.endheaders()
+        response = conn.getresponse()
+        response.read()
+        assert response.status == HTTPStatus.SERVICE_UNAVAILABLE
+        conn.close()
+        assert len(list(tmp_path.iterdir())) == 2  # no directory left behind by rejected uploads
+
+        conn = HTTPConnection("127.0.0.1", http_server.server_port)
+        conn.request("GET", "/api/jobs/" + "0" * 32)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == HTTPStatus.NOT_FOUND
+        conn.close()
+    finally:
+        release.set()
+        http_server.jobs.stop()
+
+
+def test_negative_length_and_pruned_result_are_rejected(http_server, tmp_path):
+    import json
+    import os
+
+    from webapp.jobs import JobQueue
+
+    def runner(pdf_path, dtmnfr, out_csv, stats):
+        Path(out_csv).write_text("DTMNFR;NOME\n")
+
+    http_server.jobs = JobQueue(runner, work_dir=str(tmp_path)).start()
+    try:
+        conn = HTTPConnection("127.0.0.1", http_server.server_port)
+        conn.putrequest("POST", "/api/jobs?dtmnfr=1107")
+        conn.putheader("Content-Length", "-1")
+        conn.endheaders()
+        response = conn.getresponse()
+        response.read()
+        assert response.status == HTTPStatus.BAD_REQUEST
+        conn.close()
+
+        conn = HTTPConnection("127.0.0.1", http_server.server_port)
+        conn.request("POST", "/api/jobs?dtmnfr=1107", body=b"%PDF-1.4")
+        job = json.loads(conn.getresponse().read())
+        done = wait_for(conn, job["id"])
+        os.remove(http_server.jobs.get(job["id"]).csv_path)  # as if pruned after the status check
+        conn.request("GET", done["csv_url"])
+        response = conn.getresponse()
+        response.read()
+        assert response.status == HTTPStatus.GONE
+        conn.close()
+    finally:
+        http_server.jobs.stop()
+
+
+def test_stop_drops_queued_jobs_of_a_full_queue(tmp_path):
+    import os
+    import threading
+
+    from webapp.jobs import JobQueue, QueueFullError
+
+    release, started = threading.Event(), threading.Event()
+    ran = []
+
+    def runner(pdf_path, dtmnfr, out_csv, stats):
+        ran.append(dtmnfr)
+        started.set()
+        release.wait(5)
+
+    jobs = JobQueue(runner, max_pending=2, work_dir=str(tmp_path)).start()
+
+    def submit(dtmnfr):
+        path = jobs.upload_path()
+        Path(path).write_bytes(b"%PDF-1.4")
+        return jobs.submit(path, f"{dtmnfr}.pdf", dtmnfr)
+
+    running = submit("1")
+    assert started.wait(5)
+    queued = [submit(str(i)) for i in (2, 3)]
+    with pytest.raises(QueueFullError):
+        submit("4")
+
+    stopper = Thread(target=jobs.stop, kwargs={"timeout": 5})
+    stopper.start()
+    sleep(0.1)
+    release.set()
+    stopper.join(5)
+
+    assert not stopper.is_alive()
+    assert ran == ["1"] and running.status == "done"
+    for job in queued:
+        assert job.status == "error" and "dropped" in job.error
+        assert not os.path.exists(os.path.dirname(job.pdf_path))
+    with pytest.raises(QueueFullError):
+        jobs.check_room()
+    assert len(os.listdir(tmp_path)) == 1  # only the job that ran keeps its directory
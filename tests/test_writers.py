@@ -0,0 +1,91 @@
+import csv
+import json
+
+import pytest
+
+from cne_ml_extractor import writers
+
+COLUMNS = ["DTMNFR", "ORGAO", "NUM_ORDEM", "NOME_CANDIDATO", "INDEPENDENTE", "CONFIANCA"]
+ROWS = [
+    ["010100", "AM", 1, "João Silva", False, 0.97],
+    ["010100", "CM", 2, "Maria Costa", False, 0.61],
+]
+
+
+def test_format_of_guesses_from_extension():
+    assert writers.format_of("a/out.csv") == "csv"
+    assert writers.format_of("out.JSONL") == "jsonl"
+    assert writers.format_of("out.parquet") == "parquet"
+    assert writers.format_of("out") == "csv"
+
+
+def test_csv_writer_keeps_the_semicolon_bom_layout(tmp_path):
+    path = tmp_path / "nested" / "out.csv"
+    with writers.open_writer(str(path), COLUMNS) as w:
+        w.write(ROWS[:1])
+        w.write(ROWS[1:])
+
+    assert path.read_bytes().startswith(b"\xef\xbb\xbf")
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+    assert rows[0] == COLUMNS
+    assert rows[1] == ["010100", "AM", "1", "João Silva", "False", "0.97"]
+    assert w.rows == 2
+
+
+def test_jsonl_writer_keeps_types(tmp_path):
+    path = tmp_path / "out.jsonl"
+    with writers.open_writer(str(path), COLUMNS) as w:
+        w.write(ROWS)
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert records[1] == {"DTMNFR": "010100", "ORGAO": "CM", "NUM_ORDEM": 2, "NOME_CANDIDATO": "Maria Costa",
+                          "INDEPENDENTE": False, "CONFIANCA": 0.61}
+
+
+def test_open_writer_rejects_partitioning_text_formats(tmp_path):
+    with pytest.raises(ValueError):
+        writers.open_writer(str(tmp_path / "out.csv"), COLUMNS, partition_by=["DTMNFR"])
+    with pytest.raises(ValueError):
+        writers.open_writer(str(tmp_path / "out.xml"), COLUMNS, fmt="xml")
+
+
+def test_parquet_writer_types_and_partitions(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    path = tmp_path / "out.parquet"
+    with writers.open_writer(str(path), COLUMNS) as w:
+        w.write(ROWS)
+    table = pq.read_table(str(path))
+    assert str(table.schema.field("NUM_ORDEM").type) == "int32"
+    assert table.column("INDEPENDENTE").to_pylist() == [False, False]
+
+    with writers.open_writer(str(tmp_path / "ds" / "out.parquet"), COLUMNS, partition_by=["DTMNFR", "ORGAO"]) as w:
+        w.write(ROWS)
+    part = pq.read_table(str(tmp_path / "ds" / "DTMNFR=010100" / "ORGAO=CM" / "out.parquet"))
+    assert part.column_names == ["NUM_ORDEM", "NOME_CANDIDATO", "INDEPENDENTE", "CONFIANCA"]
+    assert part.column("NOME_CANDIDATO").to_pylist() == ["Maria Costa"]
+
+    with writers.open_writer(str(tmp_path / "empty.parquet"), COLUMNS):
+        pass
+    assert pq.read_table(str(tmp_path / "empty.parquet")).num_rows == 0
+
+
+def test_parquet_rerun_drops_stale_partitions(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    ds = tmp_path / "ds"
+    other = ds / "DTMNFR=010100" / "ORGAO=AM" / "other.parquet"  # another document's output
+    other.parent.mkdir(parents=True)
+    other.write_bytes(b"")
+    with writers.open_writer(str(ds / "out.parquet"), COLUMNS, partition_by=["DTMNFR", "ORGAO"]) as w:
+        w.write(ROWS)
+    with writers.open_writer(str(ds / "out.parquet"), COLUMNS, partition_by=["DTMNFR", "ORGAO"]) as w:
+        w.write(ROWS[:1])
+
+    assert sorted(p.relative_to(ds).as_posix() for p in ds.rglob("*.parquet")) == [
+        "DTMNFR=010100/ORGAO=AM/other.parquet", "DTMNFR=010100/ORGAO=AM/out.parquet"]
+    assert not (ds / "DTMNFR=010100" / "ORGAO=CM").exists()
+    assert pq.read_table(str(ds / "DTMNFR=010100" / "ORGAO=AM" / "out.parquet")).num_rows == 1
+    assert writers.output_path(str(ds / "out.parquet"), ["DTMNFR"]) == str(ds)
+    assert writers.output_path(str(ds / "out.parquet")) == str(ds / "out.parquet")
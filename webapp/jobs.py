@@ -0,0 +1,242 @@
+"""Bounded background queue that runs uploaded PDFs through the extraction pipeline."""
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from cne_ml_extractor.profiling import Profiler, profiled
+
+Runner = Callable[[str, str, str, dict], None]
+
+
+class QueueFullError(RuntimeError):
+    """Raised by :meth:`JobQueue.submit` when ``max_pending`` jobs are already waiting."""
+
+
+class Job:
+    """One uploaded PDF and the state of its extraction."""
+
+    def __init__(self, job_id: str, filename: str, dtmnfr: str, pdf_path: str, csv_path: str):
+        self.id = job_id
+        self.filename = filename
+        self.dtmnfr = dtmnfr
+        self.pdf_path = pdf_path
+        self.csv_path = csv_path
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.stats: dict = {}
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.profile: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        out = {"id": self.id, "filename": self.filename, "dtmnfr": self.dtmnfr, "status": self.status,
+               "created": self.created, "started": self.started, "finished": self.finished,
+               "status_url": f"/api/jobs/{self.id}"}
+        if self.status == "done":
+            out["csv_url"] = f"/api/jobs/{self.id}/csv"
+            out["stats"] = self.stats
+        if self.profile is not None:
+            out["profile"] = self.profile
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+def pipeline_runner(line_model_dir: str = "models/line-cls-xlmr", ner_model_dir: str = "models/ner-nome-xlmr",
+                    device: str = "cpu", dtype: str = "float32", backend: str = "torch",
+                    rules_first: bool = False, memo_size: int = 100_000, max_batch_size: int = 64,
+                    max_latency_ms: float = 2.0, layout: bool = False,
+                    first_stage_dir: Optional[str] = None) -> Runner:
+    """Return a runner that extracts with one shared, warm extractor from the model registry.
+
+    Concurrent jobs go through one :class:`~cne_ml_extractor.microbatch.MicroBatcher`,
+    so their lines share forward passes; ``max_latency_ms=0`` still merges
+    whatever is already waiting.
+    """
+    memo = None
+    if memo_size:
+        from cne_ml_extractor.memo import InferenceMemo
+        memo = InferenceMemo(memo_size)
+    lock = threading.Lock()
+    shared: dict = {}
+
+    def extractor():
+        from cne_ml_extractor.microbatch import MicroBatcher
+        from cne_ml_extractor.ml_infer import get_extractor
+
+        with lock:
+            if "ml" not in shared:
+                ml = get_extractor(line_model_dir, ner_model_dir, device=device, dtype=dtype, backend=backend,
+                                   warm_up=True, memo=memo)
+                shared["ml"] = MicroBatcher(ml, max_batch_size=max_batch_size, max_latency_ms=max_latency_ms)
+            return shared["ml"]
+
+    def run(pdf_path: str, dtmnfr: str, out_csv: str, stats: dict) -> None:
+        from cne_ml_extractor.pipeline_ml import process_pdf_to_csv
+
+        process_pdf_to_csv(pdf_path, dtmnfr, out_csv, line_model_dir, ner_model_dir, ml=extractor(),
+                           rules_first=rules_first, stats=stats, batch_size=max_batch_size, layout=layout,
+                           first_stage_dir=first_stage_dir)
+
+    return run
+
+
+class JobQueue:
+    """Run submitted PDFs on ``workers`` background threads.
+
+    Threads share the extractor held by the process-wide model registry, so a
+    burst of uploads never loads the models more than once.  At most
+    ``max_pending`` jobs wait in the queue (further submissions, and any after
+    :meth:`stop`, raise :class:`QueueFullError`), and only the ``keep`` most
+    recent finished jobs are remembered; older ones are forgotten and their
+    files deleted.  Uploads are written by the caller straight to
+    :meth:`upload_path`, so a PDF is never held in memory whole.
+
+    With ``profile`` each job records per-stage timings (see
+    :mod:`cne_ml_extractor.profiling`), which are also summed in :attr:`profiler`;
+    that one keeps only totals, so it does not grow with the number of jobs.
+    """
+
+    def __init__(self, runner: Optional[Runner] = None, workers: int = 1, max_pending: int = 8,
+                 keep: int = 100, work_dir: Optional[str] = None, profile: bool = False):
+        if workers < 1 or max_pending < 1:
+            raise ValueError("workers and max_pending must be >= 1")
+        self.runner = runner or pipeline_runner()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="cne-webapp-")
+        # bounded by submit() rather than maxsize, so stop() never blocks on a full backlog
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._threads: List[threading.Thread] = []
+        self.profiler = Profiler(max_documents=0) if profile else None
+
+    def start(self) -> "JobQueue":
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"extract-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Let the workers finish the job in hand and exit (queued jobs are dropped)."""
+        with self._lock:
+            self._stopped = True
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._drop(job)
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    def _full_error(self) -> Optional[str]:
+        if self._stopped:
+            return "job queue is stopped"
+        if self._queue.qsize() >= self.max_pending:
+            return f"{self.max_pending} jobs already queued"
+        return None
+
+    def check_room(self) -> None:
+        """Raise :class:`QueueFullError` now if :meth:`submit` would, before an upload is read."""
+        with self._lock:
+            error = self._full_error()
+        if error is not None:
+            raise QueueFullError(error)
+
+    def upload_path(self) -> str:
+        """Create a job directory and return the path an upload should be written to for :meth:`submit`."""
+        job_dir = os.path.join(self.work_dir, uuid.uuid4().hex)
+        os.makedirs(job_dir)
+        return os.path.join(job_dir, "input.pdf")
+
+    def discard_upload(self, pdf_path: str) -> None:
+        """Delete an :meth:`upload_path` directory that will not be submitted."""
+        shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
+
+    def submit(self, pdf_path: str, filename: str, dtmnfr: str) -> Job:
+        """Queue the PDF written to ``pdf_path``, which must come from :meth:`upload_path`.
+
+        On :class:`QueueFullError` the upload is discarded.
+        """
+        job_dir = os.path.dirname(pdf_path)
+        job_id = os.path.basename(job_dir)
+        stem = os.path.splitext(os.path.basename(filename))[0] or "edital"
+        job = Job(job_id, filename, dtmnfr, pdf_path, os.path.join(job_dir, f"{stem}_AM_CM_final.csv"))
+        with self._lock:
+            error = self._full_error()
+            if error is None:
+                self._jobs[job_id] = job
+                self._queue.put_nowait(job)
+        if error is not None:
+            self.discard_upload(pdf_path)
+            raise QueueFullError(error)
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+        for job in self.jobs():
+            counts[job.status] += 1
+        counts.update(workers=self.workers, max_pending=self.max_pending)
+        return counts
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status, job.started = "running", time.time()
+            prof = Profiler() if self.profiler is not None else None
+            try:
+                with profiled(prof):
+                    self.runner(job.pdf_path, job.dtmnfr, job.csv_path, job.stats)
+                job.status = "done"
+            except Exception as exc:  # surfaced through the status endpoint
+                job.status, job.error = "error", f"{type(exc).__name__}: {exc}"
+            finally:
+                job.finished = time.time()
+                if prof is not None:
+                    job.profile = prof.report()
+                    self.profiler.merge(job.profile)
+                try:
+                    os.remove(job.pdf_path)
+                except OSError:
+                    pass
+            self._prune()
+
+    def _drop(self, job: Job) -> None:
+        job.status, job.error, job.finished = "error", "dropped: server stopping", time.time()
+        self.discard_upload(job.pdf_path)
+
+    def _prune(self) -> None:
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.status in ("done", "error")]
+            for job in finished[: max(0, len(finished) - self.keep)]:
+                del self._jobs[job.id]
+                shutil.rmtree(os.path.dirname(job.csv_path), ignore_errors=True)
@@ -1,17 +1,43 @@
-"""Development web server for the extractor front-end."""
+"""Development web server for the extractor front-end and its extraction API.
+
+``POST /api/jobs?dtmnfr=<code>`` with the PDF as request body queues an
+extraction and answers ``202`` with the job id; ``GET /api/jobs/<id>`` polls its
+status and ``GET /api/jobs/<id>/csv`` downloads the result.  ``GET /metrics``
+exposes the queue and, when profiling is on, the per-stage timings in the
+Prometheus text format.
+"""
 from __future__ import annotations
 
+import argparse
+import json
+import re
 from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path, PurePosixPath
-from urllib.parse import unquote, urlsplit
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from cne_ml_extractor.profiling import to_prometheus
+
+try:  # ``python webapp/server.py`` puts webapp/ itself on sys.path
+    from .jobs import JobQueue, QueueFullError, pipeline_runner
+except ImportError:  # pragma: no cover - script invocation
+    from jobs import JobQueue, QueueFullError, pipeline_runner
 
 BASE_DIR = Path(__file__).resolve().parent
 INDEX_FILE = BASE_DIR / "index.html"
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+_DTMNFR = re.compile(r"^[0-9A-Za-z]{1,16}$")
+_JOB_PATH = re.compile(r"^/api/jobs/([0-9a-f]{32})(/csv)?$")
 
 
 class ExtractHandler(SimpleHTTPRequestHandler):
-    """Serve static assets from :data:`BASE_DIR` safely."""
+    """Serve static assets from :data:`BASE_DIR` safely, plus the ``/api/jobs`` endpoints.
+
+    The API needs a :class:`~webapp.jobs.JobQueue` on ``server.jobs``;
+    without one it answers ``503``.
+    """
 
     def translate_path(self, path: str) -> str:  # type: ignore[override]
         """Resolve the request path against :data:`BASE_DIR` securely.
@@ -53,18 +79,165 @@ class ExtractHandler(SimpleHTTPRequestHandler):
             self.send_error(HTTPStatus.NOT_FOUND, "File not found")
             return None
 
+    @property
+    def jobs(self) -> Optional[JobQueue]:
+        return getattr(self.server, "jobs", None)
+
+    def send_json(self, status: HTTPStatus, payload, headers: Optional[dict] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def api_error(self, status: HTTPStatus, message: str, headers: Optional[dict] = None) -> None:
+        self.send_json(status, {"error": message}, headers)
+
+    def send_metrics(self) -> None:
+        lines = []
+        for key, value in self.jobs.stats().items():
+            lines.append(f"# TYPE cne_jobs_{key} gauge")
+            lines.append(f"cne_jobs_{key} {value}")
+        text = "\n".join(lines) + "\n"
+        if self.jobs.profiler is not None:
+            text += to_prometheus(self.jobs.profiler.report())
+        body = text.encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        path = urlsplit(self.path).path
+        if path == "/metrics" and self.jobs is not None:
+            return self.send_metrics()
+        if not path.startswith("/api/"):
+            return super().do_GET()
+        if self.jobs is None:
+            return self.api_error(HTTPStatus.SERVICE_UNAVAILABLE, "extraction queue not configured")
+        if path == "/api/jobs":
+            return self.send_json(HTTPStatus.OK, {"queue": self.jobs.stats(),
+                                                  "jobs": [j.to_dict() for j in self.jobs.jobs()]})
+        match = _JOB_PATH.match(path)
+        job = self.jobs.get(match.group(1)) if match else None
+        if job is None:
+            return self.api_error(HTTPStatus.NOT_FOUND, "unknown job")
+        if not match.group(2):
+            return self.send_json(HTTPStatus.OK, job.to_dict())
+        if job.status != "done":
+            return self.api_error(HTTPStatus.CONFLICT, f"job is {job.status}")
+        try:
+            with open(job.csv_path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:  # pruned between the status check and the read
+            return self.api_error(HTTPStatus.GONE, "job result no longer available")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Disposition", f'attachment; filename="{Path(job.csv_path).name}"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_upload(self, path: str, length: int) -> Optional[str]:
+        """Stream ``length`` body bytes to ``path`` in chunks; return an error message or ``None``."""
+        with open(path, "wb") as f:
+            while length > 0:
+                chunk = self.rfile.read(min(length, UPLOAD_CHUNK_BYTES))
+                if not chunk:
+                    self.close_connection = True
+                    return "request body shorter than Content-Length"
+                if f.tell() == 0 and not chunk.startswith(b"%PDF-"):
+                    self.close_connection = True  # the rest of the body is left unread
+                    return "body is not a PDF"
+                f.write(chunk)
+                length -= len(chunk)
+            if f.tell() == 0:
+                return "body is not a PDF"
+        return None
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        parts = urlsplit(self.path)
+        if parts.path != "/api/jobs":
+            return self.api_error(HTTPStatus.NOT_FOUND, "unknown endpoint")
+        if self.jobs is None:
+            return self.api_error(HTTPStatus.SERVICE_UNAVAILABLE, "extraction queue not configured")
+        dtmnfr = (parse_qs(parts.query).get("dtmnfr") or [""])[0].strip()
+        if not _DTMNFR.match(dtmnfr):
+            return self.api_error(HTTPStatus.BAD_REQUEST, "missing or invalid dtmnfr")
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            return self.api_error(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+        if length < 0:
+            self.close_connection = True
+            return self.api_error(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+        if length > MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            return self.api_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"PDF larger than {MAX_UPLOAD_BYTES} bytes")
+        try:  # before reading the body, so a rejected upload costs nothing
+            self.jobs.check_room()
+        except QueueFullError as exc:
+            self.close_connection = True
+            return self.api_error(HTTPStatus.SERVICE_UNAVAILABLE, str(exc), {"Retry-After": "30"})
+        pdf_path = self.jobs.upload_path()
+        error = self.read_upload(pdf_path, length)
+        if error is not None:
+            self.jobs.discard_upload(pdf_path)
+            return self.api_error(HTTPStatus.BAD_REQUEST, error)
+        filename = Path(unquote(self.headers.get("X-Filename", "edital.pdf"))).name
+        try:
+            job = self.jobs.submit(pdf_path, filename, dtmnfr)
+        except QueueFullError as exc:
+            return self.api_error(HTTPStatus.SERVICE_UNAVAILABLE, str(exc), {"Retry-After": "30"})
+        self.send_json(HTTPStatus.ACCEPTED, job.to_dict(), {"Location": f"/api/jobs/{job.id}"})
+
 
-def serve(host: str = "0.0.0.0", port: int = 8000) -> None:
+def serve(host: str = "0.0.0.0", port: int = 8000, jobs: Optional[JobQueue] = None) -> None:
     """Start a threaded HTTP server for the web application."""
 
     httpd = ThreadingHTTPServer((host, port), ExtractHandler)
+    httpd.jobs = jobs
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:  # pragma: no cover - manual stop
         pass
     finally:
         httpd.server_close()
+        if jobs is not None:
+            jobs.stop(timeout=5)
+
+
+def main(argv=None) -> None:  # pragma: no cover - manual invocation
+    p = argparse.ArgumentParser(description="Servidor web do extrator com API de extração.")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=1, help="extrações em simultâneo (partilham os modelos)")
+    p.add_argument("--max-pending", type=int, default=8, help="PDFs em espera antes de responder 503")
+    p.add_argument("--line-model", default="models/line-cls-xlmr")
+    p.add_argument("--ner-model", default="models/ner-nome-xlmr")
+    p.add_argument("--device", default="cpu")
+    p.add_argument("--dtype", default="float32")
+    p.add_argument("--backend", default="torch")
+    p.add_argument("--rules-first", action="store_true")
+    p.add_argument("--layout", action="store_true", help="lê as páginas por linhas visuais (colunas, negrito)")
+    p.add_argument("--first-stage", help="classificador leve à frente do XLM-R (cascata de confiança)")
+    p.add_argument("--max-batch-size", type=int, default=64, help="linhas por passagem do modelo (micro-lotes)")
+    p.add_argument("--max-latency-ms", type=float, default=2.0,
+                   help="espera máxima para juntar linhas de trabalhos concorrentes")
+    p.add_argument("--profile", action="store_true", help="mede o tempo por etapa (exposto em /metrics)")
+    args = p.parse_args(argv)
+    runner = pipeline_runner(args.line_model, args.ner_model, device=args.device, dtype=args.dtype,
+                             backend=args.backend, rules_first=args.rules_first, max_batch_size=args.max_batch_size,
+                             max_latency_ms=args.max_latency_ms, layout=args.layout,
+                             first_stage_dir=args.first_stage)
+    jobs = JobQueue(runner, workers=args.workers, max_pending=args.max_pending, profile=args.profile).start()
+    print(f"[INFO] http://{args.host}:{args.port}/ ({args.workers} worker(s), fila até {args.max_pending})")
+    serve(args.host, args.port, jobs)
 
 
 if __name__ == "__main__":  # pragma: no cover - manual invocation
-    serve()
+    main()